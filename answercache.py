@@ -0,0 +1,173 @@
+"""
+Cache of DNS answers shared across runs and processes.
+
+The found/taken files and the lookup cache record what a domain turned out
+to be, not what the resolver said, so a rerun, a revalidation or another
+sweep worker asks the network again about names whose answers were just
+seen. AnswerCache keeps the raw responses, keyed by (name, record type), for
+as long as DNS says they stay valid:
+
+- a positive answer for the smallest TTL of its answer records, e.g. the NS
+  TTL of a delegation;
+- NXDOMAIN and empty answers for the negative TTL of RFC 2308, the smaller of
+  the SOA record's TTL and its MINIMUM field, from the authority section.
+
+Timeouts and server failures are never cached, nor are negative answers
+without an SOA record. The cache is an SQLite database in WAL mode, so the
+processes of a sharded sweep can share one file: each sees the others'
+answers once they are committed.
+
+Only the raw UDP client (udpdns.UDPClient, i.e. runs with --resolver) reads
+and fills the cache; lookups through dnspython and the system resolver never
+see the raw responses, so they do not use it.
+"""
+import sqlite3
+import struct
+import threading
+import time
+
+import udpdns
+from metrics import METRICS
+
+DEFAULT_MAX_TTL = 24 * 3600  # Cap on any TTL, so a cached answer is never older than a day
+DEFAULT_BATCH_SIZE = 500  # Answers per commit
+BUSY_TIMEOUT_MS = 5000  # How long a writer waits for another process's transaction
+
+SOA = udpdns.QTYPES['SOA']
+CACHEABLE = (udpdns.NOERROR, udpdns.NXDOMAIN)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    name TEXT NOT NULL,
+    rtype INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    rcode INTEGER NOT NULL,
+    answer_count INTEGER NOT NULL,
+    packet BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (name, rtype)
+) WITHOUT ROWID;
+"""
+
+
+def negative_ttl(records):
+    """Return the RFC 2308 negative TTL from the SOA record among `records`, or None."""
+    for record in records:
+        if record.rtype == SOA and len(record.data) >= 4:
+            minimum, = struct.unpack('!I', record.data[-4:])
+            return min(record.ttl, minimum)
+    return None
+
+
+def answer_ttl(response):
+    """
+    Return how many seconds a udpdns.DNSResponse may be cached, or None if it may not.
+
+    Args:
+        response (udpdns.DNSResponse): Response whose packet holds the records.
+    """
+    if response.status not in CACHEABLE:
+        return None
+    if response.status == udpdns.NOERROR and response.answer_count:
+        records = udpdns.parse_records(response.packet)
+        return min((record.ttl for record in records), default=None)
+    return negative_ttl(udpdns.parse_records(response.packet, sections=2))
+
+
+class AnswerCache:
+    """
+    SQLite-backed cache of DNS responses keyed by (name, record type).
+
+    Writes are committed in batches; call commit() or close() to make the
+    last batch visible to other processes. Safe to share between threads.
+
+    Args:
+        path (str): SQLite database file, created if missing.
+        max_ttl (int): Upper bound in seconds on the time an answer is kept.
+        batch_size (int): Answers per commit.
+    """
+
+    def __init__(self, path, max_ttl=DEFAULT_MAX_TTL, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.max_ttl = max_ttl
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, name, qtype='NS', now=None):
+        """
+        Return the cached response for a name and record type, or None if missing or expired.
+
+        Returns:
+            udpdns.DNSResponse: The response as it was received; resolver is None.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, rcode, answer_count, packet FROM answers "
+                "WHERE name = ? AND rtype = ? AND expires_at > ?",
+                (name, udpdns.QTYPES[qtype], now)).fetchone()
+        METRICS.inc('dns_cache_total', result='miss' if row is None else 'hit')
+        if row is None:
+            return None
+        status, rcode, answer_count, packet = row
+        return udpdns.DNSResponse(status, rcode, answer_count, None, packet)
+
+    def put(self, name, qtype, response, now=None):
+        """
+        Cache a response for its TTL (see answer_ttl).
+
+        Returns:
+            int: The TTL it was cached for, or None if it was not cacheable.
+        """
+        ttl = answer_ttl(response)
+        if not ttl:
+            return None
+        ttl = min(ttl, self.max_ttl)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO answers (name, rtype, status, rcode, answer_count, packet, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, udpdns.QTYPES[qtype], response.status, response.rcode, response.answer_count,
+                 response.packet, now + ttl))
+            self._uncommitted += 1
+            if self._uncommitted >= self.batch_size:
+                self._commit()
+        return ttl
+
+    def purge(self, now=None):
+        """Delete the expired answers; return how many were removed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            removed = self._connection.execute("DELETE FROM answers WHERE expires_at <= ?", (now,)).rowcount
+            self._commit()
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def commit(self):
+        """Commit the answers written so far."""
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """Commit and close the database."""
+        with self._lock:
+            self._commit()
+            self._connection.close()
+
+    def _commit(self):
+        self._connection.commit()
+        self._uncommitted = 0
@@ -0,0 +1,203 @@
+"""
+Offline benchmarks of the lookup paths against local fake servers.
+
+Starts a FakeDNSServer and a FakeWhoisServer (see fakeservers.py) and runs
+has_dns_record, is_available, generate_domain and generate_domain_async
+against them, over the last `count` names of the keyspace, in a scratch
+directory. For each it reports domains/sec, p50/p99 lookup latency and the
+peak memory of the process, so a regression shows up without touching the
+network.
+
+    python benchmark.py --count 2000 --latency 0.005 --loss 0.01
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import tempfile
+import time
+
+import fakeservers
+import finddomain_ifexists
+import keyspace
+import metrics
+from checkpoint import Checkpoint
+
+DEFAULT_COUNT = 1000
+
+
+def percentile(values, q):
+    """Return the q-th quantile of a list of values (None if empty)."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def max_rss_kb():
+    """Return the peak resident memory of the process in KiB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if os.uname().sysname == 'Darwin' else usage
+
+
+def last_domains(count):
+    """Return the last `count` names of the keyspace."""
+    return [keyspace.index_to_domain(index)
+            for index in range(keyspace.KEYSPACE_SIZE - count, keyspace.KEYSPACE_SIZE)]
+
+
+def report(name, count, seconds, p50, p99):
+    return {
+        'benchmark': name,
+        'domains': count,
+        'seconds': seconds,
+        'domains_per_sec': count / seconds if seconds else None,
+        'p50': p50,
+        'p99': p99,
+        'max_rss_kb': max_rss_kb(),
+    }
+
+
+def timed_calls(name, domains, call):
+    """Call call(domain) for every domain in turn, timing each call."""
+    latencies = []
+    started = time.perf_counter()
+    for domain in domains:
+        before = time.perf_counter()
+        call(domain)
+        latencies.append(time.perf_counter() - before)
+    return report(name, len(domains), time.perf_counter() - started,
+                  percentile(latencies, 0.5), percentile(latencies, 0.99))
+
+
+@contextlib.contextmanager
+def scratch_store(count):
+    """
+    Run a sweep in a temporary directory with a checkpoint `count` names before the end.
+
+    Yields:
+        Checkpoint: The checkpoint to pass to the sweep.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        finddomain_ifexists.prefix_counts = None
+        metrics.METRICS.reset()
+        try:
+            checkpoint = Checkpoint(finddomain_ifexists.CHECKPOINT_FILE)
+            checkpoint.cursor = keyspace.KEYSPACE_SIZE - count
+            checkpoint.save()
+            yield checkpoint
+        finally:
+            finddomain_ifexists.prefix_counts = None
+            os.chdir(cwd)
+
+
+def sweep_report(name, count, seconds):
+    """Build a report for a sweep from the latency histogram in metrics.METRICS."""
+    latency = metrics.METRICS.snapshot()['histograms'].get('dns_latency_seconds', {})
+    return report(name, count, seconds, latency.get('p50'), latency.get('p99'))
+
+
+def bench_has_dns_record(count, dns_server, timeout=1):
+    resolver = dns_server.resolver()
+    return timed_calls('has_dns_record', last_domains(count),
+                       lambda domain: finddomain_ifexists.has_dns_record(domain, timeout, resolver))
+
+
+def bench_is_available(count, whois_server, timeout=1):
+    lookup = whois_server.lookup(timeout)
+    return timed_calls('is_available', last_domains(count),
+                       lambda domain: finddomain_ifexists.is_available(domain, lookup=lookup, delay=0))
+
+
+def bench_generate_domain(count, dns_server, timeout=1):
+    resolver = dns_server.resolver()
+    resolver.lifetime = timeout
+    with scratch_store(count) as checkpoint:
+        started = time.perf_counter()
+        finddomain_ifexists.generate_domain(set(), set(), checkpoint=checkpoint, backoff=0.01,
+                                            resolver=resolver)
+        return sweep_report('generate_domain', count, time.perf_counter() - started)
+
+
+def bench_generate_domain_async(count, dns_server, whois_server, concurrency=200, whois_workers=8,
+                                timeout=1):
+    with scratch_store(count) as checkpoint:
+        started = time.perf_counter()
+        finddomain_ifexists.generate_domain_async(
+            set(), set(), concurrency=concurrency, timeout=timeout, checkpoint=checkpoint,
+            resolvers=[dns_server.address], whois_workers=whois_workers,
+            whois_rate=1000.0, whois_lookup=whois_server.lookup(timeout))
+        return sweep_report('generate_domain_async', count, time.perf_counter() - started)
+
+
+BENCHMARKS = ('has_dns_record', 'is_available', 'generate_domain', 'generate_domain_async')
+
+
+def run(count=DEFAULT_COUNT, benchmarks=BENCHMARKS, latency=0.0, loss=0.0,
+        nxdomain_ratio=fakeservers.DEFAULT_NXDOMAIN_RATIO, whois_latency=0.0, whois_loss=0.0,
+        available_ratio=fakeservers.DEFAULT_AVAILABLE_RATIO, whois_port=0, concurrency=200,
+        whois_workers=8, timeout=1, seed=0):
+    """
+    Run the benchmarks against freshly started fake servers.
+
+    Returns:
+        list: One report dict per benchmark.
+    """
+    results = []
+    with fakeservers.FakeDNSServer(latency, loss, nxdomain_ratio, seed=seed) as dns_server, \
+            fakeservers.FakeWhoisServer(whois_latency, whois_loss, available_ratio,
+                                        port=whois_port, seed=seed) as whois_server:
+        for name in benchmarks:
+            if name == 'has_dns_record':
+                results.append(bench_has_dns_record(count, dns_server, timeout))
+            elif name == 'is_available':
+                results.append(bench_is_available(count, whois_server, timeout))
+            elif name == 'generate_domain':
+                results.append(bench_generate_domain(count, dns_server, timeout))
+            elif name == 'generate_domain_async':
+                results.append(bench_generate_domain_async(count, dns_server, whois_server,
+                                                           concurrency, whois_workers, timeout))
+            else:
+                raise ValueError(f"Unknown benchmark: {name}")
+    return results
+
+
+def format_ms(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lookup paths against local fake servers.")
+    parser.add_argument('benchmarks', nargs='*', default=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help="Domains per benchmark")
+    parser.add_argument('--latency', type=float, default=0.0, help="DNS answer delay in seconds")
+    parser.add_argument('--loss', type=float, default=0.0, help="Ratio of DNS queries left unanswered")
+    parser.add_argument('--nxdomain-ratio', type=float, default=fakeservers.DEFAULT_NXDOMAIN_RATIO)
+    parser.add_argument('--whois-latency', type=float, default=0.0, help="WHOIS reply delay in seconds")
+    parser.add_argument('--whois-loss', type=float, default=0.0, help="Ratio of WHOIS queries left unanswered")
+    parser.add_argument('--available-ratio', type=float, default=fakeservers.DEFAULT_AVAILABLE_RATIO)
+    parser.add_argument('--whois-port', type=int, default=0, help="WHOIS port (43 needs root; 0 picks a free one)")
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--whois-workers', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=1.0, help="Seconds allowed per lookup")
+    parser.add_argument('--json', action='store_true', help="Print one JSON line per benchmark")
+    parser.add_argument('--log-level', default='ERROR', help="Logging level (lost queries log warnings)")
+    args = parser.parse_args()
+    finddomain_ifexists.setup_logging(args.log_level)
+
+    results = run(args.count, args.benchmarks, args.latency, args.loss, args.nxdomain_ratio,
+                  args.whois_latency, args.whois_loss, args.available_ratio, args.whois_port,
+                  args.concurrency, args.whois_workers, args.timeout)
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{result['benchmark']:<22} {result['domains_per_sec']:>10.1f} domains/s"
+                  f"  p50 {format_ms(result['p50']):>7} ms  p99 {format_ms(result['p99']):>7} ms"
+                  f"  max RSS {result['max_rss_kb'] / 1024:.1f} MiB")
+
+if __name__ == '__main__':
+    main()
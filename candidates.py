@@ -0,0 +1,187 @@
+"""
+Wordlist and pattern candidate sources.
+
+Besides sweeping a whole keyspace, candidates can come from wordlists
+(plain or gzipped, millions of lines) and from patterns such as 'CVCV',
+'{word}ly' or 'get{word}'. Everything is streamed: a pattern is expanded
+lazily and wordlists are re-read rather than loaded.
+
+Big lists repeat themselves and overlap with what was already checked, so
+unique() drops candidates seen earlier in the stream (through a hashed
+bitset) or present in the result stores before they reach the DNS stage.
+"""
+import gzip
+import hashlib
+import math
+import re
+
+CONSONANTS = 'bcdfghjklmnpqrstvwxyz'
+VOWELS = 'aeiou'
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+DIGITS = '0123456789'
+
+# Pattern character classes; any other character is taken literally
+PATTERN_CLASSES = {
+    'C': CONSONANTS,
+    'V': VOWELS,
+    'L': LETTERS,
+    'D': DIGITS,
+    'A': LETTERS + DIGITS,
+    '?': LETTERS + DIGITS + '-',
+}
+
+LABEL = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')  # LDH rule
+
+DEFAULT_CAPACITY = 10_000_000  # Distinct candidates the filter is sized for
+DEFAULT_ERROR_RATE = 1e-6  # Chance a new candidate is wrongly taken for a duplicate
+
+
+def iter_wordlist(path):
+    """
+    Stream the words of a wordlist, one per line, lowercased.
+
+    Files ending in .gz are decompressed on the fly. Blank lines and lines
+    starting with '#' are skipped.
+
+    Yields:
+        str: Words, in file order.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                yield word
+
+
+def parse_pattern(pattern, words=None):
+    """
+    Split a pattern into parts, each a function returning the strings it stands for.
+
+    Syntax: C consonant, V vowel, L letter, D digit, A letter or digit,
+    ? letter, digit or hyphen, [abc] one of the listed characters,
+    {name} every word of words[name]; anything else is a literal.
+
+    Args:
+        pattern (str): e.g. 'CVCV', 'get{word}', '[xz]{word}DD'.
+        words (dict): name -> wordlist path or list of words.
+
+    Returns:
+        list: Callables returning an iterable of strings.
+
+    Raises:
+        ValueError: For an unterminated class or placeholder or an unknown wordlist.
+    """
+    words = words or {}
+    parts = []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char in '[{':
+            end = pattern.find(']' if char == '[' else '}', position)
+            if end < 0:
+                raise ValueError(f"Unterminated {char} in pattern {pattern!r}")
+            body = pattern[position + 1:end]
+            if char == '[':
+                parts.append(lambda chars=body.lower(): chars)
+            elif body not in words:
+                raise ValueError(f"Pattern {pattern!r} uses unknown wordlist {body!r}")
+            elif isinstance(words[body], str):
+                parts.append(lambda path=words[body]: iter_wordlist(path))
+            else:
+                parts.append(lambda values=words[body]: values)
+            position = end + 1
+            continue
+        chars = PATTERN_CLASSES.get(char, char.lower())
+        parts.append(lambda chars=chars: chars)
+        position += 1
+    return parts
+
+
+def expand_pattern(pattern, words=None):
+    """
+    Yield every label a pattern stands for, lazily, in lexical order of its parts.
+
+    Wordlist placeholders are streamed again for every combination of the
+    parts before them, so no list is held in memory.
+    """
+    parts = parse_pattern(pattern, words)
+
+    def expand(part, prefix):
+        if part == len(parts):
+            yield prefix
+            return
+        for piece in parts[part]():
+            yield from expand(part + 1, prefix + piece)
+
+    return expand(0, '')
+
+
+def with_tlds(labels, tlds=('com',)):
+    """Yield label.tld for every valid LDH label and TLD, skipping invalid labels."""
+    tlds = [tld.lstrip('.').lower() for tld in tlds]
+    for label in labels:
+        if LABEL.match(label):
+            for tld in tlds:
+                yield f"{label}.{tld}"
+
+
+class BloomFilter:
+    """
+    Hashed bitset answering "seen before?" in fixed memory.
+
+    It never misses a name that was added; a new name is wrongly reported as
+    seen with probability error_rate once `capacity` names are in.
+    10M names at 1e-6 take ~36MB, against ~1GB for a set of str.
+
+    Args:
+        capacity (int): Number of names the filter is sized for.
+        error_rate (float): False positive rate at capacity.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, name):
+        # Double hashing: position i = h1 + i * h2, from one 128-bit digest
+        digest = hashlib.blake2b(name.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, name):
+        return all(self._array[p >> 3] & (1 << (p & 7)) for p in self._positions(name))
+
+    def add(self, name):
+        """Add a name; return True if it was (probably) there already."""
+        seen = True
+        for p in self._positions(name):
+            mask = 1 << (p & 7)
+            if not self._array[p >> 3] & mask:
+                seen = False
+                self._array[p >> 3] |= mask
+        return seen
+
+
+def unique(domains, checked=(), seen=None):
+    """
+    Drop repeated candidates and the ones already in a result store.
+
+    Args:
+        domains (iterable): Candidate domains.
+        checked (iterable): Stores supporting `in`, e.g. the found and taken
+            sets or index views; a candidate in any of them is dropped.
+        seen (BloomFilter): Filter of candidates already passed on (default: a new one).
+
+    Yields:
+        str: Each new, unchecked candidate once.
+    """
+    seen = BloomFilter() if seen is None else seen
+    checked = tuple(checked)
+    for domain in domains:
+        if any(domain in store for store in checked):
+            continue
+        if not seen.add(domain):
+            yield domain
@@ -0,0 +1,567 @@
+"""
+Library API and command line interface.
+
+DomainChecker bundles the result stores of a keyspace with the lookup
+settings, so a service can embed the checker instead of going through
+main(). The command line exposes it as subcommands that read candidates from
+stdin and write one JSON object per line (NDJSON) to stdout, so it chains
+with other tools in a shell pipeline without temp files:
+
+    python checker.py sweep --resolver 8.8.8.8 > results.ndjson
+    python checker.py sweep --candidates - < words.txt
+    python checker.py sweep --pattern 'get{word}' --wordlist words.txt
+    echo xlt1.com | python checker.py check
+    python checker.py import --zone com.zone.gz
+    python checker.py export --state available --format text | grep -v '[0-9]'
+    python checker.py export --state available --pattern CVCV --format csv > today.csv
+    python checker.py diff lastweek.csv today.csv --to-state available
+    python checker.py estimate --samples 20
+    python checker.py sweep --by-yield --min-rate 0.2
+    python checker.py stats
+    python checker.py revalidate --limit 1000 --found-ttl 12
+
+Result files, the index and the other stores keep the names configured in
+finddomain_ifexists, relative to the working directory (see --directory).
+Progress metrics and logs go to stderr, so stdout only carries results.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import candidates
+import dnsprobe
+import domainindex
+import estimator
+import finddomain_ifexists
+import keyspace
+import lookupcache
+import metrics
+import report
+import resultsink
+import whoispool
+
+STATUSES = {name: state for state, name in domainindex.STATE_NAMES.items()}
+COMMANDS = ('sweep', 'check', 'estimate', 'import', 'export', 'diff', 'stats', 'revalidate')
+
+
+def outcome_status(outcome):
+    """Return the status ('available', 'taken' or 'error') a DNS probe outcome is recorded as."""
+    if outcome in dnsprobe.REGISTERED:
+        return 'taken'
+    if outcome == dnsprobe.NXDOMAIN:
+        return 'available'
+    return 'error'
+
+
+class DomainChecker:
+    """
+    The result stores of one keyspace plus lookup settings.
+
+    Opens the packed index on creation; use as a context manager, or call
+    close(), so the index snapshot and counters are saved.
+
+    Args:
+        space (keyspace.Keyspace): Keyspace whose index and result files are used.
+        index_path (str): Index file (default: the keyspace's variant of INDEX_FILE).
+        resolvers (list): (host, port) resolvers to query over raw UDP (see
+            udpdns.py); None uses the system resolver through dnspython.
+        concurrency (int): Maximum number of DNS queries in flight.
+        timeout (float): Timeout in seconds for each query.
+        retries (int): Extra attempts for queries that time out or fail.
+        cache (bool): Record every check in the lookup cache (see lookupcache.py).
+        ttls (dict): With cache, outcome -> seconds a check stays fresh before
+            revalidate() re-probes it (default: the cache's TTLs).
+        answer_cache (bool): Reuse DNS answers within their TTL, shared through
+            ANSWER_CACHE_FILE (see answercache.py). Only the raw UDP path keeps
+            the responses it caches, so the cache is opened only with resolvers;
+            the system resolver path does not use it.
+    """
+
+    def __init__(self, space=keyspace.DEFAULT, index_path=None, resolvers=None,
+                 concurrency=dnsprobe.DEFAULT_CONCURRENCY, timeout=dnsprobe.DEFAULT_TIMEOUT,
+                 retries=dnsprobe.DEFAULT_RETRIES, cache=True, answer_cache=True, ttls=None):
+        self.space = space
+        self.resolvers = resolvers
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.index = finddomain_ifexists.load_index(index_path, space)
+        self.found = self.index.view(domainindex.AVAILABLE)
+        self.taken = self.index.view(domainindex.TAKEN)
+        self.cache = finddomain_ifexists.get_lookup_cache(ttls) if cache else None
+        self.answer_cache = finddomain_ifexists.get_answer_cache() if answer_cache and resolvers else None
+        self._moved = {'found': set(), 'taken': set()}  # Old kind -> domains to drop from its result files
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Flush the results, save the index snapshot and counters and close the stores."""
+        self.flush()
+        if self.cache is not None:
+            self.cache.close()
+            finddomain_ifexists.lookup_cache = self.cache = None
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+            finddomain_ifexists.answer_cache = self.answer_cache = None
+        finddomain_ifexists.save_index(self.index)
+        self.index.close()
+        if finddomain_ifexists.prefix_counts is not None:
+            finddomain_ifexists.prefix_counts.save()
+
+    def status(self, domain):
+        """Return the recorded status of a domain, or None if it is outside the keyspace."""
+        if domain not in self.space:
+            return None
+        return domainindex.STATE_NAMES[self.index.get(domain)]
+
+    def record(self, domain, status, method='dns'):
+        """
+        Record a result for a domain of the keyspace in the result files and the index.
+
+        A domain that was found and is now taken, or the other way round, is
+        moved (see finddomain_ifexists.move_domain); its line in the old result
+        file goes on the next flush(). An error leaves an earlier found/taken
+        result in place, like a failed revalidation does.
+        """
+        if status in ('taken', 'available'):
+            kind, old_kind = ('taken', 'found') if status == 'taken' else ('found', 'taken')
+            if finddomain_ifexists.move_domain(domain, kind, self.found, self.taken, method):
+                self._moved[old_kind].add(domain)
+        elif domain not in self.found and domain not in self.taken:
+            finddomain_ifexists.add_error_domain(domain, self.found, method)
+
+    def flush(self):
+        """Write out the buffered results and drop moved domains from their old result files."""
+        resultsink.flush_all()
+        for kind, domains in self._moved.items():
+            if domains:
+                finddomain_ifexists.remove_results(kind, domains)
+                domains.clear()
+
+    def check(self, domains):
+        """
+        Look up domains, recorded or not, and yield each result as it completes.
+
+        Results for domains of the keyspace are recorded; others are only
+        reported.
+
+        Args:
+            domains (iterable): Domain names to check.
+
+        Yields:
+            dict: 'domain', 'status' ('available', 'taken' or 'error'),
+            'outcome' (the dnsprobe outcome) and 'attempts'.
+        """
+        results = dnsprobe.iter_probe(domains, self.concurrency, self.resolvers, cache=self.answer_cache,
+                                      timeout=self.timeout, retries=self.retries)
+        for domain, outcome, attempts in results:
+            status = outcome_status(outcome)
+            if domain in self.space:
+                self.record(domain, status)
+            yield {'domain': domain, 'status': status, 'outcome': outcome, 'attempts': attempts}
+        self.flush()
+
+    def sweep(self, domains=None, on_result=None, whois_workers=None, by_yield=False, min_rate=None):
+        """
+        Check the unchecked domains of the keyspace, or of a stream of candidates.
+
+        Without candidates the whole keyspace is swept from its checkpoint (see
+        finddomain_ifexists.generate_domain_async), or with by_yield bucket by
+        bucket, the most promising first (see finddomain_ifexists.sweep_by_yield).
+        Candidates already recorded or outside the keyspace are skipped; the
+        latter are counted as 'skipped'.
+
+        Args:
+            domains (iterable): Candidate domains (default: the whole keyspace).
+            on_result (callable): Called as on_result(domain, status) with each recorded result.
+            whois_workers (int): With the whole keyspace, WHOIS worker threads that
+                confirm the domains DNS reports as available; None skips WHOIS.
+            by_yield (bool): Order the keyspace sweep by the estimates of estimate().
+            min_rate (float): With by_yield, skip buckets whose availability
+                interval lies entirely below this rate.
+
+        Returns:
+            dict: Counts of 'taken', 'found' and 'failed' domains, and of each
+            outcome, plus 'skipped' with candidates.
+        """
+        if domains is None and by_yield:
+            return finddomain_ifexists.sweep_by_yield(
+                self.found, self.taken, min_rate=min_rate, concurrency=self.concurrency,
+                timeout=self.timeout, retries=self.retries, resolvers=self.resolvers, on_result=on_result)
+        if domains is None:
+            return finddomain_ifexists.generate_domain_async(
+                self.found, self.taken, concurrency=self.concurrency, timeout=self.timeout,
+                retries=self.retries, resolvers=self.resolvers, whois_workers=whois_workers,
+                on_result=on_result)
+        skipped = [0]
+
+        def in_space(domains):
+            for domain in domains:
+                if domain in self.space:
+                    yield domain
+                else:
+                    skipped[0] += 1
+
+        result = finddomain_ifexists.sweep_candidates(
+            self.found, self.taken, in_space(domains),
+            concurrency=self.concurrency, timeout=self.timeout, retries=self.retries,
+            resolvers=self.resolvers, on_result=on_result)
+        result['skipped'] = skipped[0]
+        return result
+
+    def revalidate(self, limit=None, batches=None, whois_workers=whoispool.DEFAULT_WORKERS):
+        """
+        Re-probe the checks that outlived their TTL, a batch at a time, sleeping in between.
+
+        Each batch re-probes up to `limit` stale domains, oldest first (see
+        finddomain_ifexists.revalidate_stale); then the loop sleeps until the
+        next entry of the lookup cache goes stale, so a long-running process
+        spreads the revalidation load instead of redoing whole sweeps.
+
+        Args:
+            limit (int): Maximum number of domains per batch (default: all stale ones).
+            batches (int): Number of batches to run (default: until interrupted,
+                or until the cache is empty).
+            whois_workers (int): WHOIS threads confirming taken domains that dropped.
+
+        Yields:
+            dict: Counts of each batch (see finddomain_ifexists.revalidate_stale).
+
+        Raises:
+            ValueError: If the checker was created without the lookup cache.
+        """
+        if self.cache is None:
+            raise ValueError("Revalidation needs the lookup cache")
+        done = 0
+        while True:
+            yield finddomain_ifexists.revalidate_stale(
+                self.found, self.taken, limit, concurrency=self.concurrency, resolvers=self.resolvers,
+                whois_workers=whois_workers, timeout=self.timeout, retries=self.retries)
+            done += 1
+            next_expiry = self.cache.next_expiry()
+            if (batches is not None and done >= batches) or next_expiry is None:
+                return
+            time.sleep(max(0.0, next_expiry - time.time()))
+
+    def estimate(self, samples=estimator.DEFAULT_SAMPLES, prefix_length=estimator.DEFAULT_PREFIX_LENGTH,
+                 on_result=None):
+        """
+        Sample every prefix bucket of the keyspace and return the availability estimates.
+
+        See finddomain_ifexists.estimate_availability; the samples add to the saved ones.
+
+        Returns:
+            list: Estimate dicts (see estimator.AvailabilityEstimator.estimate),
+            most promising bucket first.
+        """
+        estimates = finddomain_ifexists.estimate_availability(
+            self.found, self.taken, samples, finddomain_ifexists.get_estimates(self.space, prefix_length),
+            concurrency=self.concurrency, timeout=self.timeout, retries=self.retries,
+            resolvers=self.resolvers, on_result=on_result)
+        return [estimates.estimate(number) for number in estimates.ranking()]
+
+    def import_zone(self, path, origin=''):
+        """Mark the names delegated in a zone file as taken; see finddomain_ifexists.import_zone."""
+        return finddomain_ifexists.import_zone(path, self.found, self.taken, origin=origin)
+
+    def import_domains(self, domains, status):
+        """
+        Record a list of domains, e.g. from another tool, with a status.
+
+        Args:
+            domains (iterable): Domain names.
+            status (str): 'available', 'taken' or 'error'.
+
+        Returns:
+            dict: Counts of 'imported' domains and of 'skipped' ones outside the keyspace.
+        """
+        counts = {'imported': 0, 'skipped': 0}
+        for domain in domains:
+            if domain not in self.space:
+                counts['skipped'] += 1
+                continue
+            self.record(domain, status, method='import')
+            counts['imported'] += 1
+        self.flush()
+        return counts
+
+    def export(self, status):
+        """Yield the domains with a status ('unchecked', 'available', 'taken' or 'error') in keyspace order."""
+        return iter(self.index.view(STATUSES[status]))
+
+    def rows(self, statuses=('available',), pattern=None, since=None):
+        """
+        Stream the domains with some statuses, with the time and method of their last check.
+
+        See report.iter_rows; check times come from the lookup cache, so they
+        are None when it is disabled.
+
+        Args:
+            statuses (iterable): Status names.
+            pattern (str): Keep only the domains matching it (see report.pattern_regex).
+            since (float): Keep only the domains last checked at or after this Unix time.
+
+        Yields:
+            dict: 'domain', 'status', 'checked_at' and 'method', in keyspace order.
+        """
+        return report.iter_rows(self.index, statuses, pattern, self.cache, since)
+
+    def stats(self):
+        """Return the keyspace name and size and the number of domains per status."""
+        counts = self.index.counts()
+        stats = {'keyspace': self.space.name, 'size': self.space.size}
+        stats.update((name, counts[state]) for state, name in domainindex.STATE_NAMES.items())
+        return stats
+
+
+def read_domains(stream):
+    """Yield the domains of a text stream, one per line; blank lines and '#' comments are skipped."""
+    for line in stream:
+        domain = line.strip().lower().rstrip('.')
+        if domain and not domain.startswith('#'):
+            yield domain
+
+
+def qualify(names, tlds):
+    """
+    Yield domains as they are and bare words with each TLD (see candidates.with_tlds).
+
+    Words that are not valid labels are passed through, so the sweep counts
+    them as skipped rather than dropping them silently.
+    """
+    for name in names:
+        if '.' in name or not candidates.LABEL.match(name):
+            yield name
+        else:
+            yield from candidates.with_tlds([name], tlds)
+
+
+def sweep_candidates(args, tlds):
+    """
+    Return the candidate stream of a sweep command, or None for the keyspace.
+
+    --candidates lines and --pattern expansions may be domains or bare words;
+    --wordlist alone sweeps its words, or with --pattern fills its {word}.
+    """
+    sources = []
+    if args.candidates:
+        sources.append(read_domains(open_input(args.candidates)))
+    if args.pattern:
+        sources.append(candidates.expand_pattern(args.pattern, {'word': args.wordlist} if args.wordlist else None))
+    elif args.wordlist:
+        sources.append(candidates.iter_wordlist(args.wordlist))
+    if not sources:
+        return None
+    return qualify((name for source in sources for name in source), tlds)
+
+
+def write_ndjson(record, stream=None):
+    """Write one JSON object as a line."""
+    (stream or sys.stdout).write(json.dumps(record) + '\n')
+
+
+def parse_hours(text):
+    """Parse a number of hours into seconds."""
+    return float(text) * lookupcache.HOUR
+
+
+def parse_resolver(text):
+    """Parse 'host' or 'host:port' into a (host, port) tuple, port 53 by default."""
+    host, _, port = text.rpartition(':') if text.count(':') == 1 else (text, '', '')
+    return host, int(port) if port else 53
+
+
+def open_input(path):
+    """Return a text stream for a file name, '-' being stdin."""
+    return sys.stdin if path == '-' else open(path, 'r')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Find unregistered domains. Results are written to stdout as NDJSON.")
+    parser.add_argument('--directory', help="Directory holding the result files (default: current)")
+    parser.add_argument('--length', type=int, default=keyspace.DEFAULT.length, help="Name length of the keyspace")
+    parser.add_argument('--tld', action='append', help="TLD of the keyspace, repeatable (default: com)")
+    parser.add_argument('--index', help="Index file (default: per keyspace)")
+    parser.add_argument('--resolver', action='append', type=parse_resolver,
+                        help="Resolver host[:port] to query over raw UDP, repeatable (default: system resolver)")
+    parser.add_argument('--concurrency', type=int, default=dnsprobe.DEFAULT_CONCURRENCY)
+    parser.add_argument('--timeout', type=float, default=dnsprobe.DEFAULT_TIMEOUT, help="Seconds per query")
+    parser.add_argument('--retries', type=int, default=dnsprobe.DEFAULT_RETRIES)
+    parser.add_argument('--no-answer-cache', dest='answer_cache', action='store_false',
+                        help="Always ask the resolvers, even for answers still within their TTL "
+                             "(the answer cache is only used with --resolver)")
+    parser.add_argument('--fsync', action='store_true',
+                        help="fsync the result files after every batch, so results survive a power loss")
+    parser.add_argument('--log-level', default=finddomain_ifexists.LOG_LEVEL)
+    commands = parser.add_subparsers(dest='command')
+
+    sweep = commands.add_parser('sweep', help="Check the unchecked domains of the keyspace or of a candidate list")
+    sweep.add_argument('--candidates', help="File of candidate domains or words, '-' for stdin "
+                                            "(default: the keyspace); words get each --tld")
+    sweep.add_argument('--pattern', help="Candidate names such as CVCV or get{word}; names get each --tld")
+    sweep.add_argument('--wordlist', help="Wordlist (optionally gzipped) for {word} in --pattern, "
+                                          "or of candidate words on its own")
+    sweep.add_argument('--whois-workers', type=int, default=whoispool.DEFAULT_WORKERS,
+                       help="WHOIS threads confirming keyspace finds, 0 for DNS only")
+    sweep.add_argument('--by-yield', action='store_true',
+                       help="Sweep the most promising buckets first, by the estimates of `estimate`")
+    sweep.add_argument('--min-rate', type=float,
+                       help="With --by-yield, skip buckets whose availability is surely below this rate")
+
+    check = commands.add_parser('check', help="Look up domains, recorded or not")
+    check.add_argument('domains', nargs='*', help="Domains to check (default: read from stdin)")
+
+    estimate = commands.add_parser('estimate', help="Sample every prefix bucket and print availability estimates")
+    estimate.add_argument('--samples', type=int, default=estimator.DEFAULT_SAMPLES, help="Lookups per bucket")
+    estimate.add_argument('--prefix-length', type=int, default=estimator.DEFAULT_PREFIX_LENGTH)
+
+    import_ = commands.add_parser('import', help="Record domains from a zone file or a list")
+    source = import_.add_mutually_exclusive_group(required=True)
+    source.add_argument('--zone', help="Zone file (optionally gzipped) whose delegations are marked taken")
+    source.add_argument('--list', help="File of domains, '-' for stdin, recorded with --state")
+    import_.add_argument('--state', choices=('available', 'taken', 'error'), default='taken')
+    import_.add_argument('--origin', default='', help="Origin for relative names in the zone file")
+
+    export = commands.add_parser('export', help="List the domains with a status")
+    export.add_argument('--state', choices=sorted(STATUSES), action='append',
+                        help="Status to list, repeatable (default: available)")
+    export.add_argument('--pattern', help="Only names matching a pattern such as CVCV, x* or [xz]DD.net")
+    export.add_argument('--since', type=report.parse_time,
+                        help="Only domains last checked at or after an ISO 8601 date/time or Unix time")
+    export.add_argument('--format', choices=('ndjson', 'text', 'csv', 'parquet'), default='ndjson')
+    export.add_argument('--output', help="Output file, required for parquet (default: stdout)")
+
+    diff = commands.add_parser('diff', help="List the domains whose status differs between two exports")
+    diff.add_argument('old', help="Earlier CSV or NDJSON export, '-' for stdin")
+    diff.add_argument('new', help="Later CSV or NDJSON export of the same keyspace")
+    diff.add_argument('--to-state', choices=sorted(STATUSES), help="Only changes to this status")
+    diff.add_argument('--by-name', action='store_true',
+                      help="The exports are sorted by name (e.g. with sort(1)) rather than in keyspace order")
+
+    commands.add_parser('stats', help="Count the domains per status")
+
+    revalidate = commands.add_parser('revalidate', help="Re-probe the checks that outlived their TTL, "
+                                                        "sleeping until the next one expires between batches")
+    revalidate.add_argument('--limit', type=int, help="Domains per batch (default: all stale ones)")
+    revalidate.add_argument('--batches', type=int, help="Stop after this many batches (default: run until stopped)")
+    revalidate.add_argument('--whois-workers', type=int, default=whoispool.DEFAULT_WORKERS,
+                            help="WHOIS threads confirming taken domains that dropped out of DNS")
+    for outcome in (lookupcache.FOUND, lookupcache.TAKEN, lookupcache.ERROR):
+        revalidate.add_argument(f'--{outcome}-ttl', type=parse_hours, metavar='HOURS',
+                                help=f"Hours a {outcome} check stays fresh "
+                                     f"(default: {lookupcache.DEFAULT_TTLS[outcome] / lookupcache.HOUR:g})")
+    return parser
+
+
+def export(checker, args):
+    """Write the rows of an export command in the requested format."""
+    rows = checker.rows(args.state or ('available',), args.pattern, args.since)
+    if args.format == 'parquet':
+        if not args.output:
+            raise SystemExit("export --format parquet needs --output")
+        try:
+            report.write_parquet(rows, args.output)
+        except RuntimeError as exc:  # pyarrow is not installed
+            raise SystemExit(str(exc)) from None
+        return
+    with (open(args.output, 'w', newline='') if args.output else contextlib.nullcontext(sys.stdout)) as stream:
+        if args.format == 'csv':
+            report.write_csv(rows, stream)
+        elif args.format == 'text':
+            for row in rows:
+                stream.write(row['domain'] + '\n')
+        else:
+            for row in rows:
+                write_ndjson(row, stream)
+
+
+def run(args):
+    """Run a parsed command line."""
+    space = keyspace.Keyspace(args.length, tuple(args.tld or ('com',)))
+    ttls = None
+    if args.command == 'revalidate':
+        given = {outcome: getattr(args, f'{outcome}_ttl') for outcome in lookupcache.DEFAULT_TTLS}
+        if any(ttl is not None for ttl in given.values()):
+            ttls = {outcome: lookupcache.DEFAULT_TTLS[outcome] if ttl is None else ttl
+                    for outcome, ttl in given.items()}
+    with DomainChecker(space, args.index, args.resolver, args.concurrency, args.timeout, args.retries,
+                       answer_cache=args.answer_cache, ttls=ttls) as checker:
+        if args.command == 'sweep':
+            try:
+                domains = sweep_candidates(args, space.tlds)
+            except ValueError as exc:  # Malformed pattern
+                raise SystemExit(str(exc)) from None
+            with metrics.Reporter():
+                result = checker.sweep(
+                    domains, on_result=lambda domain, status: write_ndjson({'domain': domain, 'status': status}),
+                    whois_workers=args.whois_workers or None, by_yield=args.by_yield, min_rate=args.min_rate)
+            write_ndjson(result, sys.stderr)
+        elif args.command == 'check':
+            domains = [domain.lower() for domain in args.domains] or read_domains(sys.stdin)
+            for result in checker.check(domains):
+                write_ndjson(result)
+        elif args.command == 'estimate':
+            for estimate in checker.estimate(args.samples, args.prefix_length):
+                write_ndjson(estimate)
+        elif args.command == 'import':
+            if args.zone:
+                write_ndjson(checker.import_zone(args.zone, args.origin))
+            else:
+                write_ndjson(checker.import_domains(read_domains(open_input(args.list)), args.state))
+        elif args.command == 'export':
+            export(checker, args)
+        elif args.command == 'diff':
+            key = None if args.by_name else space.to_index
+            old, new = open_input(args.old), open_input(args.new)
+            try:
+                for change in report.diff_snapshots(report.read_snapshot(old), report.read_snapshot(new), key):
+                    if args.to_state is None or change['new'] == args.to_state:
+                        write_ndjson(change)
+            finally:
+                for stream in (old, new):
+                    if stream is not sys.stdin:
+                        stream.close()
+        elif args.command == 'revalidate':
+            for result in checker.revalidate(args.limit, args.batches, args.whois_workers):
+                write_ndjson(result)
+        else:
+            write_ndjson(checker.stats())
+
+
+def main(argv=None):
+    """
+    Command line entry point; without a subcommand the keyspace is swept.
+
+    Args:
+        argv (list): Arguments (default: sys.argv[1:]).
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not any(arg in COMMANDS for arg in argv):
+        argv.append('sweep')
+    args = build_parser().parse_args(argv)
+    finddomain_ifexists.setup_logging(args.log_level)
+    if args.fsync:
+        resultsink.configure(fsync=True)
+    if args.directory:
+        os.chdir(args.directory)
+    resultsink.install_signal_handlers()
+    try:
+        run(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly like other filters
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Sweep checkpoint: a cursor into the keyspace saved at regular intervals.
+
+Every keyspace index below the cursor has been dealt with, so a restarted
+sweep can continue from there instead of walking the keyspace from the start.
+"""
+import json
+import os
+import time
+
+DEFAULT_EVERY = 1000  # Save after this many cursor updates
+DEFAULT_INTERVAL = 30.0  # ... or after this many seconds, whichever comes first
+
+
+class Checkpoint:
+    """
+    A keyspace cursor persisted to a small JSON file.
+
+    Args:
+        path (str): File the cursor is saved to.
+        every (int): Number of updates between saves.
+        interval (float): Maximum seconds between saves.
+        before_save (callable): Called before every save, e.g. to flush buffered
+            results so the cursor never gets ahead of what is on disk.
+    """
+
+    def __init__(self, path, every=DEFAULT_EVERY, interval=DEFAULT_INTERVAL, before_save=None):
+        self.path = path
+        self.before_save = before_save
+        self.every = every
+        self.interval = interval
+        self.cursor = 0
+        self._updates = 0
+        self._saved_at = time.monotonic()
+
+    def load(self):
+        """Return the saved cursor (0 if there is no checkpoint yet) and make it current."""
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.cursor = json.load(f)['cursor']
+        return self.cursor
+
+    def update(self, cursor):
+        """
+        Move the cursor and save it if enough updates or time have passed.
+
+        Args:
+            cursor (int): First keyspace index not yet dealt with.
+
+        Returns:
+            bool: True if the checkpoint was saved by this update.
+        """
+        self.cursor = cursor
+        self._updates += 1
+        if self._updates >= self.every or time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+            return True
+        return False
+
+    def save(self):
+        """Write the current cursor to disk atomically."""
+        if self.before_save is not None:
+            self.before_save()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'cursor': self.cursor}, f)
+        os.replace(tmp_path, self.path)
+        self._updates = 0
+        self._saved_at = time.monotonic()
@@ -0,0 +1,525 @@
+"""
+Asyncio DNS probe engine.
+
+has_dns_record resolves one domain at a time, so a sweep is limited by the
+round-trip time of every single NS query. This module keeps a configurable
+number of NS queries in flight at once, with a per-query timeout.
+
+Every probe ends in one of five outcomes instead of a plain True/False, so a
+timeout or a server failure is never mistaken for "not registered". Domains
+with a transient outcome go into a RetryQueue and are probed again after a
+backoff, up to a capped number of attempts, without holding up the sweep.
+
+An AdaptiveConcurrency controller keeps an AIMD limit per resolver: the
+number of queries in flight grows while latency and the timeout/SERVFAIL rate
+stay healthy and is cut sharply when they degrade, so the sweep neither
+underuses a resolver nor gets rate-limited into a wave of timeouts. Without
+direct resolvers the system resolver gets such a limit too, as the
+controller's single SYSTEM_RESOLVER.
+
+dnspython is only imported by resolve_ns; sweeps over raw UDP (udpdns.py)
+never load it, which keeps start-up fast.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import sys
+import time
+
+import udpdns
+from metrics import METRICS
+
+DEFAULT_CONCURRENCY = 200  # NS queries kept in flight at once
+DEFAULT_TIMEOUT = 2.0  # Seconds allowed for a single query
+DEFAULT_RETRIES = 2  # Extra attempts after a timeout or server failure
+DEFAULT_BACKOFF = 0.5  # Seconds before the first retry, doubled each time
+
+DEFAULT_INITIAL_LIMIT = 20  # Queries in flight per resolver before any feedback
+SYSTEM_RESOLVER = 'system'  # Stands for the system resolver in AdaptiveConcurrency and metrics
+DEFAULT_TARGET_LATENCY = 0.5  # Seconds; a slower smoothed latency means the resolver is congested
+DEFAULT_MAX_ERROR_RATE = 0.05  # Smoothed share of timeouts and server failures tolerated
+DEFAULT_DECREASE = 0.5  # Factor the limit is cut by on congestion
+SMOOTHING = 0.02  # Weight of the newest answer in the moving averages (~50 answer window)
+
+# Probe outcomes
+NXDOMAIN = 'nxdomain'  # The name does not exist: might be available
+HAS_NS = 'has_ns'  # The name is delegated: registered
+NO_ANSWER = 'no_answer'  # The name exists but has no NS records: registered
+TIMEOUT = 'timeout'  # No answer in time
+SERVER_ERROR = 'server_error'  # SERVFAIL, REFUSED or another resolver failure
+
+REGISTERED = (HAS_NS, NO_ANSWER)
+TRANSIENT = (TIMEOUT, SERVER_ERROR)
+
+_DONE = object()  # Marks a worker as finished in the results queue
+
+
+async def resolve_ns(domain, timeout=DEFAULT_TIMEOUT, resolver=None):
+    """
+    Look up the NS records of a domain without blocking the event loop.
+
+    Args:
+        domain (str): The domain name to check.
+        timeout (float): Lifetime in seconds for the query.
+        resolver (dns.asyncresolver.Resolver): Resolver to use (default: system resolver).
+
+    Returns:
+        str: One of the probe outcomes.
+    """
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+    resolver = resolver or dns.asyncresolver.get_default_resolver()
+    try:
+        await resolver.resolve(domain, 'NS', lifetime=timeout)
+        return HAS_NS
+    except dns.resolver.NXDOMAIN:
+        return NXDOMAIN
+    except dns.resolver.NoAnswer:
+        return NO_ANSWER
+    except dns.exception.Timeout:
+        return TIMEOUT
+    except dns.resolver.NoNameservers:
+        return SERVER_ERROR
+
+
+def _is_dns_timeout(exc):
+    """Return True for a dnspython timeout (which can only happen once dnspython is loaded)."""
+    dns_exception = sys.modules.get('dns.exception')
+    return dns_exception is not None and isinstance(exc, dns_exception.Timeout)
+
+
+def classify_response(response):
+    """Map a udpdns.DNSResponse to a probe outcome."""
+    if response.status == udpdns.NXDOMAIN:
+        return NXDOMAIN
+    if response.status == udpdns.NOERROR:
+        return HAS_NS if response.answer_count else NO_ANSWER
+    if response.status == udpdns.TIMEOUT:
+        return TIMEOUT
+    return SERVER_ERROR
+
+
+def udp_query(client):
+    """
+    Return a query function for probe() that asks through a udpdns.UDPClient.
+
+    The function takes an optional resolver keyword, a (ip, port) tuple of the
+    client, so AdaptiveConcurrency can choose the resolver of each query.
+    """
+    async def query(domain, timeout, resolver=None):
+        return classify_response(await client.query(domain, 'NS', timeout, resolver))
+    return query
+
+
+def system_query(query):
+    """
+    Return a query function taking the resolver keyword AdaptiveConcurrency
+    passes, for a query function that always asks the system resolver.
+
+    The system resolver is then the controller's one SYSTEM_RESOLVER, so its
+    AIMD limit backs off when the local resolver starts timing out.
+    """
+    async def adapted(domain, timeout, resolver=None):
+        return await query(domain, timeout)
+    return adapted
+
+
+def resolver_name(resolver):
+    """Return the metrics label of a resolver, e.g. '8.8.8.8:53'."""
+    if isinstance(resolver, tuple):
+        return ':'.join(str(part) for part in resolver)
+    return str(resolver)
+
+
+async def probe(domain, query=resolve_ns, timeout=DEFAULT_TIMEOUT):
+    """
+    Probe one domain once.
+
+    Args:
+        domain (str): The domain name to check.
+        query (coroutine function): Called as query(domain, timeout), returns an outcome.
+        timeout (float): Timeout in seconds for the attempt.
+
+    Returns:
+        str: The outcome; exceptions from the query become TIMEOUT or SERVER_ERROR.
+    """
+    started = time.monotonic()
+    METRICS.add_gauge('dns_in_flight', 1)
+    try:
+        outcome = await asyncio.wait_for(query(domain, timeout), timeout)
+    except asyncio.TimeoutError:
+        outcome = TIMEOUT
+    except Exception as exc:
+        outcome = TIMEOUT if _is_dns_timeout(exc) else SERVER_ERROR
+    finally:
+        METRICS.add_gauge('dns_in_flight', -1)
+    METRICS.observe('dns_latency_seconds', time.monotonic() - started)
+    METRICS.inc('dns_lookups_total', outcome=outcome)
+    return outcome
+
+
+class RetryQueue:
+    """
+    Domains waiting for another attempt after a transient outcome.
+
+    Each push schedules the domain after an exponential backoff; once a domain
+    has used up max_attempts it is refused and its last outcome is final.
+
+    Args:
+        max_attempts (int): Total attempts allowed per domain, the first one included.
+        backoff (float): Delay before the first retry, doubled for each further retry.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_RETRIES + 1, backoff=DEFAULT_BACKOFF):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._heap = []  # (due time, sequence, domain, attempts made)
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, domain, attempts):
+        """
+        Schedule another attempt for a domain.
+
+        Args:
+            domain (str): The domain that failed.
+            attempts (int): Attempts made so far.
+
+        Returns:
+            bool: False if the domain has no attempts left.
+        """
+        if attempts >= self.max_attempts:
+            return False
+        due = time.monotonic() + self.backoff * 2 ** (attempts - 1)
+        heapq.heappush(self._heap, (due, next(self._sequence), domain, attempts))
+        return True
+
+    def pop_due(self):
+        """Return (domain, attempts made) for the next domain due, or None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, domain, attempts = heapq.heappop(self._heap)
+            return domain, attempts
+        return None
+
+    def wait_time(self):
+        """Return seconds until the next domain is due (0 if one is due now), None if empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+
+class AIMDLimit:
+    """
+    Additive-increase/multiplicative-decrease limit on the queries in flight to one resolver.
+
+    Each healthy answer raises the limit by 1/limit, i.e. by one query per
+    round of `limit` answers. Once the smoothed latency of successful answers
+    exceeds target_latency, or the smoothed share of timeouts and server
+    failures exceeds max_error_rate, the limit is multiplied by `decrease`,
+    at most once per round so a single burst of failures does not collapse it.
+
+    Args:
+        initial (int): Starting limit.
+        minimum (int): The limit never drops below this.
+        maximum (int): The limit never grows above this.
+        target_latency (float): Smoothed latency in seconds treated as congestion.
+        max_error_rate (float): Smoothed failure share treated as congestion.
+        decrease (float): Factor applied to the limit on congestion.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_LIMIT, minimum=1, maximum=DEFAULT_CONCURRENCY,
+                 target_latency=DEFAULT_TARGET_LATENCY, max_error_rate=DEFAULT_MAX_ERROR_RATE,
+                 decrease=DEFAULT_DECREASE):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.decrease = decrease
+        self.in_flight = 0
+        self.latency = None  # Smoothed latency of successful answers
+        self.error_rate = 0.0  # Smoothed share of transient outcomes
+        self._cooldown = 0  # Answers to wait for before the next decrease
+
+    def has_room(self):
+        """Return True if another query may be sent."""
+        return self.in_flight < int(self.limit)
+
+    def congested(self):
+        """Return True if the latency or failure averages are above their thresholds."""
+        return (self.error_rate > self.max_error_rate
+                or (self.latency is not None and self.latency > self.target_latency))
+
+    def record(self, outcome, latency):
+        """
+        Update the averages and the limit with one answer.
+
+        Args:
+            outcome (str): The probe outcome.
+            latency (float): Seconds the query took.
+
+        Returns:
+            bool: True if the limit was cut.
+        """
+        failed = outcome in TRANSIENT
+        self.error_rate += SMOOTHING * (failed - self.error_rate)
+        if not failed:
+            self.latency = latency if self.latency is None else self.latency + SMOOTHING * (latency - self.latency)
+        self._cooldown = max(0, self._cooldown - 1)
+        if self.congested():
+            if self._cooldown:
+                return False
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._cooldown = int(self.limit)
+            return True
+        if not failed:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        return False
+
+
+class AdaptiveConcurrency:
+    """
+    Per-resolver AIMD limits, handing each query to the resolver with the most room.
+
+    probe_many() acquires a slot before every query and releases it with the
+    outcome and latency. The limit, in-flight count, smoothed latency and
+    failure rate of every resolver are published as gauges labelled with
+    resolver_name(), and every cut increments dns_backoffs_total.
+
+    Args:
+        resolvers (list): Resolvers passed to the query function, e.g. (ip, port) tuples.
+        metrics (metrics.Metrics): Registry the state is published to.
+        **limit_args: Passed on to AIMDLimit for each resolver.
+    """
+
+    def __init__(self, resolvers, metrics=METRICS, **limit_args):
+        self.limits = {resolver: AIMDLimit(**limit_args) for resolver in resolvers}
+        if not self.limits:
+            raise ValueError("AdaptiveConcurrency needs at least one resolver")
+        self.metrics = metrics
+        self._released = asyncio.Event()
+        for resolver in self.limits:
+            self._publish(resolver)
+
+    def total_limit(self):
+        """Return the sum of the current per-resolver limits."""
+        return sum(int(limit.limit) for limit in self.limits.values())
+
+    async def acquire(self):
+        """Wait for a free slot and return the resolver it belongs to."""
+        while True:
+            resolver, limit = max(self.limits.items(), key=lambda item: item[1].limit - item[1].in_flight)
+            if limit.has_room():
+                limit.in_flight += 1
+                self._publish(resolver)
+                return resolver
+            self._released.clear()
+            await self._released.wait()
+
+    def release(self, resolver, outcome, latency):
+        """Free the slot taken by acquire() and feed the answer to the resolver's limit."""
+        limit = self.limits[resolver]
+        limit.in_flight -= 1
+        if limit.record(outcome, latency):
+            self.metrics.inc('dns_backoffs_total', resolver=resolver_name(resolver))
+        self._publish(resolver)
+        self._released.set()
+
+    def _publish(self, resolver):
+        limit = self.limits[resolver]
+        name = resolver_name(resolver)
+        self.metrics.set_gauge('dns_concurrency_limit', int(limit.limit), resolver=name)
+        self.metrics.set_gauge('dns_resolver_in_flight', limit.in_flight, resolver=name)
+        self.metrics.set_gauge('dns_resolver_error_rate', round(limit.error_rate, 4), resolver=name)
+        if limit.latency is not None:
+            self.metrics.set_gauge('dns_resolver_latency_seconds', round(limit.latency, 6), resolver=name)
+
+
+async def probe_many(domains, concurrency=DEFAULT_CONCURRENCY, query=resolve_ns,
+                     timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                     controller=None):
+    """
+    Probe many domains with at most `concurrency` queries in flight.
+
+    Domains are pulled lazily from the iterable, so a generator over the whole
+    keyspace can be passed without building a list first. Transient outcomes go
+    through a RetryQueue; a worker takes due retries before new domains and
+    does not sit idle during a backoff.
+
+    Args:
+        domains (iterable): Domain names to check.
+        concurrency (int): Maximum number of queries in flight.
+        query (coroutine function): Called as query(domain, timeout), returns an outcome.
+        timeout (float): Timeout in seconds for each attempt.
+        retries (int): Extra attempts for transient outcomes.
+        backoff (float): Delay before the first retry, doubled for each further retry.
+        controller (AdaptiveConcurrency): Per-resolver limits to respect; each
+            query is then sent as query(domain, timeout, resolver=...) to the
+            resolver the controller picks. `concurrency` stays the overall cap.
+
+    Yields:
+        tuple: (domain, outcome, attempts) in completion order. Only final
+        outcomes are yielded, transient ones after the last attempt.
+    """
+    pending = iter(domains)
+    exhausted = False
+    retry = RetryQueue(retries + 1, backoff)
+    results = asyncio.Queue(maxsize=concurrency * 2)
+    METRICS.set_gauge('dns_retry_queue', retry.__len__)
+
+    async def worker():
+        nonlocal exhausted
+        try:
+            while True:
+                item = retry.pop_due()
+                if item is not None:
+                    domain, attempts = item
+                elif not exhausted:
+                    # Workers share one iterator; next() never awaits so this is safe.
+                    domain, attempts = next(pending, None), 0
+                    if domain is None:
+                        exhausted = True
+                        continue
+                elif len(retry):
+                    await asyncio.sleep(retry.wait_time())
+                    continue
+                else:
+                    return
+                if controller is None:
+                    outcome = await probe(domain, query, timeout)
+                else:
+                    # Waiting for a slot happens outside probe(), so it never counts as a timeout
+                    resolver = await controller.acquire()
+                    started = time.monotonic()
+                    outcome = TIMEOUT  # Released with if the sweep is cancelled mid-query
+                    try:
+                        outcome = await probe(domain, functools.partial(query, resolver=resolver), timeout)
+                    finally:
+                        controller.release(resolver, outcome, time.monotonic() - started)
+                attempts += 1
+                if outcome in TRANSIENT and retry.push(domain, attempts):
+                    METRICS.inc('dns_retries_total')
+                    continue
+                await results.put((domain, outcome, attempts))
+        finally:
+            await results.put(_DONE)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < len(workers):
+            item = await results.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+def iter_probe(domains, concurrency=DEFAULT_CONCURRENCY, resolvers=None, adaptive=True, cache=None,
+               **probe_args):
+    """
+    Run probe_many on a private event loop and yield its results to synchronous code.
+
+    Results are yielded as they complete, so a caller can stream them (e.g. as
+    NDJSON) without collecting the whole sweep first. Stopping the iteration
+    early cancels the queries still in flight.
+
+    Args:
+        domains (iterable): Domain names to check.
+        concurrency (int): Maximum number of queries in flight.
+        resolvers (list): (host, port) resolvers to query directly over one UDP
+            socket with udpdns.UDPClient, instead of going through dns.asyncresolver.
+        adaptive (bool): Adapt the queries in flight to each resolver with an
+            AdaptiveConcurrency controller, capped by `concurrency`; without
+            resolvers the system resolver is the controller's only resolver.
+        cache (answercache.AnswerCache): With resolvers, answer from and fill
+            this cache of DNS responses.
+        **probe_args: Passed on to probe_many() (query, timeout, retries, backoff).
+
+    Yields:
+        tuple: (domain, outcome, attempts) in completion order.
+    """
+    loop = asyncio.new_event_loop()
+    client = None
+    try:
+        if resolvers is not None:
+            client = udpdns.UDPClient(resolvers, cache=cache)
+            loop.run_until_complete(client.open())
+            probe_args = dict(probe_args, query=udp_query(client))
+            if adaptive:
+                probe_args['controller'] = AdaptiveConcurrency(
+                    client.resolvers, initial=min(DEFAULT_INITIAL_LIMIT, concurrency), maximum=concurrency)
+        elif adaptive and 'controller' not in probe_args:
+            probe_args = dict(probe_args, query=system_query(probe_args.get('query', resolve_ns)))
+            probe_args['controller'] = AdaptiveConcurrency(
+                [SYSTEM_RESOLVER], initial=min(DEFAULT_INITIAL_LIMIT, concurrency), maximum=concurrency)
+        results = probe_many(domains, concurrency, **probe_args)
+        try:
+            while True:
+                try:
+                    item = loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            loop.run_until_complete(results.aclose())
+    finally:
+        if client is not None:
+            client.close()
+        # Let the cancelled workers finish before the loop goes away
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+
+def sweep(domains, on_taken, on_found, on_failed=None, concurrency=DEFAULT_CONCURRENCY,
+          resolvers=None, adaptive=True, cache=None, **probe_args):
+    """
+    Run probe_many to completion and report every answer through callbacks.
+
+    Domains whose attempts all ended in a transient outcome are not recorded as
+    taken or found; they are reported to on_failed so they can be kept apart
+    and checked again later.
+
+    Args:
+        domains (iterable): Domain names to check.
+        on_taken (callable): Called with each registered domain (HAS_NS or NO_ANSWER).
+        on_found (callable): Called with each domain that does not exist (NXDOMAIN).
+        on_failed (callable): Called with each domain that kept failing (optional).
+        concurrency (int): Maximum number of queries in flight.
+        resolvers (list): (host, port) resolvers to query directly over one UDP
+            socket with udpdns.UDPClient, instead of going through dns.asyncresolver.
+        adaptive (bool): Adapt the queries in flight to each resolver with an
+            AdaptiveConcurrency controller, capped by `concurrency`; without
+            resolvers the system resolver is the controller's only resolver.
+        cache (answercache.AnswerCache): With resolvers, answer from and fill
+            this cache of DNS responses.
+        **probe_args: Passed on to probe_many() (query, timeout, retries, backoff).
+
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains, and of each final outcome.
+    """
+    counts = {'taken': 0, 'found': 0, 'failed': 0}
+    for domain, outcome, _ in iter_probe(domains, concurrency, resolvers, adaptive, cache, **probe_args):
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome in REGISTERED:
+            counts['taken'] += 1
+            on_taken(domain)
+        elif outcome == NXDOMAIN:
+            counts['found'] += 1
+            on_found(domain)
+        else:
+            counts['failed'] += 1
+            if on_failed is not None:
+                on_failed(domain)
+    return counts
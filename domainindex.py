@@ -0,0 +1,238 @@
+"""
+Packed, memory-mapped index of a whole keyspace.
+
+Each candidate domain gets a 2-bit state, four domains to a byte, so the full
+~1.8M 4-character .com keyspace fits in ~440KB instead of millions of str
+objects in sets, and the ~66M 5-character one in ~16MB.
+The file is memory-mapped, so opening it costs nothing and changes are shared
+with any other process that maps the same file.
+"""
+import mmap
+import os
+import re
+
+import keyspace
+
+UNCHECKED = 0
+AVAILABLE = 1
+TAKEN = 2
+ERROR = 3
+STATES = (UNCHECKED, AVAILABLE, TAKEN, ERROR)
+STATE_NAMES = {UNCHECKED: 'unchecked', AVAILABLE: 'available', TAKEN: 'taken', ERROR: 'error'}
+
+ENTRIES_PER_BYTE = 4
+
+
+def _fields(byte):
+    """Return the four 2-bit states packed into one byte, lowest entry first."""
+    return [(byte >> (2 * slot)) & 3 for slot in range(ENTRIES_PER_BYTE)]
+
+
+# For each state, a translate() table mapping a byte to how many of its entries
+# are in that state. Counting is then translate() + sum(), both done in C.
+_COUNT_TABLES = {
+    state: bytes(_fields(byte).count(state) for byte in range(256))
+    for state in STATES
+}
+
+# For each state, a regex matching any byte with at least one entry in that state,
+# used to jump over whole runs of bytes that can not contain a match.
+_STATE_PATTERNS = {
+    state: re.compile(b'[' + b''.join(
+        re.escape(bytes([byte])) for byte in range(256) if state in _fields(byte)
+    ) + b']')
+    for state in STATES
+}
+
+
+class DomainIndex:
+    """
+    A memory-mapped array of 2-bit domain states indexed by keyspace position.
+
+    Args:
+        path (str): File backing the index, created (all UNCHECKED) if missing.
+        size (int): Number of entries (default: the whole keyspace).
+        space (keyspace.Keyspace): Keyspace mapping domains to entries
+            (default: the 4-character .com keyspace).
+    """
+
+    def __init__(self, path, size=None, space=keyspace.DEFAULT):
+        self.path = path
+        self.space = space
+        self.size = space.size if size is None else size
+        nbytes = (self.size + ENTRIES_PER_BYTE - 1) // ENTRIES_PER_BYTE
+        self.created = not os.path.exists(path)
+        with open(path, 'a+b') as f:
+            if os.path.getsize(path) != nbytes:
+                f.truncate(nbytes)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Flush changes to disk and unmap the file."""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+    def flush(self):
+        """Write pending changes to disk."""
+        self._map.flush()
+
+    def clear(self):
+        """Reset every entry to UNCHECKED."""
+        self._map[:] = bytes(len(self._map))
+
+    def get_index(self, index):
+        """Return the state of the entry at a keyspace index."""
+        byte, slot = divmod(index, ENTRIES_PER_BYTE)
+        return (self._map[byte] >> (2 * slot)) & 3
+
+    def set_index(self, index, state):
+        """Set the state of the entry at a keyspace index."""
+        byte, slot = divmod(index, ENTRIES_PER_BYTE)
+        shift = 2 * slot
+        self._map[byte] = (self._map[byte] & ~(3 << shift)) | (state << shift)
+
+    def get(self, domain):
+        """Return the state of a domain, raising ValueError if it is not in the keyspace."""
+        return self.get_index(self.space.to_index(domain))
+
+    def set(self, domain, state):
+        """Set the state of a domain, raising ValueError if it is not in the keyspace."""
+        self.set_index(self.space.to_index(domain), state)
+
+    def count(self, state, start=0, end=None):
+        """
+        Count the entries in a given state.
+
+        Args:
+            state (int): One of UNCHECKED, AVAILABLE, TAKEN, ERROR.
+            start (int): First keyspace index to include.
+            end (int): Index to stop before (default: end of the keyspace).
+
+        Returns:
+            int: Number of entries in [start, end) with that state.
+        """
+        end = self.size if end is None else min(end, self.size)
+        if start >= end:
+            return 0
+        # Entries that share a byte with the range boundaries are counted one by one,
+        # all whole bytes in between are counted in C.
+        first_byte = -(-start // ENTRIES_PER_BYTE)
+        last_byte = end // ENTRIES_PER_BYTE
+        if first_byte >= last_byte:
+            return sum(1 for i in range(start, end) if self.get_index(i) == state)
+        total = sum(self._map[first_byte:last_byte].translate(_COUNT_TABLES[state]))
+        total += sum(1 for i in range(start, first_byte * ENTRIES_PER_BYTE) if self.get_index(i) == state)
+        total += sum(1 for i in range(last_byte * ENTRIES_PER_BYTE, end) if self.get_index(i) == state)
+        return total
+
+    def counts(self):
+        """Return a dict of state -> number of entries over the whole keyspace."""
+        return {state: self.count(state) for state in STATES}
+
+    def find(self, state, start=0):
+        """
+        Return the first keyspace index at or after `start` with a given state.
+
+        Args:
+            state (int): State to look for.
+            start (int): Index to start searching from.
+
+        Returns:
+            int or None: The index, or None if no later entry has that state.
+        """
+        pattern = _STATE_PATTERNS[state]
+        pos = start // ENTRIES_PER_BYTE
+        while pos < len(self._map):
+            match = pattern.search(self._map, pos)
+            if match is None:
+                return None
+            byte = match.start()
+            for slot in range(ENTRIES_PER_BYTE):
+                index = byte * ENTRIES_PER_BYTE + slot
+                if start <= index < self.size and self.get_index(index) == state:
+                    return index
+            pos = byte + 1
+        return None
+
+    def next_unchecked(self, start=0):
+        """Return the first unchecked keyspace index at or after `start`, or None."""
+        return self.find(UNCHECKED, start)
+
+    def iter_indexes(self, state, start=0):
+        """Yield every keyspace index at or after `start` with a given state."""
+        index = self.find(state, start)
+        while index is not None:
+            yield index
+            index = self.find(state, index + 1)
+
+    def view(self, state):
+        """Return a set-like view of the domains in one state."""
+        return StateView(self, state)
+
+    def import_text(self, filename, state, offset=0):
+        """
+        Mark every domain listed in a text file (one per line) with a state.
+
+        Lines outside the index's keyspace are skipped.
+
+        Args:
+            filename (str): File with one domain per line, e.g. FOUND_FILE.
+            state (int): State to record for those domains.
+            offset (int): Byte offset to start reading at, to import only appended lines.
+
+        Returns:
+            tuple: (imported, skipped) line counts.
+        """
+        imported = skipped = 0
+        if not os.path.exists(filename):
+            return imported, skipped
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                domain = line.strip().decode('ascii', 'replace')
+                if not domain:
+                    continue
+                try:
+                    self.set_index(self.space.to_index(domain), state)
+                    imported += 1
+                except ValueError:
+                    skipped += 1
+        return imported, skipped
+
+
+class StateView:
+    """
+    The domains of a DomainIndex that are in one state, behaving like a set.
+
+    Lets code written against the found/taken sets (`in`, `add`, `len`, iteration)
+    run on top of the index unchanged.
+    """
+
+    def __init__(self, index, state):
+        self.index = index
+        self.state = state
+
+    def __contains__(self, domain):
+        try:
+            return self.index.get(domain) == self.state
+        except ValueError:
+            return False
+
+    def add(self, domain):
+        self.index.set(domain, self.state)
+
+    def __len__(self):
+        return self.index.count(self.state)
+
+    def __iter__(self):
+        for index in self.index.iter_indexes(self.state):
+            yield self.index.space.to_domain(index)
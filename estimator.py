@@ -0,0 +1,187 @@
+"""
+Sampling-based estimates of where available names are.
+
+A lexicographic sweep spends as many lookups on prefixes that are almost
+fully registered as on ones full of free names. The keyspace is instead cut
+into buckets (by default one per TLD and 2-character prefix, each a
+contiguous index range), a few random unchecked names of every bucket are
+probed, and each bucket gets a running availability rate with a Wilson score
+confidence interval. The sweep then works through the buckets with the
+highest lower bound first, so the likely finds come in a fraction of the
+lookups of a full sweep, and buckets whose upper bound is below a threshold
+can be skipped altogether.
+"""
+import bisect
+import json
+import math
+import os
+import random
+from collections import namedtuple
+
+DEFAULT_PREFIX_LENGTH = 2  # Characters of the name that define a bucket
+DEFAULT_SAMPLES = 20  # Random names probed per bucket
+DEFAULT_Z = 1.96  # Normal quantile of the confidence intervals (95%)
+SAMPLE_ATTEMPTS = 10  # Random draws per wanted sample before a mostly checked bucket is given up
+
+Bucket = namedtuple('Bucket', 'label start end')
+
+
+def wilson_interval(successes, trials, z=DEFAULT_Z):
+    """
+    Return the Wilson score confidence interval of a binomial proportion.
+
+    Unlike the normal approximation it stays inside [0, 1] and is sensible
+    for the handful of samples a bucket gets, including 0 or all successes.
+
+    Returns:
+        tuple: (low, high); (0.0, 1.0) without trials.
+    """
+    if not trials:
+        return 0.0, 1.0
+    rate = successes / trials
+    z2 = z * z
+    denominator = 1 + z2 / trials
+    center = (rate + z2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z2 / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def prefix_buckets(space, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """
+    Split a keyspace into one bucket per TLD and name prefix.
+
+    Indexes are TLD-major with the first character most significant, so every
+    prefix is a contiguous index range.
+
+    Args:
+        space (keyspace.Keyspace): Keyspace to split.
+        prefix_length (int): Characters per prefix, at most the name length.
+
+    Returns:
+        list: Buckets in index order, labelled like 'ab*.com'.
+    """
+    prefix_length = min(prefix_length, space.length)
+    prefixes = 1
+    for chars in space.positions[:prefix_length]:
+        prefixes *= len(chars)
+    size = space.names_per_tld // prefixes
+    buckets = []
+    for start in range(0, space.size, size):
+        domain = space.to_domain(start)
+        name, _, tld = domain.rpartition('.')
+        wildcard = '*' if prefix_length < space.length else ''
+        buckets.append(Bucket(f"{name[:prefix_length]}{wildcard}.{tld}", start, start + size))
+    return buckets
+
+
+class AvailabilityEstimator:
+    """
+    Running availability rate and confidence interval per bucket.
+
+    Args:
+        buckets (list): Non-overlapping Buckets in index order, e.g. from prefix_buckets().
+        z (float): Normal quantile of the confidence intervals.
+    """
+
+    def __init__(self, buckets, z=DEFAULT_Z):
+        self.buckets = list(buckets)
+        self.z = z
+        self.trials = [0] * len(self.buckets)
+        self.available = [0] * len(self.buckets)
+        self._starts = [bucket.start for bucket in self.buckets]
+
+    def bucket_of(self, index):
+        """Return the number of the bucket holding a keyspace index, or None."""
+        number = bisect.bisect_right(self._starts, index) - 1
+        if number >= 0 and index < self.buckets[number].end:
+            return number
+        return None
+
+    def record(self, index, available):
+        """Count one probed name: available (True) or registered (False)."""
+        number = self.bucket_of(index)
+        if number is not None:
+            self.trials[number] += 1
+            self.available[number] += bool(available)
+
+    def interval(self, number):
+        """Return the (low, high) confidence interval of a bucket's availability rate."""
+        return wilson_interval(self.available[number], self.trials[number], self.z)
+
+    def estimate(self, number):
+        """Return a dict with a bucket's label, counts, rate and confidence interval."""
+        trials = self.trials[number]
+        low, high = self.interval(number)
+        return {'bucket': self.buckets[number].label, 'trials': trials, 'available': self.available[number],
+                'rate': self.available[number] / trials if trials else None, 'low': low, 'high': high}
+
+    def ranking(self, numbers=None):
+        """
+        Order buckets from the most to the least promising.
+
+        Buckets are ranked by the lower bound of their interval, so a bucket
+        goes first only once its samples make a high rate likely; ties (e.g.
+        unsampled buckets) go by the point estimate, then index order.
+
+        Args:
+            numbers (iterable): Bucket numbers to rank (default: all).
+
+        Returns:
+            list: Bucket numbers.
+        """
+        numbers = range(len(self.buckets)) if numbers is None else numbers
+
+        def key(number):
+            trials = self.trials[number]
+            return (-self.interval(number)[0], -(self.available[number] / trials if trials else 0), number)
+
+        return sorted(numbers, key=key)
+
+    def sample(self, is_unchecked, per_bucket=DEFAULT_SAMPLES, rng=random):
+        """
+        Draw random unchecked indexes from every bucket.
+
+        Args:
+            is_unchecked (callable): Called with a keyspace index, True if it still needs a lookup.
+            per_bucket (int): Samples wanted per bucket; fewer are drawn from
+                buckets that are (nearly) all checked.
+            rng (random.Random): Source of randomness.
+
+        Yields:
+            int: Keyspace indexes, bucket by bucket, without repeats.
+        """
+        for bucket in self.buckets:
+            drawn = set()
+            for _ in range(per_bucket * SAMPLE_ATTEMPTS):
+                if len(drawn) >= per_bucket:
+                    break
+                index = rng.randrange(bucket.start, bucket.end)
+                if index not in drawn and is_unchecked(index):
+                    drawn.add(index)
+                    yield index
+
+    def save(self, path):
+        """Write the counts per bucket label to a JSON file, atomically."""
+        state = {'z': self.z, 'buckets': {bucket.label: [self.trials[number], self.available[number]]
+                                          for number, bucket in enumerate(self.buckets)}}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, buckets, z=DEFAULT_Z):
+        """
+        Return an estimator over `buckets` with the counts saved in a JSON file.
+
+        Counts of labels not among the buckets (e.g. saved with another prefix
+        length) are ignored; a missing file gives an empty estimator.
+        """
+        estimator = cls(buckets, z)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)['buckets']
+            for number, bucket in enumerate(estimator.buckets):
+                if bucket.label in saved:
+                    estimator.trials[number], estimator.available[number] = saved[bucket.label]
+        return estimator
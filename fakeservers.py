@@ -0,0 +1,246 @@
+"""
+Local fake DNS and WHOIS servers for offline tests and benchmarks.
+
+FakeDNSServer answers DNS queries over UDP, FakeWhoisServer answers WHOIS
+queries over TCP. Both run on a background thread, so synchronous code
+(has_dns_record, is_available) and code with its own event loop (the async
+sweep) can use them alike. Each has a configurable answer latency, a loss
+ratio (queries that never get an answer) and a ratio of names reported as
+not existing / available. Whether a name exists is derived from a hash of
+the name, so the same name always gets the same answer.
+"""
+import asyncio
+import random
+import socketserver
+import struct
+import threading
+import time
+import zlib
+
+import udpdns
+import whoispool
+
+DEFAULT_NXDOMAIN_RATIO = 0.5
+DEFAULT_AVAILABLE_RATIO = 0.5
+
+
+def name_ratio(name, salt=b''):
+    """Map a name to a stable number in [0, 1)."""
+    return zlib.crc32(salt + name.lower().encode()) / 2 ** 32
+
+
+def dns_answer(qtype, name):
+    """Return (rrtype, rdata) of a made-up record for a query type, or None."""
+    if qtype == udpdns.QTYPES['A']:
+        return qtype, bytes([127, 0, 0, 1])
+    if qtype == udpdns.QTYPES['AAAA']:
+        return qtype, bytes(15) + b'\1'
+    if qtype in (udpdns.QTYPES['NS'], udpdns.QTYPES['CNAME']):
+        return qtype, udpdns.encode_name("ns1.fake.test")
+    return None
+
+
+def soa_record(zone, ttl):
+    """Return an SOA resource record for a zone, with `ttl` as both its TTL and MINIMUM."""
+    rdata = (udpdns.encode_name("a.fake.test") + udpdns.encode_name("hostmaster.fake.test")
+             + struct.pack('!IIIII', 1, 1800, 900, 604800, ttl))
+    return (udpdns.encode_name(zone)
+            + struct.pack('!HHIH', udpdns.QTYPES['SOA'], udpdns.CLASS_IN, ttl, len(rdata)) + rdata)
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        server.queries += 1
+        try:
+            query_id, _, _, _, _, _ = udpdns.HEADER.unpack_from(data)
+            name, end = udpdns.read_name(data, udpdns.HEADER.size)
+            qtype, _ = struct.unpack_from('!HH', data, end)
+        except (ValueError, IndexError, struct.error):
+            return
+        if server.random.random() < server.loss:
+            server.dropped += 1
+            return
+        answer = authority = b''
+        if name_ratio(name) < server.nxdomain_ratio:
+            rcode = 3
+        else:
+            rcode = 0
+            record = dns_answer(qtype, name)
+            if record is not None:
+                rrtype, rdata = record
+                # 0xC00C points back at the question name
+                answer = struct.pack('!HHHIH', 0xC00C, rrtype, udpdns.CLASS_IN, server.ttl, len(rdata)) + rdata
+        if not answer and server.negative_ttl is not None:
+            authority = soa_record(name.rpartition('.')[2], server.negative_ttl)
+        header = udpdns.HEADER.pack(query_id, 0x8180 | rcode, 1, 1 if answer else 0, 1 if authority else 0, 0)
+        packet = header + data[udpdns.HEADER.size:end + 4] + answer + authority
+        if server.latency:
+            asyncio.get_running_loop().call_later(server.latency, self.transport.sendto, packet, addr)
+        else:
+            self.transport.sendto(packet, addr)
+
+
+class FakeDNSServer:
+    """
+    UDP DNS responder answering every name itself.
+
+    Names whose hash falls below nxdomain_ratio get NXDOMAIN; the others get a
+    made-up record of the type asked for (or an empty answer for other types).
+
+    Use as `with FakeDNSServer(latency=0.01) as server:` and point a client at
+    server.address, or use server.resolver() for dnspython.
+
+    Args:
+        latency (float): Seconds before each answer is sent.
+        loss (float): Ratio of queries left unanswered.
+        nxdomain_ratio (float): Ratio of names that do not exist.
+        host (str): Address to listen on.
+        port (int): Port to listen on (0 picks a free one).
+        seed (int): Seed for the loss decisions.
+        ttl (int): TTL of the records in answers.
+        negative_ttl (int): TTL and MINIMUM of the SOA record sent with
+            NXDOMAIN and empty answers; None sends no SOA record.
+    """
+
+    def __init__(self, latency=0.0, loss=0.0, nxdomain_ratio=DEFAULT_NXDOMAIN_RATIO,
+                 host='127.0.0.1', port=0, seed=None, ttl=3600, negative_ttl=900):
+        self.latency = latency
+        self.loss = loss
+        self.nxdomain_ratio = nxdomain_ratio
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.random = random.Random(seed)
+        self.address = (host, port)
+        self.queries = 0
+        self.dropped = 0
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start answering on a background thread; self.address gets the bound port."""
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            transport, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+                lambda: _DNSProtocol(self), local_addr=self.address))
+            self.address = transport.get_extra_info('sockname')[:2]
+            ready.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                transport.close()
+                self._loop.run_until_complete(asyncio.sleep(0))
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """Stop answering and close the socket."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def resolver(self):
+        """Return a dns.resolver.Resolver that only asks this server."""
+        import dns.resolver
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = [self.address[0]]
+        resolver.port = self.address[1]
+        return resolver
+
+
+class _WhoisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server.fake
+        query = self.rfile.readline().decode('ascii', 'replace').strip()
+        server.queries += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.random.random() < server.loss:
+            server.dropped += 1
+            return  # Connection closed without a reply
+        if name_ratio(query, b'whois:') < server.available_ratio:
+            reply = f'No match for "{query.upper()}".\r\n'
+        else:
+            reply = (f"   Domain Name: {query.upper()}\r\n"
+                     f"   Registrar WHOIS Server: {self.server.server_address[0]}\r\n"
+                     f"   Name Server: NS1.FAKE.TEST\r\n")
+        self.wfile.write(reply.encode())
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeWhoisServer:
+    """
+    TCP WHOIS server answering in the style of whois.verisign-grs.com.
+
+    Names whose hash falls below available_ratio get a "No match" reply, the
+    others a registration record. Lost queries get their connection closed
+    without a reply. Port 43 needs root on most systems; pass port=0 to get
+    a free port, then use whoispool.raw_lookup(*server.address).
+
+    Args:
+        latency (float): Seconds before each reply is sent.
+        loss (float): Ratio of queries left unanswered.
+        available_ratio (float): Ratio of names reported as available.
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        seed (int): Seed for the loss decisions.
+    """
+
+    def __init__(self, latency=0.0, loss=0.0, available_ratio=DEFAULT_AVAILABLE_RATIO,
+                 host='127.0.0.1', port=whoispool.WHOIS_PORT, seed=None):
+        self.latency = latency
+        self.loss = loss
+        self.available_ratio = available_ratio
+        self.random = random.Random(seed)
+        self.address = (host, port)
+        self.queries = 0
+        self.dropped = 0
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start answering on a background thread; self.address gets the bound port."""
+        self._server = _ThreadingTCPServer(self.address, _WhoisHandler)
+        self._server.fake = self
+        self.address = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop answering and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def lookup(self, timeout=whoispool.DEFAULT_TIMEOUT):
+        """Return a WhoisPool / is_available lookup function that asks this server."""
+        return whoispool.raw_lookup(self.address[0], self.address[1], timeout)
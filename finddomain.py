@@ -1,18 +1,11 @@
-import random
 import time
 import whois  # pip install python-whois
+import keyspace
 
-def generate_domain():
-    # Allowed characters: letters (a-z), digits (0-9) and hyphen (only in middle positions)
-    allowed_first = 'abcdefghijklmnopqrstuvwxyz0123456789'
-    allowed_mid = allowed_first + '-'  # hyphen allowed in positions 2 and 3
-    allowed_last = allowed_first
-
-    domain = random.choice(allowed_first) \
-             + random.choice(allowed_mid) \
-             + random.choice(allowed_mid) \
-             + random.choice(allowed_last)
-    return domain + '.com'
+def generate_domain(space=keyspace.DEFAULT):
+    # Allowed characters: letters (a-z), digits (0-9) and hyphen (only in middle positions).
+    # Any length and TLD list works, e.g. keyspace.Keyspace(5, ('com', 'net')).
+    return space.random_domain()
 
 def is_available(domain):
     try:
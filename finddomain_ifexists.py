@@ -1,38 +1,338 @@
 # Import libraries
 import random
 import time
-import whois  # pip install python-whois
 import os
-import socket
-import dns.resolver
+import json
+import logging
+import threading
+from collections import OrderedDict
+import answercache
+import candidates
+import dnsprobe
+import domainindex
+import estimator
+import keyspace
+import lookupcache
+import metrics
+import prefixcounts
+import resultsink
+import shardsweep
+import whoispool
+import zonefile
+from keyspace import ALLOWED_FIRST  # Allowed characters for the first position
+from checkpoint import Checkpoint
 
 # Global tracking variables
 domain_collision_count = 0  # Number of times a generated domain was already found/taken
 domain_generated_count = 0  # Total number of domains generated
+prefix_counts = None  # PrefixCounts, loaded on first use by get_prefix_counts()
+lookup_cache = None  # LookupCache, opened by get_lookup_cache(); checks are recorded once it is open
+answer_cache = None  # AnswerCache, opened by get_answer_cache(); raw UDP sweeps use it once it is open
 
 FOUND_FILE = "found4charcomain.txt"
 TAKEN_FILE = "taken4domain.txt"
-ALLOWED_FIRST = 'abcdefghijklmnopqrstuvwxyz0123456789'  # Allowed characters for the first position
+ERROR_FILE = "error4domain.txt"  # Domains whose DNS lookups kept failing, to recheck later
+INDEX_FILE = "domains.idx"  # Packed 2-bit state per candidate, see domainindex.py
+OFFSETS_SUFFIX = ".offsets.json"  # Next to the index: result file sizes it includes, see load_index
+PREFIX_COUNTS_FILE = "prefixcounts.json"  # Found/taken counts per prefix, see prefixcounts.py
+CHECKPOINT_FILE = "sweep_checkpoint.json"  # Keyspace cursor of the last sweep, see checkpoint.py
+CACHE_FILE = "lookups.sqlite"  # Time, method and outcome of every check, see lookupcache.py
+ANSWER_CACHE_FILE = "answers.sqlite"  # DNS responses within their TTL, see answercache.py
+ESTIMATES_FILE = "estimates.json"  # Sampled availability per keyspace bucket, see estimator.py
+LOG_LEVEL = os.environ.get("FINDDOMAIN_LOG_LEVEL", "WARNING")  # DEBUG logs every domain checked
+
+log = logging.getLogger("finddomain")
+
+def setup_logging(level=LOG_LEVEL):
+    """
+    Configure logging for a run.
+
+    Per-domain messages are logged at DEBUG and finds at INFO, so at the default
+    WARNING level the sweep loop writes nothing; progress comes from the metrics
+    reporter instead (see metrics.py).
+
+    Args:
+        level (str or int): Logging level name or number.
+    """
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(message)s")
+
+def shared_index(found_domains, taken_domains):
+    """Return the DomainIndex both stores are views of, or None if they are not."""
+    if (isinstance(found_domains, domainindex.StateView)
+            and isinstance(taken_domains, domainindex.StateView)
+            and found_domains.index is taken_domains.index):
+        return found_domains.index
+    return None
+
+def sweep_space(found_domains, taken_domains, space=None):
+    """Return the keyspace a sweep covers: the index's one, else `space`, else the 4-character .com one."""
+    index = shared_index(found_domains, taken_domains)
+    if index is not None:
+        return index.space
+    return space or keyspace.DEFAULT
+
+def store_path(path, space):
+    """
+    Return the file name of a store for a keyspace.
+
+    The 4-character .com keyspace keeps the original names; others get their
+    own file, e.g. domains.idx -> domains-5char-com-net.idx.
+    """
+    if space == keyspace.DEFAULT:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{space.name}{ext}"
+
+def result_files(length=4, tld='com'):
+    """
+    Return the found/taken/error result files of names of one length under one TLD.
+
+    Returns:
+        dict: 'found', 'taken' and 'error' -> file name.
+    """
+    if (length, tld) == (4, 'com'):
+        return {'found': FOUND_FILE, 'taken': TAKEN_FILE, 'error': ERROR_FILE}
+    return {kind: f"{kind}{length}char{tld}.txt" for kind in ('found', 'taken', 'error')}
+
+def result_file(kind, domain):
+    """Return the 'found', 'taken' or 'error' result file a domain is written to."""
+    name, _, tld = domain.rpartition('.')
+    return result_files(len(name), tld)[kind]
+
+def remaining_unchecked(found_domains, taken_domains, space=None):
+    """Return how many candidates of the keyspace are still unchecked, for the sweep ETA."""
+    index = shared_index(found_domains, taken_domains)
+    if index is not None:
+        return index.count(domainindex.UNCHECKED)
+    space = space or keyspace.DEFAULT
+    return max(0, space.size - len(found_domains) - len(taken_domains))
 
 def get_found_domains():
-    """Return the set of found domains from the file."""
-    return read_domains(FOUND_FILE)
+    """Return the set of found domains from the file; one also in the taken file counts as taken."""
+    return read_domains(FOUND_FILE) - read_domains(TAKEN_FILE)
 
 def get_taken_domains():
     """Return the set of taken domains from the file."""
     return read_domains(TAKEN_FILE)
 
-def add_found_domain(domain, found_domains):
-    """Add a domain to the found file and set."""
-    append_domain(FOUND_FILE, domain)
+def index_sources(space=keyspace.DEFAULT):
+    """
+    Return the (result file, state) pairs an index is built from, in import order.
+
+    Errors come first, so a later found/taken result for the same domain wins;
+    taken comes last, so a domain in both found and taken files is taken (as
+    in the set loaders and prefixcounts.PrefixCounts.rebuild).
+    """
+    sources = []
+    for tld in space.tlds:
+        files = result_files(space.length, tld)
+        sources += [(files['error'], domainindex.ERROR), (files['found'], domainindex.AVAILABLE),
+                    (files['taken'], domainindex.TAKEN)]
+    return sources
+
+def load_index(path=None, space=keyspace.DEFAULT):
+    """
+    Open the packed domain index, the binary snapshot of the result files.
+
+    The index is memory-mapped, so opening it takes milliseconds. Next to it,
+    save_index records how far into each result file it is up to date; only
+    lines appended after that are imported. A new index, or one whose result
+    files have shrunk since (rewritten or deleted) or that has no offsets
+    file, is reset to unchecked and rebuilt from the files.
+
+    Args:
+        path (str): Index file (default: INDEX_FILE, or a per-keyspace variant of it).
+        space (keyspace.Keyspace): Keyspace to index; its result files are
+            imported per TLD (see result_files).
+
+    Returns:
+        DomainIndex: Use index.view(domainindex.AVAILABLE) / index.view(domainindex.TAKEN)
+        wherever the found/taken sets were used before.
+    """
+    index = domainindex.DomainIndex(path or store_path(INDEX_FILE, space), space=space)
+    sources = index_sources(space)
+    offsets = None
+    if not index.created and os.path.exists(index.path + OFFSETS_SUFFIX):
+        with open(index.path + OFFSETS_SUFFIX, 'r') as f:
+            offsets = json.load(f)
+        if any(offsets.get(filename, 0) > _file_size(filename) for filename, _ in sources):
+            offsets = None
+    if offsets is None:
+        # States of domains no longer in the files must not survive the rebuild
+        if not index.created:
+            index.clear()
+        offsets = {}
+    for filename, state in sources:
+        if offsets.get(filename, 0) < _file_size(filename):
+            index.import_text(filename, state, offsets.get(filename, 0))
+    index.flush()
+    return index
+
+def save_index(index):
+    """
+    Flush an index and record the result file sizes it is up to date with.
+
+    Call at shutdown so the next load_index only imports what was appended since.
+    """
+    resultsink.flush_all()
+    index.flush()
+    offsets = {filename: _file_size(filename) for filename, _ in index_sources(index.space)}
+    tmp_path = index.path + OFFSETS_SUFFIX + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(offsets, f)
+    os.replace(tmp_path, index.path + OFFSETS_SUFFIX)
+
+def _file_size(filename):
+    """Return the size of a file in bytes, 0 if it does not exist."""
+    return os.path.getsize(filename) if os.path.exists(filename) else 0
+
+def get_prefix_counts():
+    """Return the per-prefix progress counters, loading them on first use."""
+    global prefix_counts
+    if prefix_counts is None:
+        prefix_counts = prefixcounts.PrefixCounts.load(
+            PREFIX_COUNTS_FILE, {'found': FOUND_FILE, 'taken': TAKEN_FILE})
+    return prefix_counts
+
+def get_lookup_cache(ttls=None):
+    """
+    Return the lookup cache, opening it (and seeding it from the result files) on first use.
+
+    Args:
+        ttls (dict): outcome -> seconds an outcome stays fresh; when they differ
+            from the cache's, the expiry of every entry is recomputed (see
+            LookupCache.set_ttls). Default: keep the cache's TTLs.
+    """
+    global lookup_cache
+    if lookup_cache is None:
+        lookup_cache = lookupcache.LookupCache(CACHE_FILE)
+        if lookup_cache.created:
+            # First import wins, so taken beats found beats error for domains in several files
+            lookup_cache.import_text(TAKEN_FILE, 'dns', lookupcache.TAKEN)
+            lookup_cache.import_text(FOUND_FILE, 'dns', lookupcache.FOUND)
+            lookup_cache.import_text(ERROR_FILE, 'dns', lookupcache.ERROR)
+    if ttls is not None and dict(ttls) != lookup_cache.ttls:
+        lookup_cache.set_ttls(ttls)
+    return lookup_cache
+
+def get_answer_cache():
+    """Return the DNS answer cache, opening it on first use."""
+    global answer_cache
+    if answer_cache is None:
+        answer_cache = answercache.AnswerCache(ANSWER_CACHE_FILE)
+    return answer_cache
+
+def add_found_domain(domain, found_domains, method='dns'):
+    """Add a domain to its found file and the set, and count it in the prefix counters."""
+    resultsink.get_sink(result_file('found', domain)).write(domain)
+    if prefix_counts is not None and keyspace.in_keyspace(domain) and domain not in found_domains:
+        prefix_counts.add('found', domain)
+    if lookup_cache is not None:
+        lookup_cache.record(domain, method, lookupcache.FOUND)
     found_domains.add(domain)
 
-def add_taken_domain(domain, taken_domains):
-    """Add a domain to the taken file and set."""
-    append_domain(TAKEN_FILE, domain)
+def add_taken_domain(domain, taken_domains, method='dns'):
+    """Add a domain to its taken file and the set, and count it in the prefix counters."""
+    resultsink.get_sink(result_file('taken', domain)).write(domain)
+    if prefix_counts is not None and keyspace.in_keyspace(domain) and domain not in taken_domains:
+        prefix_counts.add('taken', domain)
+    if lookup_cache is not None:
+        lookup_cache.record(domain, method, lookupcache.TAKEN)
     taken_domains.add(domain)
 
-def has_dns_record(domain, timeout=1):
+def add_error_domain(domain, found_domains=None, method='dns'):
+    """
+    Record a domain whose DNS lookups kept failing in the error file.
+
+    It is not added to the found or taken stores. If found_domains is a view
+    of the packed index, the domain is marked ERROR there so the sweep moves
+    on; otherwise it stays unchecked.
+    """
+    resultsink.get_sink(result_file('error', domain)).write(domain)
+    if lookup_cache is not None:
+        lookup_cache.record(domain, method, lookupcache.ERROR)
+    if isinstance(found_domains, domainindex.StateView):
+        found_domains.index.set(domain, domainindex.ERROR)
+
+def move_domain(domain, kind, found_domains, taken_domains, method='dns'):
+    """
+    Record a domain as 'found' or 'taken', taking it out of the other store.
+
+    The set entry and prefix count of the other kind go at once; the line in
+    the other result file stays until remove_results() is called for it,
+    which callers do once for all the domains they moved.
+
+    Returns:
+        bool: True if the domain was in the other store.
+    """
+    if kind == 'found':
+        store, other_store, other_kind, add = found_domains, taken_domains, 'taken', add_found_domain
+    else:
+        store, other_store, other_kind, add = taken_domains, found_domains, 'found', add_taken_domain
+    moved = domain in other_store
+    if moved:
+        # StateViews switch state on add; plain sets need the old entry removed
+        if hasattr(other_store, 'discard'):
+            other_store.discard(domain)
+        if prefix_counts is not None and keyspace.in_keyspace(domain):
+            prefix_counts.remove(other_kind, domain)
+    add(domain, store, method)
+    return moved
+
+def remove_results(kind, domains):
+    """
+    Rewrite the 'found' or 'taken' result files without some domains, e.g. ones that moved.
+
+    Each file is replaced atomically. Its shared sink is closed first, so
+    later results are appended to the new file. Indexes and prefix counters
+    see the shrunk file on their next load and rebuild from the files.
+    """
+    removed = {}
+    for domain in domains:
+        removed.setdefault(result_file(kind, domain), set()).add(domain)
+    for filename, names in removed.items():
+        resultsink.close_file(filename)
+        if not os.path.exists(filename):
+            continue
+        tmp_path = filename + '.tmp'
+        with open(filename, 'r') as source, open(tmp_path, 'w') as target:
+            for line in source:
+                if line.strip() not in names:
+                    target.write(line)
+        os.replace(tmp_path, filename)
+
+def classify_dns(domain, timeout=1, resolver=None):
+    """
+    Look up the NS records of a domain and say what the answer means.
+
+    Unlike has_dns_record, a failed lookup is not reported as "does not resolve":
+    timeouts and server failures get their own outcome, so they can be retried
+    instead of ending up in the found store.
+
+    Args:
+        domain (str): The domain name to check.
+        timeout (int): Timeout in seconds for the DNS lookup.
+        resolver (dns.resolver.Resolver): Resolver to use (default: system resolver).
+
+    Returns:
+        str: dnsprobe.NXDOMAIN, HAS_NS, NO_ANSWER, TIMEOUT or SERVER_ERROR.
+    """
+    import dns.exception
+    import dns.resolver  # Imported on first lookup, see dnsprobe.py
+    try:
+        (resolver or dns.resolver).resolve(domain, 'NS', lifetime=timeout)
+        return dnsprobe.HAS_NS
+    except dns.resolver.NXDOMAIN:
+        return dnsprobe.NXDOMAIN
+    except dns.resolver.NoAnswer:
+        return dnsprobe.NO_ANSWER
+    except dns.exception.Timeout:
+        return dnsprobe.TIMEOUT
+    except Exception:
+        # SERVFAIL from every nameserver, network down, ...
+        return dnsprobe.SERVER_ERROR
+
+def has_dns_record(domain, timeout=1, resolver=None):
     """
     Check if a domain name resolves via DNS (i.e., has an IP address).
     This is a fast, cost-free way to filter out registered domains before performing a WHOIS lookup.
@@ -46,39 +346,18 @@ def has_dns_record(domain, timeout=1):
     Args:
         domain (str): The domain name to check.
         timeout (int): Timeout in seconds for the DNS lookup (default: 2).
+        resolver (dns.resolver.Resolver): Resolver to use (default: system resolver).
 
     Returns:
-        bool: True if the domain resolves (registered), False otherwise.
+        bool: True if the domain resolves (registered), False otherwise,
+        including when the lookup failed (use classify_dns to tell those apart).
     """
-    try:
-        # # Set a timeout for the DNS query to avoid hanging
-        # socket.setdefaulttimeout(timeout)
-        # ip_address = socket.gethostbyname(domain)
-        # print(f"The IP address for {domain} is: {ip_address}")
-
-        # Finding NS record
-        result = dns.resolver.resolve(domain, 'NS')
-
-        # Printing record
-        # for val in result:
-        #   print(val.to_text(), end="")
-
-        # # Finding AAAA record
-        # result = dns.resolver.resolve(domain, 'A')
-
-        # # Printing record
-        # for val in result:
-        #   print('A Record : ', ipval.to_text())
-        return True
-    except socket.gaierror:
-        # Domain does not resolve
-        return False
-    except Exception as e:
-        # Other errors (e.g., network issues)
-        return False
+    return classify_dns(domain, timeout, resolver) in dnsprobe.REGISTERED
 
 def read_domains(filename):
     """Read domains from a file into a set."""
+    # Results still buffered for this file would be missed otherwise
+    resultsink.flush_file(filename)
     if os.path.exists(filename):
         with open(filename, 'r') as f:
             return {line.strip() for line in f if line.strip()}
@@ -89,153 +368,705 @@ def append_domain(filename, domain):
     with open(filename, 'a') as f:
         f.write(domain + "\n")
 
-def calculateFirstLetter(starting_letter, found_domains, taken_domains):
+def calculateFirstLetter(starting_letter, found_domains, taken_domains, counts=None):
     """
     Calculate the first letter of the domain with a bias towards letters over digits.
     This helps avoid generating too many domains that start with digits, which are less common.
 
     Args:
         allowed_first (str): String of allowed characters for the first position.
+        counts (PrefixCounts): Per-prefix counters; when given the sets are not scanned.
 
     Returns:
         str: A string of characters to choose from for the first letter.
     """
     # So, the total number of 4-letter domains starting with 'a' is: 1 × 37 × 37 × 36 = 49,284
 
-    count_found = sum(1 for d in found_domains if d.startswith(starting_letter))
-    count_taken = sum(1 for d in taken_domains if d.startswith(starting_letter))
+    if counts is not None:
+        count_found = counts.found(starting_letter)
+        count_taken = counts.taken(starting_letter)
+    else:
+        count_found = sum(1 for d in found_domains if d.startswith(starting_letter))
+        count_taken = sum(1 for d in taken_domains if d.startswith(starting_letter))
     print(f"Found domains starting with {starting_letter}: {count_found}")
     print(f"Taken domains starting with {starting_letter}: {count_taken}")
     return count_found+count_taken
 
-def generate_domain(found_domains, taken_domains, max_retries=9999):
+def iter_unchecked(found_domains, taken_domains, start=0, counts=None, space=None):
     """
-    Generate a random 4-character .com domain that:
-    - Has not already been checked (not in found_domains or taken_domains)
-    - Does not resolve via DNS (using has_dns_record)
+    Yield the unchecked candidates of the keyspace in index order.
+
+    When both stores are views of the same DomainIndex the index finds the
+    next unchecked entry directly. Otherwise, for the 4-character .com
+    keyspace, whole 2-character prefix blocks that the prefix counters show
+    as done are skipped without being enumerated, and the rest are checked
+    against the sets. Other keyspaces are streamed and checked against the sets.
 
     Args:
         found_domains (set): Domains already found available.
         taken_domains (set): Domains already found taken.
-        max_retries (int): Maximum attempts to find a suitable domain.
+        start (int): Keyspace index to start from, e.g. a checkpoint cursor.
+        counts (PrefixCounts): Per-prefix counters used to skip finished blocks.
+        space (keyspace.Keyspace): Keyspace to sweep when the stores are sets
+            (default: the 4-character .com keyspace).
 
-    Returns:
-        str: A domain name meeting the criteria.
+    Yields:
+        tuple: (index, domain) pairs.
     """
-    allowed_mid = ALLOWED_FIRST + '-'
-    allowed_last = ALLOWED_FIRST
+    index = shared_index(found_domains, taken_domains)
+    if index is not None:
+        to_domain = index.space.to_domain
+        for position in index.iter_indexes(domainindex.UNCHECKED, start):
+            yield position, to_domain(position)
+        return
 
-    # @TODO better generation strategy to avoid collisions
-    global domain_collision_count, domain_generated_count
-    print(f"Allowed first letters position 0=: {ALLOWED_FIRST[0]}")
-    first_letter_permutations_count = calculateFirstLetter(ALLOWED_FIRST[0], found_domains, taken_domains)
-    print(f"First letter permutations count: {first_letter_permutations_count}")
-    first_letter =  ALLOWED_FIRST[0]
-    print(f"First letter chosen: {first_letter}")
-
-    for first_pos in range(len(ALLOWED_FIRST)):
-        first_letter_permutations_count = calculateFirstLetter(ALLOWED_FIRST[first_pos], found_domains, taken_domains)
-        if first_letter_permutations_count > 49000:
-            print(f"Skipping first letter {ALLOWED_FIRST[first_pos + 1]} with {first_letter_permutations_count} permutations")
+    if space is not None and space != keyspace.DEFAULT:
+        for index, domain in space.iter(start):
+            if domain not in found_domains and domain not in taken_domains:
+                yield index, domain
+        return
+
+    # Every 2-character prefix is followed by 37 x 36 combinations
+    block_size = len(keyspace.ALLOWED_MID) * len(keyspace.ALLOWED_LAST)
+    index = start
+    while index < keyspace.KEYSPACE_SIZE:
+        block_end = (index // block_size + 1) * block_size
+        prefix = keyspace.index_to_domain(index)[:2]
+        if counts is not None and index % block_size == 0 and counts.total(prefix) >= block_size:
+            index = block_end
             continue
-        for mid2 in range(len(allowed_mid)):
-            second_letter = allowed_mid[mid2]
-            print(f"Allowed mid letters position 2={mid2}: {allowed_mid[mid2+1]}")    
-            for mid3 in range(len(allowed_mid)-1):
-                third_letter = allowed_mid[mid3]
-                print(f"Allowed mid letters position 3 {mid3} =: {allowed_mid[mid3+1]}")    
-
-                for last in range(len(allowed_last)):
-                    print(f" {allowed_last[last]}-", end="")
-                    domain = (
-                        first_letter +
-                        second_letter +
-                        third_letter +
-                        allowed_last[last]
-                    ) + '.com'
-
-                    domain_generated_count += 1
-                    if domain in found_domains or domain in taken_domains:
-                        # Already checked, skip
-                        domain_collision_count += 1
-                        print(f"Collision: {domain} already checked. Collisions: {domain_collision_count}, Total generated: {domain_generated_count}")
-                        continue
-                    if has_dns_record(domain):
-                        # Domain resolves, so it's likely taken; save as taken and skip
-                        print(f"{domain} resolves via DNS, is taken, regen again.")
-                        add_taken_domain(domain, taken_domains)
-                        continue
-                    else: 
-                        # Domain doesn't resolve
-                        print(f"Generated domain might be available: {domain} Collisions: {domain_collision_count}, Total generated: {domain_generated_count}")
-                        add_found_domain (domain, found_domains)
-
-                    print(f"Generated domain might be available: {domain} Collisions: {domain_collision_count}, Total generated: {domain_generated_count}")
-        return found_domains
-
-    raise RuntimeError("Could not generate a suitable domain after many attempts.")
-
-def is_available(domain, retries=3):
+        for index, domain in keyspace.iter_keyspace(index, block_end):
+            if domain not in found_domains and domain not in taken_domains:
+                yield index, domain
+        index = block_end
+
+def generate_domain(found_domains, taken_domains, max_retries=9999, checkpoint=None,
+                    retries=dnsprobe.DEFAULT_RETRIES, backoff=dnsprobe.DEFAULT_BACKOFF, resolver=None,
+                    space=None):
     """
-    Attempts a WHOIS lookup with a retry mechanism.
-    Returns True if the domain appears unregistered, False otherwise.
+    Sweep a keyspace (by default 4-character .com), recording each unchecked domain as:
+    - taken, if it is registered according to DNS (using classify_dns)
+    - found (might be available), if it does not exist
+    - an error, if its lookups kept timing out or failing
+
+    Failed lookups go into a retry queue and are tried again after a backoff
+    while the sweep carries on, up to `retries` extra attempts.
+
+    The sweep resumes from the cursor saved in CHECKPOINT_FILE (one per
+    keyspace, see store_path) and jumps straight to the first unchecked
+    candidate after it.
+
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        max_retries (int): Unused, kept for existing callers.
+        checkpoint (Checkpoint): Cursor to resume from and save to (default: CHECKPOINT_FILE).
+        retries (int): Extra attempts for lookups that time out or fail.
+        backoff (float): Seconds before the first retry, doubled for each further retry.
+        resolver (dns.resolver.Resolver): Resolver for classify_dns (default: system resolver).
+        space (keyspace.Keyspace): Keyspace to sweep when the stores are sets; with
+            index views the index's keyspace is used.
+
+    Returns:
+        set: found_domains, including the domains found by this sweep.
     """
-    for attempt in range(retries):
-        try:
-            result = whois.whois(domain)
-            # If the lookup returns nothing or no domain name, treat as available.
-            if result is None or result.domain_name is None:
-                return True
-            return False
-        except Exception as e:
-            error_message = str(e).lower()
-            # If the error message indicates the domain was not found, treat it as available.
-            if "no match" in error_message or "not found" in error_message:
-                return True
-            print(f"Error checking {domain} (attempt {attempt+1}/{retries}): {e}")
-            time.sleep(1)  # Wait longer between retries
-    print(f"Skipping {domain} after {retries} failed attempts.")
-    return False
+    global domain_collision_count, domain_generated_count
+    space = sweep_space(found_domains, taken_domains, space)
+    counts = get_prefix_counts()
+    checkpoint = checkpoint or Checkpoint(store_path(CHECKPOINT_FILE, space), before_save=resultsink.flush_all)
+    start = checkpoint.load()
+    retry_queue = dnsprobe.RetryQueue(retries + 1, backoff)
+    waiting = {}  # domain -> keyspace index, for domains in the retry queue
+    next_index = start
+    log.info("Resuming sweep at %s", space.to_domain(start) if start < space.size else 'end')
+    metrics.METRICS.set_gauge(metrics.REMAINING, remaining_unchecked(found_domains, taken_domains, space))
+    metrics.METRICS.set_gauge('dns_retry_queue', retry_queue.__len__)
+
+    def check(domain, attempts):
+        started = time.monotonic()
+        outcome = classify_dns(domain, resolver=resolver)
+        metrics.METRICS.observe('dns_latency_seconds', time.monotonic() - started)
+        metrics.METRICS.inc(metrics.LOOKUPS, outcome=outcome)
+        attempts += 1
+        if outcome in dnsprobe.TRANSIENT and retry_queue.push(domain, attempts):
+            metrics.METRICS.inc('dns_retries_total')
+            return
+        waiting.pop(domain, None)
+        metrics.METRICS.add_gauge(metrics.REMAINING, -1)
+        if outcome in dnsprobe.REGISTERED:
+            # Domain is registered, so it's taken
+            log.debug("%s resolves via DNS, is taken.", domain)
+            add_taken_domain(domain, taken_domains)
+        elif outcome == dnsprobe.NXDOMAIN:
+            # Domain doesn't exist
+            log.debug("Generated domain might be available: %s Collisions: %d, Total generated: %d",
+                      domain, domain_collision_count, domain_generated_count)
+            add_found_domain(domain, found_domains)
+        else:
+            log.warning("%s: DNS lookup failed (%s) after %d attempts.", domain, outcome, attempts)
+            add_error_domain(domain, found_domains)
+
+    def check_due_retries():
+        item = retry_queue.pop_due()
+        while item is not None:
+            check(*item)
+            item = retry_queue.pop_due()
 
-def main():
+    for index, domain in iter_unchecked(found_domains, taken_domains, start, counts, space):
+        # Everything between the last candidate and this one was already checked
+        domain_collision_count += index - next_index
+        domain_generated_count += index - next_index + 1
+        next_index = index + 1
+        waiting[domain] = index
+        check(domain, 0)
+        check_due_retries()
+        # Domains still waiting for a retry hold the cursor back
+        if checkpoint.update(min(waiting.values(), default=index + 1)):
+            counts.save()
 
-    # t836host = has_dns_record("c-s6.com")
-    # print(f"c-s6.com resolves via DNS: {t836host}")
+    while len(retry_queue):
+        time.sleep(retry_queue.wait_time())
+        check_due_retries()
 
-    # kmhost = has_dns_record("kenmacpherson.com")
-    # print(f"kmhost resolves via DNS: {kmhost}")
-    # exit()
+    checkpoint.update(space.size)
+    checkpoint.save()
+    counts.save()
+    resultsink.flush_all()
+    return found_domains
 
-    # Load previously checked domains from files.
-    found_domains = get_found_domains()
-    taken_domains = get_taken_domains()
+def generate_domain_async(found_domains, taken_domains, concurrency=dnsprobe.DEFAULT_CONCURRENCY,
+                          timeout=dnsprobe.DEFAULT_TIMEOUT, retries=dnsprobe.DEFAULT_RETRIES,
+                          checkpoint=None, resolvers=None, whois_workers=None,
+                          whois_rate=whoispool.DEFAULT_RATE, whois_lookup=whoispool.whois_status,
+                          space=None, on_result=None):
+    """
+    Sweep all unchecked domains with the asyncio probe engine.
+
+    Same result as generate_domain, but keeps `concurrency` NS queries in flight
+    instead of waiting on each lookup in turn. Registered domains are added to
+    the taken store, non-existent ones to the found store and domains whose
+    lookups kept failing to the error file. Lookups finish out of order,
+    so the checkpoint cursor is the lowest domain still in flight.
 
-    attempts = 0
-    max_attempts = 99999  # Adjust as needed
+    With whois_workers set this becomes a two-stage pipeline: domains that do
+    not exist in DNS are streamed to a rate-limited WHOIS worker pool (see
+    whoispool.py), and only the ones WHOIS confirms go to the found store.
 
-    while attempts < max_attempts:
-        try:
-            domain = generate_domain(found_domains, taken_domains)
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        concurrency (int): Maximum number of DNS queries in flight.
+        timeout (float): Timeout in seconds for each query.
+        retries (int): Extra attempts for queries that time out.
+        checkpoint (Checkpoint): Cursor to resume from and save to (default: CHECKPOINT_FILE).
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py);
+            None uses the system resolver through dnspython.
+        whois_workers (int): WHOIS worker threads; None skips the WHOIS stage.
+        whois_rate (float): Initial WHOIS lookups per second per WHOIS server.
+        whois_lookup (callable): Called as whois_lookup(domain), returns a WHOIS status
+            (default: python-whois; see whoispool.raw_lookup for a direct port 43 client).
+        space (keyspace.Keyspace): Keyspace to sweep when the stores are sets; with
+            index views the index's keyspace is used.
+        on_result (callable): Called as on_result(domain, status) with each
+            recorded result, status being 'available', 'taken' or 'error'.
 
-            print(f"Checking {domain}...")
-            available = is_available(domain)
-            if available:
-                print(f"Found available domain: {domain}")
-                add_found_domain(domain, found_domains)
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains from the DNS stage,
+        plus 'whois_available', 'whois_registered' and 'whois_error' with WHOIS.
+    """
+    space = sweep_space(found_domains, taken_domains, space)
+    counts = get_prefix_counts()
+    checkpoint = checkpoint or Checkpoint(store_path(CHECKPOINT_FILE, space), before_save=resultsink.flush_all)
+    in_flight = OrderedDict()  # domain -> index, in issue (= keyspace) order
+    issued = [checkpoint.load()]  # One past the last index handed to the engine
+    whois_counts = {'whois_available': 0, 'whois_registered': 0, 'whois_error': 0}
+    # WHOIS results arrive on worker threads, DNS results on the event loop thread
+    lock = threading.RLock()
+    metrics.METRICS.set_gauge(metrics.REMAINING, remaining_unchecked(found_domains, taken_domains, space))
+
+    def candidates():
+        for index, domain in iter_unchecked(found_domains, taken_domains, checkpoint.cursor, counts, space):
+            with lock:
+                in_flight[domain] = index
+                issued[0] = index + 1
+            yield domain
+
+    def done(domain, state):
+        del in_flight[domain]
+        if on_result is not None:
+            on_result(domain, domainindex.STATE_NAMES[state])
+        metrics.METRICS.add_gauge(metrics.REMAINING, -1)
+        cursor = next(iter(in_flight.values())) if in_flight else issued[0]
+        if checkpoint.update(cursor):
+            counts.save()
+
+    def on_taken(domain):
+        with lock:
+            add_taken_domain(domain, taken_domains)
+            done(domain, domainindex.TAKEN)
+
+    def on_found(domain):
+        if pool is not None:
+            pool.submit(domain)
+            return
+        with lock:
+            add_found_domain(domain, found_domains)
+            done(domain, domainindex.AVAILABLE)
+
+    def on_failed(domain):
+        with lock:
+            add_error_domain(domain, found_domains)
+            done(domain, domainindex.ERROR)
+
+    def on_whois(domain, status):
+        with lock:
+            whois_counts['whois_' + status] += 1
+            if status == whoispool.AVAILABLE:
+                log.info("Found available domain: %s", domain)
+                add_found_domain(domain, found_domains, method='whois')
+                done(domain, domainindex.AVAILABLE)
+            elif status == whoispool.REGISTERED:
+                add_taken_domain(domain, taken_domains, method='whois')
+                done(domain, domainindex.TAKEN)
             else:
-                print(f"{domain} is taken.")
-                add_taken_domain(domain, taken_domains)
+                add_error_domain(domain, found_domains, method='whois')
+                done(domain, domainindex.ERROR)
 
-            attempts += 1
-            # time.sleep(1)  # Pause to reduce load / avoid rate limits
+    pool = None
+    if whois_workers:
+        pool = whoispool.WhoisPool(on_whois, workers=whois_workers, rate=whois_rate, lookup=whois_lookup)
+        pool.start()
+    try:
+        result = dnsprobe.sweep(
+            candidates(),
+            on_taken=on_taken,
+            on_found=on_found,
+            on_failed=on_failed,
+            concurrency=concurrency,
+            timeout=timeout,
+            retries=retries,
+            resolvers=resolvers,
+            cache=answer_cache,
+        )
+        if pool is not None:
+            # Let the WHOIS stage finish what the DNS stage handed over
+            pool.close()
+    except BaseException:
+        if pool is not None:
+            # Interrupted or failed: don't wait out the queued WHOIS lookups at the
+            # WHOIS rate; the checkpoint cursor never moved past the dropped domains, so the
+            # next run checks them again
+            pool.close(wait=False)
+        raise
+    if pool is not None:
+        result.update(whois_counts)
+    checkpoint.save()
+    counts.save()
+    resultsink.flush_all()
+    return result
 
-        except Exception as e:
-            print(f"Unexpected error: {e}. Continuing.")
-            attempts += 1
-            time.sleep(1)
+def sweep_candidates(found_domains, taken_domains, domains, concurrency=dnsprobe.DEFAULT_CONCURRENCY,
+                     timeout=dnsprobe.DEFAULT_TIMEOUT, retries=dnsprobe.DEFAULT_RETRIES, resolvers=None,
+                     on_result=None):
+    """
+    Check a stream of candidates, e.g. from a wordlist or pattern, with the asyncio probe engine.
 
-    print("Completed search attempts.")
+    Repeated candidates and the ones already in the found or taken store are
+    dropped before they reach DNS (see candidates.unique). There is no cursor:
+    running the same source again skips what the last run recorded.
 
-if __name__ == '__main__':
-    main()
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        domains (iterable): Candidate domains, e.g.
+            candidates.with_tlds(candidates.expand_pattern('CVCV'), ['com', 'net']).
+        concurrency (int): Maximum number of DNS queries in flight.
+        timeout (float): Timeout in seconds for each query.
+        retries (int): Extra attempts for queries that time out.
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py).
+        on_result (callable): Called as on_result(domain, status) with each
+            recorded result, status being 'available', 'taken' or 'error'.
+
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains, and of each final outcome.
+    """
+    def record(add, store, status):
+        def callback(domain):
+            add(domain, store)
+            if on_result is not None:
+                on_result(domain, status)
+        return callback
+
+    result = dnsprobe.sweep(
+        candidates.unique(domains, (found_domains, taken_domains)),
+        on_taken=record(add_taken_domain, taken_domains, 'taken'),
+        on_found=record(add_found_domain, found_domains, 'available'),
+        on_failed=record(add_error_domain, found_domains, 'error'),
+        concurrency=concurrency,
+        timeout=timeout,
+        retries=retries,
+        resolvers=resolvers,
+        cache=answer_cache,
+    )
+    resultsink.flush_all()
+    return result
+
+def get_estimates(space=keyspace.DEFAULT, prefix_length=estimator.DEFAULT_PREFIX_LENGTH):
+    """Return the availability estimator of a keyspace, with the samples saved so far."""
+    return estimator.AvailabilityEstimator.load(
+        store_path(ESTIMATES_FILE, space), estimator.prefix_buckets(space, prefix_length))
+
+def _unchecked_test(found_domains, taken_domains, space):
+    """Return a function telling whether a keyspace index still needs a lookup."""
+    index = shared_index(found_domains, taken_domains)
+    if index is not None:
+        return lambda position: index.get_index(position) == domainindex.UNCHECKED
+
+    def is_unchecked(position):
+        domain = space.to_domain(position)
+        return domain not in found_domains and domain not in taken_domains
+    return is_unchecked
+
+def _iter_unchecked_range(found_domains, taken_domains, space, start, end):
+    """Yield the unchecked domains with a keyspace index in [start, end)."""
+    index = shared_index(found_domains, taken_domains)
+    if index is not None:
+        for position in index.iter_indexes(domainindex.UNCHECKED, start):
+            if position >= end:
+                return
+            yield space.to_domain(position)
+        return
+    for _, domain in space.iter(start, end):
+        if domain not in found_domains and domain not in taken_domains:
+            yield domain
+
+def _sweep_estimating(found_domains, taken_domains, domains, estimates, space, on_result=None, **sweep_args):
+    """Probe domains, recording each result in the stores and in the estimator."""
+    def record(add, store, status, available):
+        def callback(domain):
+            add(domain, store)
+            if available is not None:
+                estimates.record(space.to_index(domain), available)
+            if on_result is not None:
+                on_result(domain, status)
+        return callback
+
+    result = dnsprobe.sweep(
+        domains,
+        on_taken=record(add_taken_domain, taken_domains, 'taken', False),
+        on_found=record(add_found_domain, found_domains, 'available', True),
+        on_failed=record(add_error_domain, found_domains, 'error', None),
+        cache=answer_cache,
+        **sweep_args,
+    )
+    resultsink.flush_all()
+    estimates.save(store_path(ESTIMATES_FILE, space))
+    return result
+
+def estimate_availability(found_domains, taken_domains, samples=estimator.DEFAULT_SAMPLES, estimates=None,
+                          space=None, concurrency=dnsprobe.DEFAULT_CONCURRENCY, timeout=dnsprobe.DEFAULT_TIMEOUT,
+                          retries=dnsprobe.DEFAULT_RETRIES, resolvers=None, rng=random, on_result=None):
+    """
+    Probe random unchecked names of every keyspace bucket to estimate its availability rate.
+
+    The sampled names are recorded in the stores like any other lookup, and
+    the counts per bucket are added to the saved estimates (ESTIMATES_FILE,
+    one per keyspace), so repeated runs narrow the confidence intervals.
+
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        samples (int): Names to probe per bucket.
+        estimates (estimator.AvailabilityEstimator): Estimator to add to
+            (default: the saved one, with 2-character prefix buckets).
+        space (keyspace.Keyspace): Keyspace when the stores are sets.
+        concurrency (int): Maximum number of DNS queries in flight.
+        timeout (float): Timeout in seconds for each query.
+        retries (int): Extra attempts for queries that time out.
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py).
+        rng (random.Random): Source of the samples.
+        on_result (callable): Called as on_result(domain, status) with each recorded result.
+
+    Returns:
+        estimator.AvailabilityEstimator: The updated estimates.
+    """
+    space = sweep_space(found_domains, taken_domains, space)
+    estimates = estimates or get_estimates(space)
+    is_unchecked = _unchecked_test(found_domains, taken_domains, space)
+    domains = (space.to_domain(position) for position in estimates.sample(is_unchecked, samples, rng))
+    _sweep_estimating(found_domains, taken_domains, domains, estimates, space, on_result,
+                      concurrency=concurrency, timeout=timeout, retries=retries, resolvers=resolvers)
+    return estimates
+
+def sweep_by_yield(found_domains, taken_domains, estimates=None, min_rate=None, space=None,
+                   concurrency=dnsprobe.DEFAULT_CONCURRENCY, timeout=dnsprobe.DEFAULT_TIMEOUT,
+                   retries=dnsprobe.DEFAULT_RETRIES, resolvers=None, on_result=None):
+    """
+    Sweep the keyspace bucket by bucket, the most promising bucket first.
+
+    The next bucket is picked from the current estimates each time one is
+    exhausted, so the results of the sweep itself keep refining the order.
+    There is no cursor: the stores tell what is already done.
+
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        estimates (estimator.AvailabilityEstimator): Estimates to order by
+            (default: the saved ones; see estimate_availability).
+        min_rate (float): Skip buckets whose availability interval lies
+            entirely below this rate (default: sweep every bucket).
+        space (keyspace.Keyspace): Keyspace when the stores are sets.
+        concurrency (int): Maximum number of DNS queries in flight.
+        timeout (float): Timeout in seconds for each query.
+        retries (int): Extra attempts for queries that time out.
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py).
+        on_result (callable): Called as on_result(domain, status) with each recorded result.
+
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains and of each
+        outcome, plus the number of 'skipped_buckets'.
+    """
+    space = sweep_space(found_domains, taken_domains, space)
+    estimates = estimates or get_estimates(space)
+    skipped = [0]
+
+    def candidates():
+        remaining = set(range(len(estimates.buckets)))
+        while remaining:
+            number = estimates.ranking(remaining)[0]
+            remaining.discard(number)
+            if min_rate is not None and estimates.interval(number)[1] < min_rate:
+                skipped[0] += 1
+                continue
+            bucket = estimates.buckets[number]
+            log.info("Sweeping bucket %s: %s", bucket.label, estimates.estimate(number))
+            yield from _iter_unchecked_range(found_domains, taken_domains, space, bucket.start, bucket.end)
+
+    result = _sweep_estimating(found_domains, taken_domains, candidates(), estimates, space, on_result,
+                               concurrency=concurrency, timeout=timeout, retries=retries, resolvers=resolvers)
+    result['skipped_buckets'] = skipped[0]
+    return result
+
+def import_zone(path, found_domains, taken_domains, space=None, origin=''):
+    """
+    Mark every name delegated in a zone file as taken, without any DNS queries.
+
+    Names outside the keyspace are ignored. A name already taken is left
+    alone; any other (unchecked, found or failed) becomes taken, since a
+    delegation in the zone means it is registered. Found names that become
+    taken are removed from the found files (see move_domain).
 
+    Args:
+        path (str): Zone file, optionally gzipped, e.g. com.zone.gz.
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        space (keyspace.Keyspace): Keyspace to import into when the stores are sets.
+        origin (str): Origin for relative names before the first $ORIGIN line.
+
+    Returns:
+        dict: Counts of 'delegations' read in the keyspace's name length,
+        'in_keyspace' and newly 'marked' names.
+    """
+    space = sweep_space(found_domains, taken_domains, space)
+    counts = {'delegations': 0, 'in_keyspace': 0, 'marked': 0}
+    moved = []
+    for domain in zonefile.iter_delegations(path, space.length, origin):
+        counts['delegations'] += 1
+        if domain not in space:
+            continue
+        counts['in_keyspace'] += 1
+        if domain not in taken_domains:
+            if move_domain(domain, 'taken', found_domains, taken_domains, method='zone'):
+                moved.append(domain)
+            counts['marked'] += 1
+    resultsink.flush_all()
+    remove_results('found', moved)
+    if prefix_counts is not None:
+        prefix_counts.save()
+    return counts
+
+def merge_shards(found_domains, taken_domains, shard_dir=shardsweep.SHARD_DIR):
+    """
+    Merge results left in the shard files into the found/taken stores.
+
+    Returns:
+        dict: Counts of merged 'found' and 'taken' domains and skipped 'duplicates'.
+    """
+    if not os.path.isdir(shard_dir):
+        return {'found': 0, 'taken': 0, 'duplicates': 0}
+    return shardsweep.merge_shards(
+        shard_dir, found_domains, taken_domains,
+        on_found=lambda domain: add_found_domain(domain, found_domains),
+        on_taken=lambda domain: add_taken_domain(domain, taken_domains),
+        flush=resultsink.flush_all,
+    )
+
+def generate_domain_sharded(found_domains, taken_domains, processes=None, shards=None,
+                            concurrency=dnsprobe.DEFAULT_CONCURRENCY, shard_dir=None,
+                            resolvers=None, space=None):
+    """
+    Sweep the keyspace with one asyncio probe engine per CPU core.
+
+    The keyspace is split into disjoint shards (one per TLD and first
+    character by default) that run in a process pool, each writing its own
+    shard files. With index views as stores the workers read the index to
+    skip checked names; with sets they read the result files. Afterwards the
+    shard files are merged into the found/taken stores.
+
+    Args:
+        found_domains (set): Domains already found available.
+        taken_domains (set): Domains already found taken.
+        processes (int): Worker processes (default: one per CPU).
+        shards (int): Number of index-range shards (default: one per TLD and first character).
+        concurrency (int): Maximum number of DNS queries in flight per worker.
+        shard_dir (str): Directory for the shard result files (default:
+            SHARD_DIR, or a per-keyspace variant of it).
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py).
+        space (keyspace.Keyspace): Keyspace to sweep when the stores are sets; with
+            index views the index's keyspace is used.
+
+    Returns:
+        dict: Probe counts ('taken', 'found', 'failed') and merge counts ('merged', 'duplicates').
+    """
+    space = sweep_space(found_domains, taken_domains, space)
+    index = shared_index(found_domains, taken_domains)
+    shard_dir = shard_dir or store_path(shardsweep.SHARD_DIR, space)
+    store_files = [files[kind] for files in (result_files(space.length, tld) for tld in space.tlds)
+                   for kind in ('found', 'taken')]
+    # Leftovers from an interrupted run go in first, so workers see them as checked
+    merge_shards(found_domains, taken_domains, shard_dir)
+    counts = get_prefix_counts()
+    counts.save()
+    resultsink.flush_all()
+    if index is not None:
+        index.flush()
+    if answer_cache is not None:
+        answer_cache.commit()  # So the workers see the answers cached so far
+    result = shardsweep.run_shards(
+        shardsweep.shard_ranges(shards, space=space), shard_dir, store_files,
+        processes=processes, concurrency=concurrency, resolvers=resolvers,
+        answer_cache=answer_cache.path if answer_cache is not None else None,
+        space=space, index_path=index.path if index is not None else None,
+    )
+    merged = merge_shards(found_domains, taken_domains, shard_dir)
+    result['merged'] = merged['found'] + merged['taken']
+    result['duplicates'] = merged['duplicates']
+    counts.save()
+    return result
+
+def revalidate_stale(found_domains, taken_domains, limit=None, concurrency=dnsprobe.DEFAULT_CONCURRENCY,
+                     resolvers=None, whois_workers=whoispool.DEFAULT_WORKERS,
+                     whois_lookup=whoispool.whois_status, **probe_args):
+    """
+    Re-probe the cached domains whose last check has outlived its TTL, oldest first.
+
+    A domain whose outcome changed (e.g. a taken domain that dropped) is moved
+    to the other store and removed from the old store's result file, so the
+    latest result is also the one a rebuilt index or set loader sees (see
+    move_domain); one whose outcome held only gets a fresh timestamp.
+    NXDOMAIN alone does not make a taken domain available: registered
+    domains without a delegation (e.g. on hold) have no NS either, so WHOIS
+    has to confirm the drop first. If it does not, the domain stays taken
+    with a fresh timestamp. Domains whose DNS lookups fail keep their old
+    entry and stay due. Call this with a limit on a schedule (see
+    LookupCache.next_expiry) to spread the revalidation load over time.
+
+    Args:
+        found_domains (set): Domains found available.
+        taken_domains (set): Domains found taken.
+        limit (int): Maximum number of domains to re-probe (default: all stale ones).
+        concurrency (int): Maximum number of DNS queries in flight.
+        resolvers (list): (host, port) resolvers to query over raw UDP (see udpdns.py).
+        whois_workers (int): WHOIS worker threads confirming drops (see whoispool.py).
+        whois_lookup (callable): Called as whois_lookup(domain), returns a WHOIS status.
+        **probe_args: Passed on to dnsprobe.probe_many() (query, timeout, retries, backoff).
+
+    Returns:
+        dict: DNS probe counts plus 'changed' for domains whose outcome changed,
+        and 'whois_available', 'whois_registered' and 'whois_error' for the drops
+        sent to WHOIS.
+    """
+    cache = get_lookup_cache()
+    previous = {domain: (outcome, method) for domain, outcome, method in cache.stale(limit)}
+    changed = [0]
+    moved = {'found': [], 'taken': []}  # Old kind -> domains to remove from its result files
+    whois_counts = {'whois_available': 0, 'whois_registered': 0, 'whois_error': 0}
+    # WHOIS results arrive on worker threads, DNS results on the event loop thread
+    lock = threading.Lock()
+
+    def update(domain, outcome, kind, old_kind, method='dns'):
+        with lock:
+            if previous[domain][0] == outcome:
+                cache.record(domain, method, outcome)
+                return
+            changed[0] += 1
+            if move_domain(domain, kind, found_domains, taken_domains, method):
+                moved[old_kind].append(domain)
+
+    def on_found(domain):
+        if previous[domain][0] == lookupcache.TAKEN:
+            pool.submit(domain)
+        else:
+            update(domain, lookupcache.FOUND, 'found', 'taken')
+
+    def on_whois(domain, status):
+        with lock:
+            whois_counts['whois_' + status] += 1
+        if status == whoispool.AVAILABLE:
+            update(domain, lookupcache.FOUND, 'found', 'taken', method='whois')
+        elif status == whoispool.REGISTERED:
+            update(domain, lookupcache.TAKEN, 'taken', 'found', method='whois')
+        else:
+            # Unconfirmed: keep it taken until its next revalidation
+            update(domain, lookupcache.TAKEN, 'taken', 'found', method=previous[domain][1])
+
+    pool = whoispool.WhoisPool(on_whois, workers=whois_workers, lookup=whois_lookup)
+    with pool:
+        result = dnsprobe.sweep(
+            previous,
+            on_taken=lambda domain: update(domain, lookupcache.TAKEN, 'taken', 'found'),
+            on_found=on_found,
+            concurrency=concurrency,
+            resolvers=resolvers,
+            cache=answer_cache,
+            **probe_args,
+        )
+    result.update(whois_counts)
+    result['changed'] = changed[0]
+    cache.commit()
+    resultsink.flush_all()
+    for kind, domains in moved.items():
+        remove_results(kind, domains)
+    if prefix_counts is not None:
+        prefix_counts.save()
+    return result
+
+def is_available(domain, retries=3, lookup=whoispool.whois_status, delay=1):
+    """
+    Attempts a WHOIS lookup with a retry mechanism.
+    Returns True if the domain appears unregistered, False otherwise.
+
+    `lookup` is called as lookup(domain) and returns a whoispool status;
+    `delay` is the number of seconds to wait between attempts.
+    """
+    for attempt in range(retries):
+        status = lookup(domain)
+        if status == whoispool.AVAILABLE:
+            return True
+        if status == whoispool.REGISTERED:
+            return False
+        log.warning("Error checking %s (attempt %d/%d): %s", domain, attempt + 1, retries, status)
+        time.sleep(delay)  # Wait longer between retries
+    log.warning("Skipping %s after %d failed attempts.", domain, retries)
+    return False
+
+def main(argv=None):
+    """
+    Run the command line (see checker.py); without a subcommand the keyspace
+    is swept, DNS first and WHOIS confirming the rest as they stream in.
+    """
+    import checker  # checker builds on this module
+    return checker.main(argv)
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""
+Candidate keyspaces: every name of a given length under one or more TLDs.
+
+A Keyspace is a mixed-radix number: the TLD is the most significant digit,
+then one digit per character position. Each domain maps to a unique index
+in range(size) and back, so a keyspace can be streamed in constant memory,
+split into index ranges for sharding, and stored as a packed index.
+
+The module-level names describe the original 4-character .com keyspace,
+every candidate being first + mid + mid + last + '.com'.
+"""
+import hashlib
+import itertools
+import random
+
+ALPHANUMERIC = 'abcdefghijklmnopqrstuvwxyz0123456789'
+HYPHEN = '-'
+DEFAULT_CHUNK_SIZE = 10000  # Domains per list yielded by Keyspace.chunks()
+
+
+class Keyspace:
+    """
+    All names of `length` characters over an alphabet, under a list of TLDs.
+
+    Hyphens follow the LDH rule: never first or last. Indexes are TLD-major,
+    so the names of each TLD form one contiguous range (see tld_range).
+
+    Args:
+        length (int): Characters before the TLD.
+        tlds (iterable): TLDs, with or without the leading dot, e.g. ('com', 'net').
+        alphabet (str): Characters allowed at every position.
+        hyphens (bool): Allow '-' in the middle positions.
+    """
+
+    def __init__(self, length=4, tlds=('com',), alphabet=ALPHANUMERIC, hyphens=True):
+        if length < 1:
+            raise ValueError("Keyspace length must be at least 1")
+        self.length = length
+        self.tlds = tuple(tld.lstrip('.').lower() for tld in tlds)
+        if not self.tlds:
+            raise ValueError("Keyspace needs at least one TLD")
+        self.alphabet = alphabet
+        self.hyphens = hyphens
+        mid = alphabet + HYPHEN if hyphens else alphabet
+        if length == 1:
+            self.positions = (alphabet,)
+        else:
+            self.positions = (alphabet,) + (mid,) * (length - 2) + (alphabet,)
+        self.names_per_tld = 1
+        for chars in self.positions:
+            self.names_per_tld *= len(chars)
+        self.size = self.names_per_tld * len(self.tlds)
+        self._tld_numbers = {tld: number for number, tld in enumerate(self.tlds)}
+        self._digits = [{char: digit for digit, char in enumerate(chars)} for chars in self.positions]
+
+    def __repr__(self):
+        return (f"Keyspace(length={self.length}, tlds={self.tlds!r}, alphabet={self.alphabet!r}, "
+                f"hyphens={self.hyphens})")
+
+    def __str__(self):
+        return f"{self.length}-character {', '.join('.' + tld for tld in self.tlds)} keyspace"
+
+    def __eq__(self, other):
+        return isinstance(other, Keyspace) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, domain):
+        try:
+            self.to_index(domain)
+            return True
+        except ValueError:
+            return False
+
+    def _key(self):
+        return (self.length, self.tlds, self.alphabet, self.hyphens)
+
+    @property
+    def name(self):
+        """Short name for file names, e.g. '5char-com-net'."""
+        name = f"{self.length}char-{'-'.join(self.tlds)}"
+        if (self.alphabet, self.hyphens) != (ALPHANUMERIC, True):
+            name += '-' + hashlib.sha1(repr(self._key()).encode()).hexdigest()[:8]
+        return name
+
+    def to_index(self, domain):
+        """
+        Convert a domain name to its position in the keyspace.
+
+        Args:
+            domain (str): A domain, e.g. 'ab-c.com'.
+
+        Returns:
+            int: Index in range(size).
+
+        Raises:
+            ValueError: If the domain is not part of the keyspace.
+        """
+        name, _, tld = domain.rpartition('.')
+        tld_number = self._tld_numbers.get(tld)
+        if tld_number is None or len(name) != self.length:
+            raise ValueError(f"{domain} is not in the {self}")
+        index = tld_number
+        for char, digits, chars in zip(name, self._digits, self.positions):
+            digit = digits.get(char)
+            if digit is None:
+                raise ValueError(f"{domain} is not in the {self}")
+            index = index * len(chars) + digit
+        return index
+
+    def to_domain(self, index):
+        """
+        Convert a keyspace index back to its domain name.
+
+        Args:
+            index (int): Index in range(size).
+
+        Returns:
+            str: The domain name, including the TLD.
+        """
+        if not 0 <= index < self.size:
+            raise ValueError(f"Index {index} is outside the keyspace")
+        tld_number, index = divmod(index, self.names_per_tld)
+        chars = []
+        for alphabet in reversed(self.positions):
+            index, digit = divmod(index, len(alphabet))
+            chars.append(alphabet[digit])
+        return ''.join(reversed(chars)) + '.' + self.tlds[tld_number]
+
+    def tld_range(self, tld):
+        """Return the (start, end) index range of one TLD's names."""
+        start = self._tld_numbers[tld.lstrip('.').lower()] * self.names_per_tld
+        return start, start + self.names_per_tld
+
+    def random_domain(self, rng=random):
+        """Return a uniformly random domain of the keyspace."""
+        return self.to_domain(rng.randrange(self.size))
+
+    def iter(self, start=0, end=None):
+        """
+        Enumerate the keyspace in index order, like a mixed-radix counter.
+
+        Only the digits that roll over are touched on each step, so no
+        divmod or string building is repeated for the unchanged positions.
+
+        Args:
+            start (int): First index to yield.
+            end (int): Index to stop before (default: end of the keyspace).
+
+        Yields:
+            tuple: (index, domain) pairs.
+        """
+        end = self.size if end is None else min(end, self.size)
+        if start >= end:
+            return
+        positions = self.positions
+        domain = self.to_domain(start)
+        tld_number = self._tld_numbers[domain.rpartition('.')[2]]
+        suffix = '.' + self.tlds[tld_number]
+        digits = [alphabet.index(char) for char, alphabet in zip(domain, positions)]
+        chars = list(domain[:self.length])
+        for index in range(start, end):
+            yield index, ''.join(chars) + suffix
+            # Increment the last position, carrying into the ones before it
+            position = self.length - 1
+            while position >= 0:
+                alphabet = positions[position]
+                digits[position] += 1
+                if digits[position] < len(alphabet):
+                    chars[position] = alphabet[digits[position]]
+                    break
+                digits[position] = 0
+                chars[position] = alphabet[0]
+                position -= 1
+            else:
+                # Every position rolled over: carry into the TLD
+                tld_number += 1
+                if tld_number < len(self.tlds):
+                    suffix = '.' + self.tlds[tld_number]
+
+    def chunks(self, start=0, end=None, size=DEFAULT_CHUNK_SIZE):
+        """
+        Enumerate the keyspace as lists of up to `size` consecutive domains.
+
+        Yields:
+            tuple: (index of the first domain, list of domains).
+        """
+        names = (domain for _, domain in self.iter(start, end))
+        while True:
+            chunk = list(itertools.islice(names, size))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+
+DEFAULT = Keyspace(4, ('com',))  # The original 4-character .com keyspace
+
+ALLOWED_FIRST = ALPHANUMERIC  # Allowed characters for the first position
+ALLOWED_MID = ALLOWED_FIRST + HYPHEN  # Hyphen is allowed in the middle positions only
+ALLOWED_LAST = ALLOWED_FIRST
+TLD = '.com'
+
+POSITIONS = DEFAULT.positions
+KEYSPACE_SIZE = DEFAULT.size
+
+
+def domain_to_index(domain):
+    """
+    Convert a domain name to its position in the 4-character .com keyspace.
+
+    Raises:
+        ValueError: If the domain is not part of the keyspace.
+    """
+    return DEFAULT.to_index(domain)
+
+
+def index_to_domain(index):
+    """Convert a 4-character .com keyspace index back to its domain name."""
+    return DEFAULT.to_domain(index)
+
+
+def in_keyspace(domain):
+    """Return True if the domain is a valid 4-character .com candidate."""
+    return domain in DEFAULT
+
+
+def iter_keyspace(start=0, end=KEYSPACE_SIZE):
+    """Enumerate the 4-character .com keyspace as (index, domain) pairs, see Keyspace.iter."""
+    return DEFAULT.iter(start, end)
@@ -0,0 +1,182 @@
+"""
+Persistent lookup cache with TTL-based expiry.
+
+The found/taken files only say what a domain was at some unknown point in
+the past. The cache keeps, per domain, when it was last checked, how (DNS or
+WHOIS) and the outcome, in SQLite. Each outcome has its own time to live;
+stale() lists the entries past it, oldest check first, so a revalidation run
+only re-probes what is due instead of redoing the whole sweep.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Outcomes
+FOUND = 'found'
+TAKEN = 'taken'
+ERROR = 'error'
+
+DEFAULT_TTLS = {
+    FOUND: 1 * DAY,  # Available names get registered quickly, check often
+    TAKEN: 30 * DAY,  # Registrations mostly run for a year or more
+    ERROR: 1 * HOUR,  # Failed lookups are worth another try soon
+}
+DEFAULT_TTL = 7 * DAY  # For outcomes missing from the TTL table
+DEFAULT_BATCH_SIZE = 500  # Records per commit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    domain TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL,
+    method TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checks_expires_at ON checks (expires_at);
+"""
+
+
+class LookupCache:
+    """
+    SQLite-backed record of the last check of every domain.
+
+    Writes are committed in batches; call commit() or close() to make the
+    last batch durable. Safe to share between threads.
+
+    Args:
+        path (str): SQLite database file, created if missing.
+        ttls (dict): outcome -> seconds an outcome stays fresh (default: DEFAULT_TTLS).
+        batch_size (int): Records per commit.
+    """
+
+    def __init__(self, path, ttls=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.batch_size = batch_size
+        self.created = not os.path.exists(path)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ttl(self, outcome):
+        """Return the time to live in seconds of an outcome."""
+        return self.ttls.get(outcome, DEFAULT_TTL)
+
+    def record(self, domain, method, outcome, checked_at=None):
+        """
+        Store the result of a check, replacing any earlier one for the domain.
+
+        Args:
+            domain (str): The domain checked.
+            method (str): How it was checked, e.g. 'dns' or 'whois'.
+            outcome (str): FOUND, TAKEN or ERROR.
+            checked_at (float): Unix time of the check (default: now).
+        """
+        self.record_many([(domain, method, outcome, checked_at)])
+
+    def record_many(self, rows):
+        """Store many (domain, method, outcome, checked_at) checks in one statement."""
+        now = time.time()
+        values = []
+        for domain, method, outcome, checked_at in rows:
+            checked_at = now if checked_at is None else checked_at
+            values.append((domain, checked_at, method, outcome, checked_at + self.ttl(outcome)))
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO checks (domain, checked_at, method, outcome, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)", values)
+            self._uncommitted += len(values)
+            if self._uncommitted >= self.batch_size:
+                self._commit()
+
+    def get(self, domain):
+        """Return (checked_at, method, outcome) of a domain's last check, or None."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT checked_at, method, outcome FROM checks WHERE domain = ?", (domain,)).fetchone()
+
+    def stale(self, limit=None, now=None):
+        """
+        Return the domains whose last check has expired, oldest check first.
+
+        Args:
+            limit (int): Maximum number of domains (default: all of them).
+            now (float): Unix time to compare against (default: now).
+
+        Returns:
+            list: (domain, outcome, method) tuples.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._connection.execute(
+                "SELECT domain, outcome, method FROM checks WHERE expires_at <= ? ORDER BY checked_at LIMIT ?",
+                (now, -1 if limit is None else limit)).fetchall()
+
+    def next_expiry(self):
+        """Return the Unix time the next entry goes stale, or None if the cache is empty."""
+        with self._lock:
+            return self._connection.execute("SELECT MIN(expires_at) FROM checks").fetchone()[0]
+
+    def counts(self):
+        """Return a dict of outcome -> number of domains."""
+        with self._lock:
+            return dict(self._connection.execute("SELECT outcome, COUNT(*) FROM checks GROUP BY outcome"))
+
+    def set_ttls(self, ttls):
+        """Change the TTL table and recompute the expiry time of every entry."""
+        self.ttls = dict(ttls)
+        with self._lock:
+            for (outcome,) in self._connection.execute("SELECT DISTINCT outcome FROM checks").fetchall():
+                self._connection.execute("UPDATE checks SET expires_at = checked_at + ? WHERE outcome = ?",
+                                         (self.ttl(outcome), outcome))
+            self._commit()
+
+    def import_text(self, filename, method, outcome):
+        """
+        Add every domain of a result file that is not cached yet.
+
+        The files carry no timestamps, so the file's modification time is used
+        as the check time: the whole file becomes due at once, oldest file first.
+
+        Returns:
+            int: Number of domains added.
+        """
+        if not os.path.exists(filename):
+            return 0
+        checked_at = os.path.getmtime(filename)
+        with open(filename, 'r') as f:
+            rows = [(line.strip(), checked_at, method, outcome, checked_at + self.ttl(outcome))
+                    for line in f if line.strip()]
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO checks (domain, checked_at, method, outcome, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            self._commit()
+            return self._connection.total_changes - before
+
+    def commit(self):
+        """Commit the records written so far."""
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """Commit and close the database."""
+        with self._lock:
+            self._commit()
+            self._connection.close()
+
+    def _commit(self):
+        self._connection.commit()
+        self._uncommitted = 0
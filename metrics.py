@@ -0,0 +1,255 @@
+"""
+Structured metrics for the sweep.
+
+Printing a few lines per candidate makes stdout the bottleneck of a fast
+sweep. The hot path instead only bumps counters, histograms and gauges in
+METRICS, and a reporter thread periodically writes one JSON line with
+lookups/sec, latency percentiles, outcome counts, queue depths and the ETA
+to sweep completion. The same numbers can be served as Prometheus-style
+text on a local HTTP port.
+"""
+import bisect
+import json
+import sys
+import threading
+import time
+
+# Upper bounds in seconds, fine enough for sub-millisecond local stubs and multi-second WHOIS
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_REPORT_INTERVAL = 10.0  # Seconds between JSON lines
+
+LOOKUPS = 'dns_lookups_total'  # Counter the lookups/sec rate and ETA are based on
+REMAINING = 'sweep_remaining'  # Gauge the ETA is based on
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are estimated from the bucket bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the q-th quantile, None if empty."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and histograms.
+
+    Names may carry labels, e.g. inc('dns_lookups_total', outcome='nxdomain').
+    Gauges can be set to a value or to a callable evaluated at snapshot time.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self._last_rate = (self.started, 0)
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def add_gauge(self, name, amount, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def total(self, name):
+        """Return the sum of a counter over all its labels."""
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def gauge(self, name, **labels):
+        """Return the current value of a gauge, None if it was never set."""
+        with self._lock:
+            value = self._gauges.get(_key(name, labels))
+        return value() if callable(value) else value
+
+    def reset(self):
+        """Forget every metric, e.g. between benchmark runs."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started = time.monotonic()
+            self._last_rate = (self.started, 0)
+
+    def snapshot(self):
+        """
+        Return the current state as a JSON-serializable dict.
+
+        'lookups_per_sec' is the rate since the previous snapshot and 'eta_seconds'
+        the time left for the sweep_remaining gauge at that rate.
+        """
+        now = time.monotonic()
+        lookups = self.total(LOOKUPS)
+        with self._lock:
+            last_time, last_lookups = self._last_rate
+            self._last_rate = (now, lookups)
+            counters = {name + _label_text(labels): value for (name, labels), value in self._counters.items()}
+            gauges = {name + _label_text(labels): value for (name, labels), value in self._gauges.items()}
+            histograms = {
+                name + _label_text(labels): {
+                    'count': h.count,
+                    'mean': h.sum / h.count if h.count else None,
+                    'p50': h.quantile(0.5),
+                    'p99': h.quantile(0.99),
+                }
+                for (name, labels), h in self._histograms.items()
+            }
+        gauges = {name: value() if callable(value) else value for name, value in gauges.items()}
+        rate = (lookups - last_lookups) / (now - last_time) if now > last_time else 0.0
+        remaining = gauges.get(REMAINING)
+        return {
+            'time': time.time(),
+            'uptime': now - self.started,
+            'lookups_per_sec': rate,
+            'eta_seconds': remaining / rate if remaining is not None and rate > 0 else None,
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+        }
+
+    def to_json(self):
+        """Return a snapshot as one JSON line."""
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items(), key=lambda item: item[0])
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            for (name, labels), value in counters:
+                lines.append(f"{name}{_label_text(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {histogram.sum}")
+        for (name, labels), value in gauges:
+            value = value() if callable(value) else value
+            if value is not None:
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()  # Shared by the probe engine, the WHOIS pool and the sweeps
+
+
+class Reporter:
+    """
+    Background thread writing a JSON snapshot line every `interval` seconds.
+
+    Args:
+        metrics (Metrics): Registry to report.
+        interval (float): Seconds between lines.
+        stream (file): Where to write (default: stderr, keeping stdout for results).
+    """
+
+    def __init__(self, metrics=METRICS, interval=DEFAULT_REPORT_INTERVAL, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and write a final line."""
+        self._stop.set()
+        self._thread.join()
+        self._emit()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._emit()
+
+    def _emit(self):
+        self.stream.write(self.metrics.to_json() + "\n")
+        self.stream.flush()
+
+
+def serve_prometheus(metrics=METRICS, port=9108, host='127.0.0.1'):
+    """
+    Serve the metrics as Prometheus text on http://host:port/metrics from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: Call shutdown() on it to stop serving.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
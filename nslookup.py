@@ -1,32 +1,96 @@
 #! /usr/bin/python3
-from subprocess import Popen, PIPE
-from re import findall
- 
- 
+"""
+Batch CNAME/A/AAAA lookups, yielded as they complete.
+
+NSLookup used to fork `nslookup` for every domain and regex-parse its text
+output. It now asks the resolvers itself over one UDP socket (see udpdns.py),
+with a whole batch of domains in flight at once, so hundreds of domains take
+about one round trip instead of hundreds of process starts.
+"""
+import asyncio
+import itertools
+
+import udpdns
+
+DEFAULT_BATCH_SIZE = 500  # Domains in flight at once
+DEFAULT_TIMEOUT = 2.0  # Seconds to wait for each answer
+
+
 class NSLookup:
-    def __init__(self, domains):
+    """
+    Look up the canonical names and addresses of a list of domains.
+
+    Args:
+        domains (iterable): Domain names to look up.
+        resolvers (list): (host, port) resolvers (default: the system's, see udpdns.system_resolvers).
+        timeout (float): Seconds to wait for each answer.
+        batch_size (int): Domains looked up concurrently.
+        cache (answercache.AnswerCache): Cache of DNS answers to reuse and fill (optional).
+    """
+
+    def __init__(self, domains, resolvers=None, timeout=DEFAULT_TIMEOUT, batch_size=DEFAULT_BATCH_SIZE,
+                 cache=None):
         self.domains = domains
-        self.canonical = r"\s+canonical\s+name\s+=\s+(.*)\s+"
-        self.address = r"Address:\s+(\d+.\d+.\d+.\d+)\s+"
- 
+        self.resolvers = resolvers
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.cache = cache
+
+    async def lookup(self, client, domain):
+        """
+        Ask for the A and AAAA records of one domain at once.
+
+        Returns:
+            dict: 'domain', 'names' (CNAME targets, in chain order), 'ips'
+            (IPv4 and IPv6 addresses) and 'status' (udpdns status of the A query).
+        """
+        data = {'domain': domain, 'names': [], 'ips': [], 'status': None}
+        responses = await asyncio.gather(client.query(domain, 'A'), client.query(domain, 'AAAA'))
+        data['status'] = responses[0].status
+        for response in responses:
+            for record in udpdns.parse_records(response.packet):
+                if record.rtype == udpdns.QTYPES['CNAME']:
+                    if record.data not in data['names']:
+                        data['names'].append(record.data)
+                elif record.rtype in (udpdns.QTYPES['A'], udpdns.QTYPES['AAAA']):
+                    data['ips'].append(record.data)
+        return data
+
     def examine(self):
-        for d in self.domains:
-            data = {'domain': d, 'names': [], 'ips': []}
-            cmd = ["nslookup",  d]
-            out = Popen(cmd, stdout=PIPE).communicate()[0].decode()
-            server_names = findall(self.canonical, out)
-            server_ips = findall(self.address, out)
-            for name in server_names:
-                data['names'].append(name)
-            for ip in server_ips:
-                data['ips'].append(ip)
-            yield data
- 
- 
+        """
+        Look up every domain, a batch at a time.
+
+        Yields:
+            dict: The lookup() result of each domain, in completion order.
+        """
+        loop = asyncio.new_event_loop()
+        client = udpdns.UDPClient(self.resolvers or udpdns.system_resolvers(), self.timeout, self.cache)
+        pending = set()
+        try:
+            loop.run_until_complete(client.open())
+            domains = iter(self.domains)
+            batch = list(itertools.islice(domains, self.batch_size))
+            while batch:
+                pending = {loop.create_task(self.lookup(client, domain)) for domain in batch}
+                while pending:
+                    done, pending = loop.run_until_complete(
+                        asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED))
+                    for task in done:
+                        yield task.result()
+                batch = list(itertools.islice(domains, self.batch_size))
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            client.close()
+            loop.close()
+
+
 if __name__ == "__main__":
     # EXAMPLE CLIENT:
     domain_list = [
         'kenmacpherson.com', 'c-s6.com', 't836.com', 'nonexistentdomain123456789.com'
     ]
     for test in NSLookup(domain_list).examine():
-        print(test)
\ No newline at end of file
+        print(test)
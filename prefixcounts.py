@@ -0,0 +1,146 @@
+"""
+Incrementally maintained per-prefix progress counters.
+
+Keeps the number of found and taken domains for every 1- and 2-character
+prefix, so "how much of this prefix is done" is a dict lookup instead of a
+startswith scan over both result sets. The counters are saved as JSON next
+to the result files together with the size of each file at save time; on the
+next load only lines appended after that point are read.
+
+A domain is counted under one kind only. One that moves (e.g. a found
+domain that turns up in a zone file) is moved between the counters, and a
+rebuild counts a domain listed in both files as taken, the precedence the
+index and the set loaders use too.
+"""
+import json
+import os
+from collections import Counter
+
+import resultsink
+
+PREFIX_LENGTHS = (1, 2)
+KINDS = ('found', 'taken')
+
+
+class PrefixCounts:
+    """
+    Found/taken counts per 1- and 2-character domain prefix.
+
+    Args:
+        path (str): JSON file the counters are saved to.
+        files (dict): kind ('found'/'taken') -> result file the counts are kept for.
+    """
+
+    def __init__(self, path, files):
+        self.path = path
+        self.files = files
+        self.counts = {kind: Counter() for kind in KINDS}
+        self.offsets = {kind: 0 for kind in KINDS}
+
+    @classmethod
+    def load(cls, path, files):
+        """
+        Load saved counters and catch up with lines appended since they were saved.
+
+        Falls back to a full rebuild from the result files when there is no saved
+        state or a result file has shrunk since (e.g. was deleted or rewritten).
+        """
+        counts = cls(path, files)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            if all(saved['offsets'].get(kind, 0) <= _file_size(files[kind]) for kind in KINDS):
+                for kind in KINDS:
+                    counts.counts[kind] = Counter(saved['counts'][kind])
+                    counts.offsets[kind] = saved['offsets'][kind]
+                counts.catch_up()
+                return counts
+        counts.rebuild()
+        return counts
+
+    def add(self, kind, domain):
+        """Count one new domain of a kind ('found' or 'taken')."""
+        counter = self.counts[kind]
+        for length in PREFIX_LENGTHS:
+            counter[domain[:length]] += 1
+
+    def remove(self, kind, domain):
+        """Stop counting a domain of a kind, e.g. because it moved to the other kind."""
+        counter = self.counts[kind]
+        for length in PREFIX_LENGTHS:
+            prefix = domain[:length]
+            if counter[prefix] > 1:
+                counter[prefix] -= 1
+            else:
+                del counter[prefix]
+
+    def move(self, domain, from_kind, to_kind):
+        """Count a domain under to_kind instead of from_kind."""
+        self.remove(from_kind, domain)
+        self.add(to_kind, domain)
+
+    def found(self, prefix):
+        """Return the number of found domains starting with a 1- or 2-character prefix."""
+        return self.counts['found'][prefix]
+
+    def taken(self, prefix):
+        """Return the number of taken domains starting with a 1- or 2-character prefix."""
+        return self.counts['taken'][prefix]
+
+    def total(self, prefix):
+        """Return the number of checked (found + taken) domains starting with a prefix."""
+        return self.found(prefix) + self.taken(prefix)
+
+    def rebuild(self):
+        """Recount everything from the result files; a domain in both files counts as taken."""
+        seen = set()
+        for kind in ('taken', 'found'):
+            self.counts[kind] = Counter()
+            self.offsets[kind] = 0
+            for domain in self._read_from(kind, 0):
+                if domain not in seen:
+                    seen.add(domain)
+                    self.add(kind, domain)
+
+    def catch_up(self):
+        """Count lines appended to the result files since the last save or catch-up."""
+        for kind in KINDS:
+            for domain in self._read_from(kind, self.offsets[kind]):
+                self.add(kind, domain)
+
+    def save(self):
+        """Write the counters and the current result file sizes to self.path."""
+        # Sizes must include every counted domain, so buffered results go out first
+        for filename in self.files.values():
+            resultsink.flush_file(filename)
+        state = {
+            'counts': {kind: dict(self.counts[kind]) for kind in KINDS},
+            'offsets': {kind: _file_size(self.files[kind]) for kind in KINDS},
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self.offsets = state['offsets']
+
+    def _read_from(self, kind, offset):
+        """Yield the domains in a result file from a byte offset on, tracking the new offset."""
+        filename = self.files[kind]
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # A partial last line is left for the next catch-up
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                domain = line.strip().decode()
+                if domain:
+                    yield domain
+        self.offsets[kind] = offset
+
+
+def _file_size(filename):
+    """Return the size of a file in bytes, 0 if it does not exist."""
+    return os.path.getsize(filename) if os.path.exists(filename) else 0
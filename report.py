@@ -0,0 +1,245 @@
+"""
+Queries, reports and diffs over the result store.
+
+Everything here streams: rows come straight off the packed index (see
+domainindex.py) in keyspace order, filtered by state and name pattern and
+joined with the time and method of each domain's last check from the lookup
+cache (see lookupcache.py), so exporting millions of rows takes seconds and
+a constant amount of memory.
+
+An export written as CSV (or NDJSON) doubles as a snapshot of the store.
+Two snapshots of the same keyspace are in the same order, so diff_snapshots()
+compares them with a single sorted merge, one row of each at a time, e.g. to
+list the names that became available since last week's snapshot.
+Parquet output needs pyarrow; it is only imported when asked for.
+"""
+import csv
+import datetime
+import heapq
+import itertools
+import json
+import re
+
+import domainindex
+from candidates import PATTERN_CLASSES
+
+COLUMNS = ('domain', 'status', 'checked_at', 'method')
+DEFAULT_BATCH_SIZE = 65536  # Rows per Parquet row group
+
+
+def pattern_regex(pattern):
+    """
+    Compile a name pattern into a regular expression matching whole domains.
+
+    Syntax is that of candidates.parse_pattern without wordlists: C consonant,
+    V vowel, L letter, D digit, A letter or digit, ? letter, digit or hyphen,
+    [abc] one of the listed characters, plus * for any run of characters.
+    Anything else is a literal. A pattern without a '.' applies to the name
+    alone, with any TLD; one with a '.' to the whole domain.
+
+    Args:
+        pattern (str): e.g. 'CVCV', 'x*', '[xz]DD.net'.
+
+    Returns:
+        re.Pattern: Use its fullmatch() on domains.
+
+    Raises:
+        ValueError: For an unterminated character class.
+    """
+    parts = []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == '[':
+            end = pattern.find(']', position)
+            if end < 0:
+                raise ValueError(f"Unterminated [ in pattern {pattern!r}")
+            parts.append('[' + re.escape(pattern[position + 1:end].lower()) + ']')
+            position = end + 1
+            continue
+        if char == '*':
+            parts.append('[^.]*' if '.' not in pattern else '.*')
+        elif char in PATTERN_CLASSES:
+            parts.append('[' + re.escape(PATTERN_CLASSES[char]) + ']')
+        else:
+            parts.append(re.escape(char.lower()))
+        position += 1
+    if '.' not in pattern:
+        parts.append(r'\..+')
+    return re.compile(''.join(parts))
+
+
+def format_time(timestamp):
+    """Return a Unix time as an ISO 8601 UTC string, or '' for None."""
+    if timestamp is None:
+        return ''
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+def parse_time(text):
+    """
+    Parse a Unix time or an ISO 8601 date or time (UTC unless it has an offset).
+
+    Returns:
+        float: Unix time.
+
+    Raises:
+        ValueError: If the text is neither.
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    moment = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def iter_rows(index, statuses=('available',), pattern=None, cache=None, since=None):
+    """
+    Stream the domains of an index with one of some statuses.
+
+    Args:
+        index (domainindex.DomainIndex): Index to read.
+        statuses (iterable): Status names ('unchecked', 'available', 'taken', 'error').
+        pattern (str): Keep only the domains matching it (see pattern_regex).
+        cache (lookupcache.LookupCache): Source of the check times and methods (optional).
+        since (float): Keep only the domains last checked at or after this Unix
+            time; needs the cache.
+
+    Yields:
+        dict: 'domain', 'status', 'checked_at' (Unix time or None) and
+        'method' (or None), in keyspace order.
+    """
+    names = domainindex.STATE_NAMES
+    statuses = set(statuses)
+    states = sorted(state for state, name in names.items() if name in statuses)
+    matcher = pattern_regex(pattern).fullmatch if pattern else None
+    # Each state's indexes are ascending, so a merge keeps keyspace order
+    streams = [zip(index.iter_indexes(state), itertools.repeat(state)) for state in states]
+    to_domain = index.space.to_domain
+    for number, state in heapq.merge(*streams):
+        domain = to_domain(number)
+        if matcher is not None and not matcher(domain):
+            continue
+        checked = cache.get(domain) if cache is not None else None
+        checked_at, method = checked[:2] if checked else (None, None)
+        if since is not None and (checked_at is None or checked_at < since):
+            continue
+        yield {'domain': domain, 'status': names[state], 'checked_at': checked_at, 'method': method}
+
+
+def write_csv(rows, stream):
+    """
+    Write rows as CSV with a header, times in ISO 8601.
+
+    Returns:
+        int: Number of rows written.
+    """
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow((row['domain'], row['status'], format_time(row['checked_at']), row['method'] or ''))
+        count += 1
+    return count
+
+
+def write_parquet(rows, path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write rows to a Parquet file, a row group at a time.
+
+    Returns:
+        int: Number of rows written.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use CSV instead") from None
+    schema = pyarrow.schema([('domain', pyarrow.string()), ('status', pyarrow.string()),
+                             ('checked_at', pyarrow.timestamp('ms', tz='UTC')), ('method', pyarrow.string())])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            checked_at = row['checked_at']
+            batch.append(dict(row, checked_at=None if checked_at is None else int(checked_at * 1000)))
+            if len(batch) >= batch_size:
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def read_snapshot(stream):
+    """
+    Stream the (domain, status) rows of a CSV or NDJSON export.
+
+    Yields:
+        tuple: (domain, status), in file order.
+    """
+    first = stream.readline()
+    if first.startswith('{'):
+        for line in itertools.chain([first], stream):
+            if line.strip():
+                row = json.loads(line)
+                yield row['domain'], row['status']
+        return
+    header = next(csv.reader([first]), [])
+    if 'domain' not in header or 'status' not in header:
+        raise ValueError("Snapshot has neither a CSV header with domain and status nor NDJSON rows")
+    domain_column, status_column = header.index('domain'), header.index('status')
+    for fields in csv.reader(stream):
+        if fields:
+            yield fields[domain_column], fields[status_column]
+
+
+def _ordered(rows, key, label):
+    """Pass (domain, status) rows through, checking that their keys ascend."""
+    last = None
+    for domain, status in rows:
+        current = key(domain)
+        if last is not None and current <= last:
+            raise ValueError(f"{label} snapshot is not sorted (or has duplicates) at {domain}")
+        last = current
+        yield current, domain, status
+
+
+def diff_snapshots(old, new, key=None):
+    """
+    Compare two snapshots with a sorted merge, in constant memory.
+
+    Both must be sorted by the same key, as exports of one keyspace are
+    (key=space.to_index); a ValueError is raised as soon as a row is out of
+    order. Domains with the same status in both are skipped.
+
+    Args:
+        old (iterable): (domain, status) rows of the earlier snapshot.
+        new (iterable): (domain, status) rows of the later snapshot.
+        key (callable): Sort key of a domain (default: the domain itself).
+
+    Yields:
+        dict: 'domain', 'old' and 'new' status; None where a snapshot lacks the domain.
+    """
+    key = key or (lambda domain: domain)
+    old, new = _ordered(old, key, 'Old'), _ordered(new, key, 'New')
+    left, right = next(old, None), next(new, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and left[0] < right[0]):
+            yield {'domain': left[1], 'old': left[2], 'new': None}
+            left = next(old, None)
+        elif left is None or right[0] < left[0]:
+            yield {'domain': right[1], 'old': None, 'new': right[2]}
+            right = next(new, None)
+        else:
+            if left[2] != right[2]:
+                yield {'domain': right[1], 'old': left[2], 'new': right[2]}
+            left, right = next(old, None), next(new, None)
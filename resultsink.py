@@ -0,0 +1,170 @@
+"""
+Buffered, batched writer for the result files.
+
+append_domain opens the file, writes one line and closes it again for every
+result. A ResultSink keeps the file open and buffers lines, writing them out
+as one batch once the buffer is full or old enough (a timer thread flushes a
+line nobody writes after), at exit and on SIGTERM / SIGHUP. A crash loses at most the batch still in the buffer.
+"""
+import atexit
+import os
+import signal
+import threading
+import time
+
+DEFAULT_BATCH_SIZE = 500  # Lines buffered before a write
+DEFAULT_FLUSH_INTERVAL = 1.0  # Seconds a line may wait in the buffer
+
+_sinks = {}  # filename -> ResultSink, see get_sink()
+_sink_options = {}  # ResultSink options for shared sinks, see configure()
+_sinks_lock = threading.Lock()
+
+
+class ResultSink:
+    """
+    Append-only line writer with a write buffer.
+
+    Args:
+        filename (str): File to append to.
+        batch_size (int): Flush once this many lines are buffered.
+        flush_interval (float): Flush once the oldest buffered line is this many seconds old.
+        fsync (bool): fsync the file after every batch, so a batch survives power loss.
+    """
+
+    def __init__(self, filename, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync=False):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer = []
+        self._first_buffered_at = None
+        self._file = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, domain):
+        """Buffer one line, flushing if the size or time threshold is reached."""
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered_at = time.monotonic()
+                # The interval must also hold when no further line comes along
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            self._buffer.append(domain + "\n")
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._first_buffered_at >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        """Write out everything buffered so far."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Flush the buffer and close the file."""
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def pending(self):
+        """Return the number of buffered lines not yet written."""
+        return len(self._buffer)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = open(self.filename, 'a')
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer = []
+        self._first_buffered_at = None
+
+
+def configure(**options):
+    """
+    Set the ResultSink options (batch_size, flush_interval, fsync) of every shared sink.
+
+    Applies to the sinks already created and to those get_sink() creates
+    later, e.g. configure(fsync=True) for the --fsync command line flag.
+    """
+    with _sinks_lock:
+        _sink_options.update(options)
+        for sink in _sinks.values():
+            for name, value in options.items():
+                setattr(sink, name, value)
+
+
+def get_sink(filename, **options):
+    """
+    Return the shared sink for a file, creating it on first use.
+
+    Args:
+        filename (str): File to append to.
+        **options: ResultSink options, only used when the sink is created;
+            they override the ones set with configure().
+    """
+    with _sinks_lock:
+        sink = _sinks.get(filename)
+        if sink is None:
+            sink = _sinks[filename] = ResultSink(filename, **dict(_sink_options, **options))
+        return sink
+
+
+def flush_file(filename):
+    """Flush the shared sink of a file, if there is one, so the file can be read."""
+    sink = _sinks.get(filename)
+    if sink is not None:
+        sink.flush()
+
+
+def close_file(filename):
+    """Close the shared sink of a file, if there is one, so the file can be replaced; it reopens on the next write."""
+    sink = _sinks.get(filename)
+    if sink is not None:
+        sink.close()
+
+
+def flush_all():
+    """Flush every shared sink."""
+    for sink in list(_sinks.values()):
+        sink.flush()
+
+
+def install_signal_handlers(signals=(signal.SIGTERM, signal.SIGHUP)):
+    """
+    Flush every shared sink before the process is stopped by a signal.
+
+    SIGINT is left alone: it raises KeyboardInterrupt, and the atexit hook
+    flushes the sinks on the way out. Previously installed handlers still run
+    after the flush; where there was none the process exits as it would have.
+    """
+    for signum in signals:
+        previous = signal.getsignal(signum)
+
+        def handler(signum, frame, previous=previous):
+            flush_all()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                raise SystemExit(128 + signum)
+
+        signal.signal(signum, handler)
+
+
+atexit.register(flush_all)
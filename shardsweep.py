@@ -0,0 +1,217 @@
+"""
+Multi-process sharded sweep.
+
+The keyspace (any keyspace.Keyspace) is split into disjoint index ranges
+(shards) that run in a process pool. Every worker owns its shard's result
+files, so no two processes ever append to the same file. Workers skip what
+is already recorded by reading the canonical result files or, when there is
+one, the memory-mapped index (see domainindex.py). merge_shards() then folds the shard files into
+the canonical found/taken stores, skipping anything already recorded, and
+only deletes a shard file once all of its lines are in the canonical store.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import domainindex
+import dnsprobe
+import keyspace
+from answercache import AnswerCache
+from resultsink import ResultSink
+
+SHARD_DIR = "shards"
+
+
+def shard_ranges(shards=None, start=0, end=None, space=keyspace.DEFAULT):
+    """
+    Split a keyspace range into disjoint, contiguous index ranges.
+
+    Args:
+        shards (int): Number of shards; None gives one shard per TLD and first character.
+        start (int): First keyspace index.
+        end (int): Index to stop before (default: the end of the keyspace).
+        space (keyspace.Keyspace): Keyspace the indexes belong to.
+
+    Returns:
+        list: (start, end) tuples covering [start, end) exactly once.
+    """
+    end = space.size if end is None else end
+    if shards is None:
+        block = space.names_per_tld // len(space.positions[0])  # Names per first character
+        bounds = []
+        for tld in space.tlds:
+            tld_start, tld_end = space.tld_range(tld)
+            bounds += range(tld_start, tld_end, block)
+        bounds = [bound for bound in bounds if start < bound < end]
+    else:
+        step = -(-(end - start) // shards)
+        bounds = list(range(start + step, end, step))
+    edges = [start] + bounds + [end]
+    return [(lo, hi) for lo, hi in zip(edges, edges[1:]) if lo < hi]
+
+
+def shard_files(shard_dir, start, end):
+    """Return the (found, taken) result files of the shard covering [start, end)."""
+    name = f"{start:07d}-{end:07d}"
+    return (os.path.join(shard_dir, f"found.{name}.txt"),
+            os.path.join(shard_dir, f"taken.{name}.txt"))
+
+
+def read_range(filename, start, end, space=keyspace.DEFAULT):
+    """Return the domains in a result file whose keyspace index is in [start, end)."""
+    domains = set()
+    if not os.path.exists(filename):
+        return domains
+    with open(filename, 'r') as f:
+        for line in f:
+            domain = line.strip()
+            try:
+                if start <= space.to_index(domain) < end:
+                    domains.add(domain)
+            except ValueError:
+                continue
+    return domains
+
+
+def _drop_partial_line(filename):
+    """Cut a last line left unterminated by a crashed worker, so appends start on a fresh line."""
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def _unchecked_in_index(index_path, start, end, space):
+    """Yield the domains of [start, end) that are unchecked in an index file."""
+    with domainindex.DomainIndex(index_path, space=space) as index:
+        for number in index.iter_indexes(domainindex.UNCHECKED, start):
+            if number >= end:
+                break
+            yield space.to_domain(number)
+
+
+def sweep_shard(start, end, shard_dir, store_files, concurrency=dnsprobe.DEFAULT_CONCURRENCY,
+                answer_cache=None, space=keyspace.DEFAULT, index_path=None, **probe_args):
+    """
+    Probe every unchecked domain in one shard, writing to the shard's own files.
+
+    Domains already in the canonical stores (the index if there is one, else
+    the result files) or in this shard's files (from an earlier, interrupted
+    run) are skipped, so a shard can simply be rerun. Runs inside a worker
+    process; all state is local, nothing is shared.
+
+    Args:
+        start (int): First keyspace index of the shard.
+        end (int): Index to stop before.
+        shard_dir (str): Directory for the shard result files.
+        store_files (list): Canonical found/taken result files, read only;
+            not read when index_path is given.
+        concurrency (int): Maximum number of DNS queries in flight.
+        answer_cache (str): AnswerCache file shared by the workers (optional;
+            only used with resolvers).
+        space (keyspace.Keyspace): Keyspace the shard's indexes belong to.
+        index_path (str): Index file of the keyspace, read only (optional).
+        **probe_args: Passed on to dnsprobe.probe().
+
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains from this shard.
+    """
+    shard_found, shard_taken = shard_files(shard_dir, start, end)
+    checked = set()
+    for filename in (shard_found, shard_taken):
+        _drop_partial_line(filename)
+    for filename in [shard_found, shard_taken] + ([] if index_path else list(store_files)):
+        checked |= read_range(filename, start, end, space)
+
+    if index_path:
+        domains = _unchecked_in_index(index_path, start, end, space)
+    else:
+        domains = (domain for _, domain in space.iter(start, end))
+    candidates = (domain for domain in domains if domain not in checked)
+    cache = AnswerCache(answer_cache) if answer_cache else None
+    try:
+        with ResultSink(shard_found) as found_sink, ResultSink(shard_taken) as taken_sink:
+            return dnsprobe.sweep(
+                candidates,
+                on_taken=taken_sink.write,
+                on_found=found_sink.write,
+                concurrency=concurrency,
+                cache=cache,
+                **probe_args,
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def run_shards(ranges, shard_dir, store_files, processes=None,
+               concurrency=dnsprobe.DEFAULT_CONCURRENCY, **shard_args):
+    """
+    Sweep shards in a process pool.
+
+    Args:
+        ranges (list): (start, end) tuples, e.g. from shard_ranges().
+        shard_dir (str): Directory for the shard result files.
+        store_files (list): Canonical found/taken result files, read only.
+        processes (int): Worker processes (default: one per CPU).
+        concurrency (int): Maximum number of DNS queries in flight per worker.
+        **shard_args: Passed on to sweep_shard() (answer_cache, space,
+            index_path) and from there to dnsprobe.probe(); must be picklable.
+
+    Returns:
+        dict: Counts of 'taken', 'found' and 'failed' domains and of each outcome over all shards.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    totals = {'taken': 0, 'found': 0, 'failed': 0}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(sweep_shard, start, end, shard_dir, list(store_files), concurrency, **shard_args)
+            for start, end in ranges
+        ]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def merge_shards(shard_dir, found_domains, taken_domains, on_found, on_taken, flush=None):
+    """
+    Fold every shard result file into the canonical stores.
+
+    Each domain not yet in the matching set is passed to the callback (which
+    appends it to the canonical file and adds it to the set). The shard file
+    is removed only afterwards, so a crash mid-merge loses nothing and the
+    rerun skips whatever was already merged.
+
+    Args:
+        shard_dir (str): Directory holding the shard result files.
+        found_domains (set): Canonical found domains.
+        taken_domains (set): Canonical taken domains.
+        on_found (callable): Called with each new found domain.
+        on_taken (callable): Called with each new taken domain.
+        flush (callable): Called before a shard file is removed, to write out
+            anything the callbacks buffered (optional).
+
+    Returns:
+        dict: Counts of merged 'found' and 'taken' domains and skipped 'duplicates'.
+    """
+    merged = {'found': 0, 'taken': 0, 'duplicates': 0}
+    for kind, domains, callback in (('found', found_domains, on_found), ('taken', taken_domains, on_taken)):
+        for filename in sorted(glob.glob(os.path.join(shard_dir, f"{kind}.*.txt"))):
+            with open(filename, 'r') as f:
+                for line in f:
+                    domain = line.strip()
+                    # Skip blank lines and a last line cut off by a crashed worker
+                    if not domain or not line.endswith("\n"):
+                        continue
+                    if domain in domains:
+                        merged['duplicates'] += 1
+                        continue
+                    callback(domain)
+                    merged[kind] += 1
+            if flush is not None:
+                flush()
+            os.remove(filename)
+    return merged
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import udpdns
+from answercache import AnswerCache, answer_ttl
+from fakeservers import FakeDNSServer
+
+
+async def query_all(server, cache, names, qtype='NS'):
+    async with udpdns.UDPClient([server.address], timeout=0.2, cache=cache) as client:
+        return [await client.query(name, qtype) for name in names]
+
+
+class TestAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "answers.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ttls_from_answers(self):
+        with FakeDNSServer(nxdomain_ratio=0, ttl=600) as positive, \
+                FakeDNSServer(nxdomain_ratio=1, negative_ttl=120) as negative, \
+                FakeDNSServer(nxdomain_ratio=1, negative_ttl=None) as no_soa, \
+                FakeDNSServer(loss=1) as lossy:
+            [has_ns] = asyncio.run(query_all(positive, None, ["abcd.com"]))
+            [no_data] = asyncio.run(query_all(positive, None, ["abcd.com"], 'SOA'))
+            [nxdomain] = asyncio.run(query_all(negative, None, ["abcd.com"]))
+            [bare_nxdomain] = asyncio.run(query_all(no_soa, None, ["abcd.com"]))
+            [timeout] = asyncio.run(query_all(lossy, None, ["abcd.com"]))
+        self.assertEqual(answer_ttl(has_ns), 600)
+        self.assertEqual(answer_ttl(no_data), 900)  # The default negative TTL of the fake server
+        self.assertEqual(answer_ttl(nxdomain), 120)
+        self.assertIsNone(answer_ttl(bare_nxdomain))
+        self.assertIsNone(answer_ttl(timeout))
+
+    def test_client_answers_from_cache_within_ttl(self):
+        names = ["abcd.com", "xlt1.com", "zz-9.com"]
+        with FakeDNSServer(negative_ttl=60) as server:
+            with AnswerCache(self.path) as cache:
+                first = asyncio.run(query_all(server, cache, names))
+            self.assertEqual(server.queries, 3)
+            # A second process (here: a second connection) gets the answers without asking
+            with AnswerCache(self.path) as cache:
+                second = asyncio.run(query_all(server, cache, names))
+                self.assertEqual(len(cache), 3)
+            self.assertEqual(server.queries, 3)
+        self.assertEqual([r.status for r in first], [r.status for r in second])
+        self.assertEqual([r.resolver for r in second], [None] * 3)
+        self.assertEqual(udpdns.parse_records(second[0].packet, 2), udpdns.parse_records(first[0].packet, 2))
+
+    def test_expiry_and_purge(self):
+        with FakeDNSServer(nxdomain_ratio=1, negative_ttl=60) as server:
+            [response] = asyncio.run(query_all(server, None, ["abcd.com"]))
+        with AnswerCache(self.path, max_ttl=30) as cache:
+            self.assertEqual(cache.put("abcd.com", 'NS', response, now=1000), 30)
+            self.assertIsNotNone(cache.get("abcd.com", 'NS', now=1029))
+            self.assertIsNone(cache.get("abcd.com", 'NS', now=1030))
+            self.assertIsNone(cache.get("abcd.com", 'A', now=1000))
+            self.assertEqual(cache.purge(now=1030), 1)
+            self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
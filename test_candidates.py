@@ -0,0 +1,77 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+import candidates
+import finddomain_ifexists
+from candidates import BloomFilter, expand_pattern, iter_wordlist, unique, with_tlds
+from fakeservers import FakeDNSServer, name_ratio
+
+
+class TestPatterns(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_classes_and_literals(self):
+        labels = list(expand_pattern("CV"))
+        self.assertEqual(len(labels), len(candidates.CONSONANTS) * len(candidates.VOWELS))
+        self.assertEqual(labels[:2], ["ba", "be"])
+        self.assertEqual(list(expand_pattern("x[12]D"))[:3], ["x10", "x11", "x12"])
+        self.assertEqual(len(list(expand_pattern("x[12]D"))), 20)
+
+    def test_wordlist_placeholders(self):
+        path = os.path.join(self.tmpdir.name, "words.txt.gz")
+        with gzip.open(path, "wt") as f:
+            f.write("# comment\nApple\n\nkiwi\n")
+        self.assertEqual(list(iter_wordlist(path)), ["apple", "kiwi"])
+        self.assertEqual(list(expand_pattern("{word}[sz]", {"word": path})),
+                         ["apples", "applez", "kiwis", "kiwiz"])
+        self.assertEqual(list(expand_pattern("{a}{b}", {"a": ["x", "y"], "b": ["1", "2"]})),
+                         ["x1", "x2", "y1", "y2"])
+        with self.assertRaises(ValueError):
+            list(expand_pattern("{nope}"))
+        with self.assertRaises(ValueError):
+            list(expand_pattern("[ab"))
+
+    def test_with_tlds_skips_invalid_labels(self):
+        labels = ["ok", "-bad", "bad-", "b_d", "a-b"]
+        self.assertEqual(list(with_tlds(labels, [".com", "net"])),
+                         ["ok.com", "ok.net", "a-b.com", "a-b.net"])
+
+
+class TestDedupe(unittest.TestCase):
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=1e-6)
+        self.assertFalse(bloom.add("abcd.com"))
+        self.assertTrue(bloom.add("abcd.com"))
+        self.assertIn("abcd.com", bloom)
+        false_positives = sum(f"x{i}.com" in bloom for i in range(10000))
+        self.assertEqual(false_positives, 0)
+
+    def test_unique_drops_repeats_and_checked(self):
+        stream = ["a.com", "b.com", "a.com", "c.com", "b.com"]
+        self.assertEqual(list(unique(stream, checked=[{"c.com"}])), ["a.com", "b.com"])
+
+    def test_sweep_candidates(self):
+        found, taken = set(), {"ba.com"}
+        domains = list(with_tlds(expand_pattern("[bc]V"), ["com"])) * 2
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.multiple(finddomain_ifexists, FOUND_FILE=os.path.join(tmpdir, "found"),
+                                    TAKEN_FILE=os.path.join(tmpdir, "taken"), prefix_counts=None), \
+                mock.patch.object(finddomain_ifexists, "result_file",
+                                  lambda kind, domain: os.path.join(tmpdir, kind)), \
+                FakeDNSServer() as server:
+            result = finddomain_ifexists.sweep_candidates(found, taken, domains, concurrency=4,
+                                                          resolvers=[server.address])
+            self.assertEqual(finddomain_ifexists.read_domains(os.path.join(tmpdir, "found")), found)
+        self.assertEqual(server.queries, 9)
+        self.assertEqual(result['found'] + result['taken'], 9)
+        self.assertEqual(found, {d for d in set(domains) if name_ratio(d) < 0.5} - {"ba.com"})
+
+
+if __name__ == '__main__':
+    unittest.main()
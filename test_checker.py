@@ -0,0 +1,140 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import checker
+import finddomain_ifexists
+from checker import DomainChecker
+from fakeservers import FakeDNSServer, name_ratio
+
+
+def expected_status(domain):
+    return 'available' if name_ratio(domain) < 0.5 else 'taken'
+
+
+class TestDomainChecker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        files = {name: os.path.join(self.tmpdir.name, name)
+                 for name in ("FOUND_FILE", "TAKEN_FILE", "ERROR_FILE", "CHECKPOINT_FILE", "PREFIX_COUNTS_FILE",
+                              "CACHE_FILE", "ANSWER_CACHE_FILE")}
+        self.patch = mock.patch.multiple(finddomain_ifexists, prefix_counts=None, lookup_cache=None,
+                                         answer_cache=None, **files)
+        self.patch.start()
+        self.index_path = os.path.join(self.tmpdir.name, "domains.idx")
+        self.server = FakeDNSServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.patch.stop()
+        self.tmpdir.cleanup()
+
+    def cli(self, *args, stdin=""):
+        host, port = self.server.address
+        argv = ["--index", self.index_path, "--resolver", f"{host}:{port}"] + list(args)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), mock.patch("sys.stdin", io.StringIO(stdin)):
+            self.assertEqual(checker.main(argv), 0)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_check_records_keyspace_domains(self):
+        domains = ["abcd.com", "xlt1.com", "longername.com"]
+        with DomainChecker(index_path=self.index_path, resolvers=[self.server.address], cache=False) as domain_checker:
+            results = {r['domain']: r for r in domain_checker.check(domains)}
+            self.assertEqual({d: r['status'] for d, r in results.items()}, {d: expected_status(d) for d in domains})
+            self.assertEqual(domain_checker.status("abcd.com"), expected_status("abcd.com"))
+            self.assertIsNone(domain_checker.status("longername.com"))
+            self.assertEqual(domain_checker.stats()['unchecked'], domain_checker.space.size - 2)
+
+    def test_recheck_moves_domain(self):
+        with DomainChecker(index_path=self.index_path, cache=False, answer_cache=False) as domain_checker:
+            domain_checker.import_domains(["ujcq.com"], 'taken')
+        with FakeDNSServer(nxdomain_ratio=1) as server, \
+                DomainChecker(index_path=self.index_path, resolvers=[server.address], cache=False) as domain_checker:
+            self.assertEqual([r['status'] for r in domain_checker.check(["ujcq.com"])], ['available'])
+        self.assertEqual(finddomain_ifexists.get_found_domains(), {"ujcq.com"})
+        self.assertEqual(finddomain_ifexists.get_taken_domains(), set())
+        # A rebuild from the files agrees with the index
+        os.remove(self.index_path + finddomain_ifexists.OFFSETS_SUFFIX)
+        with DomainChecker(index_path=self.index_path, cache=False) as domain_checker:
+            self.assertEqual(domain_checker.status("ujcq.com"), 'available')
+
+    def test_answer_cache_only_with_resolvers(self):
+        with DomainChecker(index_path=self.index_path, cache=False) as domain_checker:
+            self.assertIsNone(domain_checker.answer_cache)
+        self.assertFalse(os.path.exists(finddomain_ifexists.ANSWER_CACHE_FILE))
+        with DomainChecker(index_path=self.index_path, resolvers=[self.server.address], cache=False) as domain_checker:
+            self.assertIsNotNone(domain_checker.answer_cache)
+
+    def test_cli_pipeline(self):
+        # Import a list from stdin, then check, export and count
+        self.assertEqual(self.cli("import", "--list", "-", stdin="abcd.com\n# comment\nlongername.com\n"),
+                         [{'imported': 1, 'skipped': 1}])
+        results = self.cli("check", stdin="xlt1.com\nzz-9.com\n")
+        self.assertEqual({r['domain']: r['status'] for r in results},
+                         {d: expected_status(d) for d in ("xlt1.com", "zz-9.com")})
+        exported = {r['domain']: r for r in self.cli("export", "--state", "taken")}
+        self.assertEqual(exported['abcd.com']['status'], 'taken')
+        self.assertEqual(exported['abcd.com']['method'], 'import')
+        stats = self.cli("stats")[0]
+        self.assertEqual(stats['keyspace'], '4char-com')
+        self.assertEqual(stats['taken'] + stats['available'], 3)
+
+    def test_sweep_candidates_from_stdin(self):
+        results = self.cli("sweep", "--candidates", "-", stdin="abcd.com\nabcd.com\nlongername.com\nxlt1.com\n")
+        self.assertEqual(sorted(r['domain'] for r in results), ["abcd.com", "xlt1.com"])
+        self.assertEqual(self.server.queries, 2)
+
+    def test_sweep_words_and_pattern(self):
+        wordlist = os.path.join(self.tmpdir.name, "words.txt")
+        with open(wordlist, "w") as f:
+            f.write("ab\ncd\n")
+        stderr = io.StringIO()
+        result_file = lambda kind, domain: os.path.join(self.tmpdir.name, kind + domain.rpartition('.')[2])
+        with contextlib.redirect_stderr(stderr), mock.patch.object(finddomain_ifexists, "result_file", result_file):
+            results = self.cli("--tld", "com", "--tld", "net", "sweep", "--candidates", "-",
+                               "--pattern", "x{word}z", "--wordlist", wordlist, stdin="abcd\nbad_\nlonger\n")
+        self.assertEqual(sorted(r['domain'] for r in results),
+                         ["abcd.com", "abcd.net", "xabz.com", "xabz.net", "xcdz.com", "xcdz.net"])
+        summary = json.loads(stderr.getvalue().splitlines()[-1])
+        # bad_ is no label and longer.* lie outside the 4-character keyspace
+        self.assertEqual(summary['skipped'], 3)
+
+    def test_cli_export_and_diff(self):
+        self.cli("import", "--list", "-", stdin="abcd.com\nabce.com\nxyz1.com\n")
+        old_path = os.path.join(self.tmpdir.name, "old.csv")
+        self.cli("export", "--state", "taken", "--state", "available", "--format", "csv", "--output", old_path)
+        self.cli("import", "--list", "-", "--state", "available", stdin="abce.com\nzzzz.com\n")
+        new_path = os.path.join(self.tmpdir.name, "new.csv")
+        self.cli("export", "--state", "taken", "--state", "available", "--pattern", "LLLL",
+                 "--format", "csv", "--output", new_path)
+        with open(new_path) as f:
+            self.assertEqual(f.readline(), "domain,status,checked_at,method\n")
+        self.assertEqual(self.cli("diff", old_path, new_path, "--to-state", "available"),
+                         [{'domain': 'abce.com', 'old': 'taken', 'new': 'available'},
+                          {'domain': 'zzzz.com', 'old': None, 'new': 'available'}])
+        # xyz1.com is filtered out of the new export by the pattern
+        self.assertEqual(self.cli("diff", old_path, new_path)[1], {'domain': 'xyz1.com', 'old': 'taken', 'new': None})
+
+    def test_cli_revalidate(self):
+        self.cli("import", "--list", "-", "--state", "available", stdin="zzzz.com\n")
+        with mock.patch("checker.time.sleep") as sleep:
+            results = self.cli("revalidate", "--batches", "2", "--found-ttl", "0", "--taken-ttl", "1")
+        # zzzz.com was re-probed, found taken and is fresh for an hour, so the loop slept until then
+        self.assertEqual([r['changed'] for r in results], [1, 0])
+        self.assertAlmostEqual(sleep.call_args[0][0], 3600, delta=60)
+        self.assertEqual([r['domain'] for r in self.cli("export", "--state", "taken")], ["zzzz.com"])
+
+    def test_cli_parquet_without_pyarrow(self):
+        output = os.path.join(self.tmpdir.name, "out.parquet")
+        with mock.patch.dict("sys.modules", {"pyarrow": None}), self.assertRaises(SystemExit) as exit_:
+            self.cli("export", "--format", "parquet", "--output", output)
+        self.assertIn("pyarrow", str(exit_.exception.code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import finddomain_ifexists
+from checkpoint import Checkpoint
+from dnsprobe import HAS_NS, NXDOMAIN, TIMEOUT
+from domainindex import AVAILABLE, TAKEN, UNCHECKED
+from keyspace import KEYSPACE_SIZE, Keyspace, index_to_domain, iter_keyspace
+from prefixcounts import PrefixCounts
+
+
+class TestKeyspaceEnumeration(unittest.TestCase):
+    def test_iter_keyspace_matches_index_to_domain(self):
+        for start, end in ((0, 50), (1300, 1400), (KEYSPACE_SIZE - 40, KEYSPACE_SIZE)):
+            self.assertEqual(
+                list(iter_keyspace(start, end)),
+                [(i, index_to_domain(i)) for i in range(start, end)])
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "sweep_checkpoint.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_without_checkpoint(self):
+        self.assertEqual(Checkpoint(self.path).load(), 0)
+
+    def test_saves_every_n_updates(self):
+        checkpoint = Checkpoint(self.path, every=3)
+        self.assertFalse(checkpoint.update(1))
+        self.assertFalse(checkpoint.update(2))
+        self.assertTrue(checkpoint.update(3))
+        self.assertEqual(Checkpoint(self.path).load(), 3)
+
+    def test_iter_unchecked_skips_finished_blocks(self):
+        counts = PrefixCounts("unused.json", {})
+        taken = set()
+        # Mark the whole 'aa' block as checked, plus the first domain of 'ab'
+        for index, domain in iter_keyspace(0, 1333):
+            taken.add(domain)
+            counts.add('taken', domain)
+        index, domain = next(finddomain_ifexists.iter_unchecked(set(), taken, 0, counts))
+        self.assertEqual((index, domain), (1333, "abab.com"))
+
+    def test_generate_domain_resumes_from_checkpoint(self):
+        found_file = os.path.join(self.tmpdir.name, "found.txt")
+        taken_file = os.path.join(self.tmpdir.name, "taken.txt")
+        counts_file = os.path.join(self.tmpdir.name, "prefixcounts.json")
+        checkpoint = Checkpoint(self.path)
+        checkpoint.cursor = KEYSPACE_SIZE - 4
+        checkpoint.save()
+        found, taken = set(), {index_to_domain(KEYSPACE_SIZE - 3)}
+        with mock.patch.multiple(finddomain_ifexists, FOUND_FILE=found_file, TAKEN_FILE=taken_file,
+                                 PREFIX_COUNTS_FILE=counts_file, prefix_counts=None), \
+                mock.patch.object(finddomain_ifexists, "classify_dns",
+                                  side_effect=[HAS_NS, NXDOMAIN, NXDOMAIN]) as dns:
+            finddomain_ifexists.generate_domain(found, taken, checkpoint=Checkpoint(self.path))
+        self.assertEqual(dns.call_count, 3)
+        self.assertEqual(found, {index_to_domain(KEYSPACE_SIZE - 2), index_to_domain(KEYSPACE_SIZE - 1)})
+        self.assertIn(index_to_domain(KEYSPACE_SIZE - 4), taken)
+        self.assertEqual(Checkpoint(self.path).load(), KEYSPACE_SIZE)
+
+    def test_generate_domain_retries_and_records_errors(self):
+        files = {name: os.path.join(self.tmpdir.name, name) for name in ("found", "taken", "error", "counts")}
+        checkpoint = Checkpoint(self.path)
+        checkpoint.cursor = KEYSPACE_SIZE - 2
+        checkpoint.save()
+        found, taken = set(), set()
+        with mock.patch.multiple(finddomain_ifexists, FOUND_FILE=files["found"], TAKEN_FILE=files["taken"],
+                                 ERROR_FILE=files["error"], PREFIX_COUNTS_FILE=files["counts"],
+                                 prefix_counts=None), \
+                mock.patch.object(finddomain_ifexists, "classify_dns",
+                                  side_effect=[TIMEOUT, TIMEOUT, TIMEOUT, NXDOMAIN]) as dns:
+            finddomain_ifexists.generate_domain(found, taken, checkpoint=Checkpoint(self.path),
+                                                retries=1, backoff=0)
+        self.assertEqual(dns.call_count, 4)
+        self.assertEqual(found, {index_to_domain(KEYSPACE_SIZE - 1)})
+        self.assertEqual(taken, set())
+        with open(files["error"]) as f:
+            self.assertEqual(f.read(), index_to_domain(KEYSPACE_SIZE - 2) + "\n")
+
+    def test_generate_domain_other_keyspace(self):
+        space = Keyspace(2, ("com", "net"), hyphens=False)
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            index = finddomain_ifexists.load_index(space=space)
+            found, taken = index.view(AVAILABLE), index.view(TAKEN)
+            taken.add("aa.net")
+            with mock.patch.multiple(finddomain_ifexists, prefix_counts=None), \
+                    mock.patch.object(finddomain_ifexists, "classify_dns",
+                                      side_effect=lambda domain, **kwargs: NXDOMAIN if domain.startswith("z9")
+                                      else HAS_NS) as dns:
+                finddomain_ifexists.generate_domain(found, taken)
+            self.assertEqual(dns.call_count, space.size - 1)
+            self.assertEqual(set(found), {"z9.com", "z9.net"})
+            self.assertEqual(index.count(UNCHECKED), 0)
+            with open("found2charnet.txt") as f:
+                self.assertEqual(f.read(), "z9.net\n")
+            checkpoint_file = finddomain_ifexists.store_path(finddomain_ifexists.CHECKPOINT_FILE, space)
+            self.assertEqual(Checkpoint(checkpoint_file).load(), space.size)
+            index.close()
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+import dnsprobe
+from fakeservers import FakeDNSServer
+from metrics import METRICS, Metrics
+
+
+async def collect(domains, **kwargs):
+    return [item async for item in dnsprobe.probe_many(domains, **kwargs)]
+
+
+class TestDNSProbe(unittest.TestCase):
+    def test_probe_maps_exceptions_to_outcomes(self):
+        async def times_out(domain, timeout):
+            raise asyncio.TimeoutError()
+
+        async def breaks(domain, timeout):
+            raise OSError("network is unreachable")
+
+        self.assertEqual(asyncio.run(dnsprobe.probe("abcd.com", times_out)), dnsprobe.TIMEOUT)
+        self.assertEqual(asyncio.run(dnsprobe.probe("abcd.com", breaks)), dnsprobe.SERVER_ERROR)
+
+    def test_retries_are_capped(self):
+        calls = []
+
+        async def always_times_out(domain, timeout):
+            calls.append(domain)
+            return dnsprobe.TIMEOUT
+
+        results = asyncio.run(collect(["abcd.com"], query=always_times_out, retries=2, backoff=0))
+        self.assertEqual(results, [("abcd.com", dnsprobe.TIMEOUT, 3)])
+        self.assertEqual(len(calls), 3)
+
+    def test_recovers_after_transient_failure(self):
+        calls = []
+
+        async def flaky(domain, timeout):
+            calls.append(domain)
+            return dnsprobe.SERVER_ERROR if len(calls) == 1 else dnsprobe.HAS_NS
+
+        results = asyncio.run(collect(["abcd.com"], query=flaky, backoff=0))
+        self.assertEqual(results, [("abcd.com", dnsprobe.HAS_NS, 2)])
+
+    def test_retry_queue(self):
+        queue = dnsprobe.RetryQueue(max_attempts=2, backoff=0)
+        self.assertTrue(queue.push("abcd.com", 1))
+        self.assertFalse(queue.push("abce.com", 2))
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue.pop_due(), ("abcd.com", 1))
+        self.assertIsNone(queue.pop_due())
+        self.assertIsNone(queue.wait_time())
+
+    def test_sweep_bounds_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def slow_query(domain, timeout):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return dnsprobe.HAS_NS if domain.startswith('t') else dnsprobe.NXDOMAIN
+
+        taken, found = [], []
+        domains = [c + "xyz.com" for c in "abcdefghijklmnopqrstuvwxyz"]
+        counts = dnsprobe.sweep(domains, taken.append, found.append, concurrency=4, query=slow_query)
+        self.assertLessEqual(peak, 4)
+        self.assertEqual(taken, ["txyz.com"])
+        self.assertEqual(len(found), 25)
+        self.assertEqual(counts['taken'], 1)
+        self.assertEqual(counts['found'], 25)
+        self.assertEqual(counts[dnsprobe.NXDOMAIN], 25)
+
+    def test_sweep_keeps_failures_out_of_results(self):
+        async def classify(domain, timeout):
+            return {'e': dnsprobe.NO_ANSWER, 's': dnsprobe.SERVER_ERROR}.get(domain[0], dnsprobe.TIMEOUT)
+
+        taken, found, failed = [], [], []
+        counts = dnsprobe.sweep(["eabc.com", "sabc.com", "tabc.com"], taken.append, found.append,
+                                failed.append, query=classify, retries=1, backoff=0)
+        self.assertEqual(taken, ["eabc.com"])
+        self.assertEqual(found, [])
+        self.assertEqual(sorted(failed), ["sabc.com", "tabc.com"])
+        self.assertEqual(counts['failed'], 2)
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_aimd_limit(self):
+        limit = dnsprobe.AIMDLimit(initial=10, maximum=12, target_latency=0.5)
+        for _ in range(20):
+            self.assertFalse(limit.record(dnsprobe.HAS_NS, 0.01))
+        self.assertGreater(limit.limit, 11)
+        # Failures push the error rate over the threshold: one sharp cut, then a cooldown
+        cuts = sum(limit.record(dnsprobe.TIMEOUT, 2.0) for _ in range(5))
+        self.assertEqual(cuts, 1)
+        self.assertAlmostEqual(limit.limit, 6, delta=0.5)
+        # Slow but successful answers count as congestion too
+        slow = dnsprobe.AIMDLimit(initial=8, target_latency=0.1)
+        self.assertTrue(slow.record(dnsprobe.NXDOMAIN, 1.0))
+        self.assertEqual(slow.limit, 4)
+
+    def test_controller_splits_slots_per_resolver(self):
+        registry = Metrics()
+        controller = dnsprobe.AdaptiveConcurrency([("a", 53), ("b", 53)], metrics=registry, initial=1)
+
+        async def scenario():
+            first = await controller.acquire()
+            second = await controller.acquire()
+            waiting = asyncio.ensure_future(controller.acquire())
+            await asyncio.sleep(0)
+            self.assertFalse(waiting.done())
+            controller.release(first, dnsprobe.SERVER_ERROR, 0.01)
+            return first, second, await waiting
+
+        first, second, third = asyncio.run(scenario())
+        self.assertEqual({first, second}, {("a", 53), ("b", 53)})
+        self.assertEqual(third, first)
+        self.assertEqual(registry.gauge('dns_concurrency_limit', resolver="a:53"), 1)
+        self.assertEqual(registry.gauge('dns_resolver_in_flight', resolver="a:53"), 1)
+        self.assertEqual(registry.gauge('dns_resolver_error_rate', resolver="a:53"), dnsprobe.SMOOTHING)
+
+    def test_sweep_backs_off_a_lossy_resolver(self):
+        with FakeDNSServer(loss=0.5, seed=1) as lossy, FakeDNSServer() as healthy:
+            domains = [f"{c}{d}ab.com" for c in "abcdefghij" for d in "0123456789"]
+            counts = dnsprobe.sweep(domains, lambda d: None, lambda d: None, concurrency=40,
+                                    resolvers=[lossy.address, healthy.address], timeout=0.05, backoff=0)
+        self.assertEqual(counts['taken'] + counts['found'] + counts['failed'], 100)
+        self.assertGreater(healthy.queries, lossy.queries)
+
+    def test_system_resolver_is_adaptive(self):
+        async def hang(domain, timeout):
+            await asyncio.sleep(1)
+
+        domains = [f"{c}{d}ab.com" for c in "abcd" for d in "0123456789"]
+        counts = dnsprobe.sweep(domains, lambda d: None, lambda d: None, concurrency=40, query=hang,
+                                timeout=0.01, retries=0)
+        self.assertEqual(counts['failed'], 40)
+        self.assertLess(METRICS.gauge('dns_concurrency_limit', resolver=dnsprobe.SYSTEM_RESOLVER),
+                        dnsprobe.DEFAULT_INITIAL_LIMIT)
+
+
+if __name__ == "__main__":
+    unittest.main()
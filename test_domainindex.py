@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import finddomain_ifexists
+from domainindex import DomainIndex, UNCHECKED, AVAILABLE, TAKEN, ERROR
+from keyspace import KEYSPACE_SIZE, Keyspace, domain_to_index, index_to_domain
+
+
+class TestKeyspace(unittest.TestCase):
+    def test_index_round_trip(self):
+        for domain in ("aaaa.com", "a-b9.com", "9--9.com", "xlt1.com"):
+            self.assertEqual(index_to_domain(domain_to_index(domain)), domain)
+        self.assertEqual(domain_to_index("aaaa.com"), 0)
+        self.assertEqual(domain_to_index("9--9.com"), KEYSPACE_SIZE - 1)
+
+    def test_rejects_domains_outside_keyspace(self):
+        for domain in ("abc.com", "-abc.com", "abc-.com", "abcd.net"):
+            with self.assertRaises(ValueError):
+                domain_to_index(domain)
+
+    def test_generalized_keyspace(self):
+        space = Keyspace(5, ("com", "net"))
+        self.assertEqual(space.names_per_tld, 36 * 37 ** 3 * 36)
+        self.assertEqual(space.size, 2 * space.names_per_tld)
+        self.assertEqual(space.tld_range("net"), (space.names_per_tld, space.size))
+        self.assertEqual(space.to_domain(space.names_per_tld), "aaaaa.net")
+        self.assertEqual(space.to_index("9---9.com"), space.names_per_tld - 1)
+        self.assertIn("ab-cd.net", space)
+        self.assertNotIn("abcd.com", space)
+        self.assertEqual(space.name, "5char-com-net")
+
+    def test_iter_streams_across_tlds(self):
+        space = Keyspace(2, ("com", "net"), hyphens=False)
+        names = list(space.iter())
+        self.assertEqual(len(names), space.size)
+        self.assertEqual([domain for _, domain in names[1294:1298]],
+                         ["98.com", "99.com", "aa.net", "ab.net"])
+        self.assertTrue(all(space.to_index(domain) == index for index, domain in names))
+        chunks = list(space.chunks(size=1000))
+        self.assertEqual([start for start, _ in chunks], [0, 1000, 2000])
+        self.assertEqual(chunks[1][1][0], space.to_domain(1000))
+        self.assertEqual(sum(len(chunk) for _, chunk in chunks), space.size)
+
+    def test_hyphen_rules(self):
+        self.assertNotIn("a-b.com", Keyspace(3, hyphens=False))
+        self.assertIn("a-b.com", Keyspace(3))
+        self.assertNotIn("-ab.com", Keyspace(3))
+        self.assertEqual(Keyspace(1).size, 36)
+
+
+class TestDomainIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "domains.idx")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_new_index_is_unchecked(self):
+        with DomainIndex(self.path) as index:
+            self.assertTrue(index.created)
+            self.assertEqual(index.count(UNCHECKED), KEYSPACE_SIZE)
+            self.assertEqual(index.next_unchecked(), 0)
+
+    def test_set_get_and_persist(self):
+        with DomainIndex(self.path) as index:
+            index.set("xlt1.com", TAKEN)
+            index.set("xlt2.com", AVAILABLE)
+            index.set("xlt3.com", ERROR)
+        with DomainIndex(self.path) as index:
+            self.assertFalse(index.created)
+            self.assertEqual(index.get("xlt1.com"), TAKEN)
+            self.assertEqual(index.get("xlt2.com"), AVAILABLE)
+            self.assertEqual(index.get("xlt3.com"), ERROR)
+            self.assertEqual(index.get("xlt4.com"), UNCHECKED)
+            self.assertEqual(index.counts()[UNCHECKED], KEYSPACE_SIZE - 3)
+
+    def test_count_range_and_find(self):
+        with DomainIndex(self.path) as index:
+            for i in range(3, 11):
+                index.set_index(i, TAKEN)
+            self.assertEqual(index.count(TAKEN, 5, 9), 4)
+            self.assertEqual(index.count(TAKEN, 0, 4), 1)
+            self.assertEqual(index.find(TAKEN), 3)
+            self.assertEqual(index.next_unchecked(3), 11)
+            self.assertEqual(list(index.iter_indexes(TAKEN, 9)), [9, 10])
+
+    def test_view_behaves_like_set(self):
+        with DomainIndex(self.path) as index:
+            taken = index.view(TAKEN)
+            taken.add("abcd.com")
+            self.assertIn("abcd.com", taken)
+            self.assertNotIn("abce.com", taken)
+            self.assertNotIn("abc.com", taken)
+            self.assertEqual(len(taken), 1)
+            self.assertEqual(list(taken), ["abcd.com"])
+
+    def test_import_text(self):
+        text_file = os.path.join(self.tmpdir.name, "taken.txt")
+        with open(text_file, "w") as f:
+            f.write("abcd.com\nxyz.com\n\nzz-9.com\n")
+        with DomainIndex(self.path) as index:
+            self.assertEqual(index.import_text(text_file, TAKEN), (2, 1))
+            self.assertEqual(index.get("zz-9.com"), TAKEN)
+
+    def test_index_of_other_keyspace(self):
+        space = Keyspace(3, ("com", "net"))
+        with DomainIndex(self.path, space=space) as index:
+            self.assertEqual(index.size, space.size)
+            found = index.view(AVAILABLE)
+            found.add("x-1.net")
+            self.assertIn("x-1.net", found)
+            self.assertNotIn("x-1.com", found)
+            self.assertEqual(list(found), ["x-1.net"])
+            with self.assertRaises(ValueError):
+                index.set("abcd.com", TAKEN)
+
+
+class TestIndexSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.files = {name: os.path.join(self.tmpdir.name, name) for name in ("found", "taken", "error")}
+        self.patch = mock.patch.multiple(finddomain_ifexists, FOUND_FILE=self.files["found"],
+                                         TAKEN_FILE=self.files["taken"], ERROR_FILE=self.files["error"])
+        self.patch.start()
+        self.path = os.path.join(self.tmpdir.name, "domains.idx")
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmpdir.cleanup()
+
+    def write(self, name, text, mode="a"):
+        with open(self.files[name], mode) as f:
+            f.write(text)
+
+    def test_imports_only_appended_lines(self):
+        self.write("taken", "abcd.com\n")
+        index = finddomain_ifexists.load_index(self.path)
+        finddomain_ifexists.save_index(index)
+        index.set("abcd.com", UNCHECKED)  # Not in the files, so not re-imported below
+        index.close()
+        self.write("found", "xlt1.com\n")
+        with mock.patch.object(DomainIndex, "import_text", autospec=True,
+                               side_effect=DomainIndex.import_text) as import_text:
+            index = finddomain_ifexists.load_index(self.path)
+        self.assertEqual(import_text.call_count, 1)
+        self.assertEqual(index.get("xlt1.com"), AVAILABLE)
+        self.assertEqual(index.get("abcd.com"), UNCHECKED)
+        index.close()
+
+    def test_rebuilds_after_files_shrink(self):
+        self.write("taken", "abcd.com\nabce.com\n")
+        index = finddomain_ifexists.load_index(self.path)
+        finddomain_ifexists.save_index(index)
+        index.set("abcd.com", UNCHECKED)
+        index.close()
+        self.write("taken", "abcd.com\n", mode="w")
+        with finddomain_ifexists.load_index(self.path) as index:
+            self.assertEqual(index.get("abcd.com"), TAKEN)
+
+    def test_rebuild_drops_domains_removed_from_files(self):
+        self.write("taken", "abcd.com\nabce.com\n")
+        index = finddomain_ifexists.load_index(self.path)
+        finddomain_ifexists.save_index(index)
+        index.close()
+        self.write("taken", "abce.com\n", mode="w")
+        with finddomain_ifexists.load_index(self.path) as index:
+            self.assertEqual(index.get("abcd.com"), UNCHECKED)
+            self.assertEqual(index.get("abce.com"), TAKEN)
+            self.assertEqual(index.counts()[TAKEN], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
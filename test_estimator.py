@@ -0,0 +1,77 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+import finddomain_ifexists
+import keyspace
+from estimator import AvailabilityEstimator, Bucket, prefix_buckets, wilson_interval
+from fakeservers import FakeDNSServer, name_ratio
+
+SMALL = keyspace.Keyspace(2, ('com', 'net'), alphabet='abc', hyphens=False)
+
+
+class TestEstimator(unittest.TestCase):
+    def test_wilson_interval(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        low, high = wilson_interval(0, 10)
+        self.assertEqual(low, 0.0)
+        self.assertAlmostEqual(high, 0.2775, places=4)
+        low, high = wilson_interval(5, 10)
+        self.assertAlmostEqual(low, 1 - high)
+        # More samples, narrower interval
+        self.assertLess(wilson_interval(50, 100)[1] - wilson_interval(50, 100)[0], high - low)
+
+    def test_prefix_buckets(self):
+        buckets = prefix_buckets(SMALL, 1)
+        self.assertEqual(len(buckets), 6)
+        self.assertEqual(buckets[0], Bucket('a*.com', 0, 3))
+        self.assertEqual(buckets[-1], Bucket('c*.net', 15, 18))
+        self.assertEqual([b.label for b in prefix_buckets(SMALL, 5)][:2], ['aa.com', 'ab.com'])
+        self.assertEqual(len(prefix_buckets(keyspace.DEFAULT)), 36 * 37)
+
+    def test_ranking_sampling_and_persistence(self):
+        estimates = AvailabilityEstimator(prefix_buckets(SMALL, 1))
+        for index, available in [(0, False), (1, False), (4, True), (5, True), (7, True), (8, False)]:
+            estimates.record(index, available)
+        self.assertEqual(estimates.ranking()[:3], [1, 2, 0])
+        samples = list(estimates.sample(lambda index: index % 3 != 0, per_bucket=5, rng=random.Random(1)))
+        self.assertEqual(len(samples), 12)  # Only two unchecked names per bucket
+        self.assertEqual(len(set(samples)), 12)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "estimates.json")
+            estimates.save(path)
+            loaded = AvailabilityEstimator.load(path, prefix_buckets(SMALL, 1))
+        self.assertEqual(loaded.estimate(1), estimates.estimate(1))
+
+
+class TestSweepByYield(unittest.TestCase):
+    def test_high_yield_buckets_first(self):
+        found, taken = set(), set()
+        results = []
+        estimates = AvailabilityEstimator(prefix_buckets(SMALL, 1))
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.multiple(finddomain_ifexists, FOUND_FILE=os.path.join(tmpdir, "found"),
+                                    TAKEN_FILE=os.path.join(tmpdir, "taken"), prefix_counts=None,
+                                    ESTIMATES_FILE=os.path.join(tmpdir, "estimates.json")), \
+                mock.patch.object(finddomain_ifexists, "result_file",
+                                  lambda kind, domain: os.path.join(tmpdir, kind)), \
+                FakeDNSServer() as server:
+            finddomain_ifexists.estimate_availability(
+                found, taken, samples=2, estimates=estimates, space=SMALL, resolvers=[server.address],
+                rng=random.Random(3))
+            self.assertEqual(sum(estimates.trials), 12)
+            ranking = estimates.ranking()
+            result = finddomain_ifexists.sweep_by_yield(
+                found, taken, estimates, space=SMALL, resolvers=[server.address], concurrency=1,
+                on_result=lambda domain, status: results.append(domain))
+        self.assertEqual(len(found) + len(taken), SMALL.size)
+        self.assertEqual(result['found'] + result['taken'], SMALL.size - 12)
+        self.assertEqual(found, {d for _, d in SMALL.iter() if name_ratio(d) < 0.5})
+        # The first bucket swept is the one ranked best after sampling
+        first = estimates.buckets[ranking[0]]
+        self.assertIn(SMALL.to_index(results[0]), range(first.start, first.end))
+
+
+if __name__ == '__main__':
+    unittest.main()
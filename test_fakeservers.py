@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+import benchmark
+import finddomain_ifexists
+import udpdns
+import whoispool
+from fakeservers import FakeDNSServer, FakeWhoisServer, name_ratio
+
+
+class TestFakeDNSServer(unittest.TestCase):
+    def test_answers_follow_nxdomain_ratio(self):
+        names = [f"x{i:03d}.com" for i in range(200)]
+        with FakeDNSServer(nxdomain_ratio=0.3) as server:
+            resolver = server.resolver()
+            outcomes = [finddomain_ifexists.classify_dns(name, resolver=resolver) for name in names]
+        expected = ['nxdomain' if name_ratio(name) < 0.3 else 'has_ns' for name in names]
+        self.assertEqual(outcomes, expected)
+        self.assertEqual(server.queries, len(names))
+
+    def test_loss_and_record_types(self):
+        async def run(address):
+            async with udpdns.UDPClient([address], timeout=0.2) as client:
+                return await asyncio.gather(client.query("a.com", 'A'), client.query("a.com", 'AAAA'))
+
+        with FakeDNSServer(nxdomain_ratio=0) as server:
+            responses = asyncio.run(run(server.address))
+        self.assertEqual([r.answer_count for r in responses], [1, 1])
+        with FakeDNSServer(loss=1) as server:
+            responses = asyncio.run(run(server.address))
+        self.assertEqual([r.status for r in responses], [udpdns.TIMEOUT, udpdns.TIMEOUT])
+        self.assertEqual(server.dropped, 2)
+
+
+class TestFakeWhoisServer(unittest.TestCase):
+    def test_raw_lookup(self):
+        with FakeWhoisServer(available_ratio=1, port=0) as server:
+            self.assertEqual(server.lookup()("abcd.com"), whoispool.AVAILABLE)
+            self.assertTrue(finddomain_ifexists.is_available("abcd.com", lookup=server.lookup()))
+        with FakeWhoisServer(available_ratio=0, port=0) as server:
+            self.assertEqual(server.lookup()("abcd.com"), whoispool.REGISTERED)
+        with FakeWhoisServer(loss=1, port=0) as server:
+            self.assertFalse(finddomain_ifexists.is_available("abcd.com", lookup=server.lookup(), delay=0))
+            self.assertEqual(server.dropped, 3)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_reports_every_benchmark(self):
+        results = benchmark.run(count=40)
+        self.assertEqual([r['benchmark'] for r in results], list(benchmark.BENCHMARKS))
+        for result in results:
+            self.assertEqual(result['domains'], 40)
+            self.assertGreater(result['domains_per_sec'], 0)
+            self.assertIsNotNone(result['p99'])
+            self.assertGreater(result['max_rss_kb'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
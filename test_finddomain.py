@@ -1,16 +1,50 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
+import finddomain_ifexists
+import resultsink
 from finddomain_ifexists import (
     has_dns_record, read_domains, append_domain, get_found_domains, get_taken_domains,
     add_found_domain, add_taken_domain, calculateFirstLetter
 )
+from fakeservers import FakeDNSServer
+from prefixcounts import PrefixCounts
 
 class TestFindDomainMethods(unittest.TestCase):
+    def setUp(self):
+        # Results go to files in a temporary directory, not to the stores in the working tree
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.object(finddomain_ifexists, "result_file",
+                                       lambda kind, domain: os.path.join(self.tmpdir.name, kind))
+        self.patch.start()
+
+    def tearDown(self):
+        resultsink.flush_all()
+        self.patch.stop()
+        self.tmpdir.cleanup()
+
     def test_has_dns_record_false(self):
-        # t836.com should not resolve
-        self.assertFalse(has_dns_record("t836.com"))
+        # Every name is NXDOMAIN on this server, so t836.com should not resolve
+        with FakeDNSServer(nxdomain_ratio=1) as server:
+            self.assertFalse(has_dns_record("t836.com", resolver=server.resolver()))
+
+    def test_has_dns_record_true(self):
+        with FakeDNSServer(nxdomain_ratio=0) as server:
+            self.assertTrue(has_dns_record("t836.com", resolver=server.resolver()))
+
+    def test_import_is_lazy(self):
+        # whois and dnspython are only loaded by the stages that use them
+        code = ("import sys, finddomain_ifexists; "
+                "print(sorted(m for m in ('whois', 'dns.resolver') if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        self.assertEqual(output.strip(), "[]")
 
     def test_append_and_read_domains(self):
-        test_file = "test_domains.txt"
+        test_file = os.path.join(self.tmpdir.name, "test_domains.txt")
         append_domain(test_file, "abc.com")
         domains = read_domains(test_file)
         self.assertIn("abc.com", domains)
@@ -28,6 +62,7 @@ class TestFindDomainMethods(unittest.TestCase):
         test_set = set()
         add_found_domain("xyz.com", test_set)
         self.assertIn("xyz.com", test_set)
+        self.assertEqual(read_domains(os.path.join(self.tmpdir.name, "found")), {"xyz.com"})
 
     def test_add_taken_domain(self):
         test_set = set()
@@ -40,5 +75,12 @@ class TestFindDomainMethods(unittest.TestCase):
         count = calculateFirstLetter('a', found, taken)
         self.assertEqual(count, 3)
 
+    def test_calculateFirstLetter_with_counts(self):
+        counts = PrefixCounts("unused.json", {})
+        counts.add('found', "abcd.com")
+        counts.add('taken', "a999.com")
+        count = calculateFirstLetter('a', set(), set(), counts)
+        self.assertEqual(count, 2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import dnsprobe
+import finddomain_ifexists
+import whoispool
+from domainindex import AVAILABLE, TAKEN as INDEX_TAKEN
+from lookupcache import LookupCache, FOUND, TAKEN, ERROR, DAY, HOUR
+
+
+class TestLookupCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "lookups.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_record_and_get(self):
+        with LookupCache(self.path) as cache:
+            self.assertTrue(cache.created)
+            cache.record("abcd.com", "dns", TAKEN, checked_at=100)
+            cache.record("abcd.com", "whois", FOUND, checked_at=200)
+            self.assertEqual(cache.get("abcd.com"), (200, "whois", FOUND))
+            self.assertIsNone(cache.get("abce.com"))
+        with LookupCache(self.path) as cache:
+            self.assertFalse(cache.created)
+            self.assertEqual(cache.counts(), {FOUND: 1})
+
+    def test_stale_uses_ttl_per_outcome_oldest_first(self):
+        with LookupCache(self.path, ttls={FOUND: DAY, TAKEN: 30 * DAY, ERROR: HOUR}) as cache:
+            cache.record("take.com", "dns", TAKEN, checked_at=0)
+            cache.record("fnd2.com", "dns", FOUND, checked_at=HOUR)
+            cache.record("fnd1.com", "dns", FOUND, checked_at=0)
+            cache.record("err1.com", "dns", ERROR, checked_at=DAY)
+            now = 2 * DAY
+            self.assertEqual(cache.stale(now=now), [("fnd1.com", FOUND, "dns"), ("fnd2.com", FOUND, "dns"),
+                                                       ("err1.com", ERROR, "dns")])
+            self.assertEqual(cache.stale(limit=1, now=now), [("fnd1.com", FOUND, "dns")])
+            self.assertEqual(cache.next_expiry(), DAY)
+            cache.set_ttls({FOUND: 3 * DAY, TAKEN: DAY, ERROR: HOUR})
+            self.assertEqual(cache.stale(now=now), [("take.com", TAKEN, "dns"), ("err1.com", ERROR, "dns")])
+
+    def test_import_text_keeps_existing_entries(self):
+        text_file = os.path.join(self.tmpdir.name, "taken.txt")
+        with open(text_file, "w") as f:
+            f.write("abcd.com\nabce.com\n")
+        with LookupCache(self.path) as cache:
+            cache.record("abcd.com", "whois", FOUND)
+            self.assertEqual(cache.import_text(text_file, "dns", TAKEN), 1)
+            self.assertEqual(cache.get("abcd.com")[2], FOUND)
+            self.assertEqual(cache.get("abce.com")[2], TAKEN)
+
+    def test_revalidate_stale_moves_changed_domains(self):
+        files = {name: os.path.join(self.tmpdir.name, name) for name in ("found", "taken", "error")}
+        cache = LookupCache(self.path)
+        cache.record("drop.com", "dns", TAKEN, checked_at=0)
+        cache.record("same.com", "dns", TAKEN, checked_at=0)
+        found, taken = set(), {"drop.com", "same.com"}
+        with open(files["taken"], "w") as f:
+            f.write("drop.com\nsame.com\n")
+
+        async def query(domain, timeout):
+            return dnsprobe.NXDOMAIN if domain == "drop.com" else dnsprobe.HAS_NS
+
+        with mock.patch.multiple(finddomain_ifexists, FOUND_FILE=files["found"], TAKEN_FILE=files["taken"],
+                                 ERROR_FILE=files["error"], lookup_cache=cache, prefix_counts=None):
+            result = finddomain_ifexists.revalidate_stale(
+                found, taken, whois_lookup=lambda domain: whoispool.AVAILABLE, query=query)
+            # The stores were rewritten, so reloading them gives the new state too
+            self.assertEqual(finddomain_ifexists.get_found_domains(), {"drop.com"})
+            self.assertEqual(finddomain_ifexists.get_taken_domains(), {"same.com"})
+            with finddomain_ifexists.load_index(os.path.join(self.tmpdir.name, "domains.idx")) as index:
+                self.assertEqual((index.get("drop.com"), index.get("same.com")), (AVAILABLE, INDEX_TAKEN))
+        self.assertEqual(result['changed'], 1)
+        self.assertEqual(found, {"drop.com"})
+        self.assertEqual(taken, {"same.com"})
+        self.assertEqual(cache.get("drop.com")[2], FOUND)
+        self.assertGreater(cache.get("same.com")[0], 0)
+        self.assertEqual(cache.stale(), [])
+        cache.close()
+
+    def test_revalidate_stale_confirms_drops_with_whois(self):
+        files = {name: os.path.join(self.tmpdir.name, name) for name in ("found", "taken", "error")}
+        cache = LookupCache(self.path)
+        # On hold: registered, but without a delegation, so DNS answers NXDOMAIN
+        cache.record("hold.com", "whois", TAKEN, checked_at=0)
+        found, taken = set(), {"hold.com"}
+        with open(files["taken"], "w") as f:
+            f.write("hold.com\n")
+
+        async def query(domain, timeout):
+            return dnsprobe.NXDOMAIN
+
+        with mock.patch.multiple(finddomain_ifexists, FOUND_FILE=files["found"], TAKEN_FILE=files["taken"],
+                                 ERROR_FILE=files["error"], lookup_cache=cache, prefix_counts=None):
+            result = finddomain_ifexists.revalidate_stale(
+                found, taken, whois_lookup=lambda domain: whoispool.REGISTERED, query=query)
+            self.assertEqual(finddomain_ifexists.get_taken_domains(), {"hold.com"})
+        self.assertEqual((result['changed'], result['whois_registered']), (0, 1))
+        self.assertEqual((found, taken), (set(), {"hold.com"}))
+        checked_at, method, outcome = cache.get("hold.com")
+        self.assertEqual((method, outcome), ("whois", TAKEN))
+        self.assertGreater(checked_at, 0)
+        cache.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import io
+import json
+import unittest
+import urllib.request
+import dnsprobe
+import metrics
+from metrics import Histogram, Metrics, Reporter
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_use_bucket_bounds(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1.0)
+        self.assertEqual(histogram.quantile(0.99), float('inf'))
+
+    def test_empty(self):
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_snapshot(self):
+        registry = Metrics()
+        registry.inc(metrics.LOOKUPS, outcome='nxdomain')
+        registry.inc(metrics.LOOKUPS, 3, outcome='has_ns')
+        registry.set_gauge(metrics.REMAINING, 100)
+        registry.set_gauge('queue', lambda: 7)
+        registry.observe('dns_latency_seconds', 0.002)
+        snapshot = registry.snapshot()
+        self.assertEqual(registry.total(metrics.LOOKUPS), 4)
+        self.assertEqual(snapshot['counters']['dns_lookups_total{outcome="has_ns"}'], 3)
+        self.assertEqual(snapshot['gauges']['queue'], 7)
+        self.assertEqual(snapshot['histograms']['dns_latency_seconds']['p50'], 0.0025)
+        self.assertGreater(snapshot['lookups_per_sec'], 0)
+        self.assertGreater(snapshot['eta_seconds'], 0)
+        # The rate is per interval: nothing happened since the last snapshot
+        self.assertEqual(registry.snapshot()['lookups_per_sec'], 0)
+
+    def test_prometheus_text(self):
+        registry = Metrics()
+        registry.inc(metrics.LOOKUPS, outcome='nxdomain')
+        registry.observe('dns_latency_seconds', 0.2)
+        text = registry.to_prometheus()
+        self.assertIn('dns_lookups_total{outcome="nxdomain"} 1\n', text)
+        self.assertIn('dns_latency_seconds_bucket{le="0.25"} 1\n', text)
+        self.assertIn('dns_latency_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('dns_latency_seconds_count 1\n', text)
+
+    def test_reporter_writes_json_lines(self):
+        registry = Metrics()
+        registry.inc(metrics.LOOKUPS)
+        stream = io.StringIO()
+        with Reporter(registry, interval=60, stream=stream):
+            pass
+        line = json.loads(stream.getvalue().splitlines()[-1])
+        self.assertEqual(line['counters']['dns_lookups_total'], 1)
+
+    def test_serve_prometheus(self):
+        registry = Metrics()
+        registry.inc('whois_lookups_total', status='available')
+        server = metrics.serve_prometheus(registry, port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            body = urllib.request.urlopen(url).read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('whois_lookups_total{status="available"} 1', body)
+
+
+class TestProbeInstrumentation(unittest.TestCase):
+    def test_probe_records_outcome_and_latency(self):
+        async def query(domain, timeout):
+            return dnsprobe.NXDOMAIN
+
+        before = metrics.METRICS.total(metrics.LOOKUPS)
+        self.assertEqual(asyncio.run(dnsprobe.probe('abcd.com', query)), dnsprobe.NXDOMAIN)
+        self.assertEqual(metrics.METRICS.total(metrics.LOOKUPS), before + 1)
+        self.assertEqual(metrics.METRICS.gauge('dns_in_flight'), 0)
+        self.assertIn('dns_latency_seconds', metrics.METRICS.snapshot()['histograms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from fakeservers import FakeDNSServer
+from nslookup import NSLookup
+
+
+class TestNSLookup(unittest.TestCase):
+    def test_examine_in_batches(self):
+        domains = [f"host{i}.example" for i in range(25)]
+        with FakeDNSServer(nxdomain_ratio=0, latency=0.05) as server:
+            results = list(NSLookup(domains, resolvers=[server.address], batch_size=10).examine())
+        self.assertEqual(sorted(r['domain'] for r in results), sorted(domains))
+        self.assertEqual(results[0]['ips'], ["127.0.0.1", "::1"])
+        self.assertEqual(results[0]['status'], "NOERROR")
+        self.assertEqual(server.queries, 50)
+
+    def test_missing_and_unanswered_domains(self):
+        with FakeDNSServer(nxdomain_ratio=1) as server:
+            [result] = NSLookup(["nope.example"], resolvers=[server.address]).examine()
+        self.assertEqual(result, {'domain': "nope.example", 'names': [], 'ips': [], 'status': "NXDOMAIN"})
+        with FakeDNSServer(loss=1) as server:
+            [result] = NSLookup(["slow.example"], resolvers=[server.address], timeout=0.05).examine()
+        self.assertEqual(result['status'], "TIMEOUT")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from prefixcounts import PrefixCounts
+
+
+class TestPrefixCounts(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.files = {
+            'found': os.path.join(self.tmpdir.name, "found.txt"),
+            'taken': os.path.join(self.tmpdir.name, "taken.txt"),
+        }
+        self.path = os.path.join(self.tmpdir.name, "prefixcounts.json")
+        self.write('found', "abcd.com\nab12.com\nab12.com\n")
+        self.write('taken', "a999.com\nb000.com\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, kind, text):
+        with open(self.files[kind], "a") as f:
+            f.write(text)
+
+    def test_rebuild_from_files(self):
+        counts = PrefixCounts.load(self.path, self.files)
+        self.assertEqual(counts.found('a'), 2)
+        self.assertEqual(counts.found('ab'), 2)
+        self.assertEqual(counts.total('a'), 3)
+        self.assertEqual(counts.total('b0'), 1)
+        self.assertEqual(counts.total('z'), 0)
+
+    def test_save_and_catch_up(self):
+        counts = PrefixCounts.load(self.path, self.files)
+        counts.save()
+        self.write('taken', "a000.com\n")
+        counts = PrefixCounts.load(self.path, self.files)
+        self.assertEqual(counts.taken('a'), 2)
+        self.assertEqual(counts.taken('a0'), 1)
+
+    def test_rebuild_when_file_shrinks(self):
+        PrefixCounts.load(self.path, self.files).save()
+        os.remove(self.files['taken'])
+        counts = PrefixCounts.load(self.path, self.files)
+        self.assertEqual(counts.taken('a'), 0)
+        self.assertEqual(counts.found('a'), 2)
+
+    def test_add(self):
+        counts = PrefixCounts.load(self.path, self.files)
+        counts.add('taken', "zz-9.com")
+        self.assertEqual(counts.taken('z'), 1)
+        self.assertEqual(counts.taken('zz'), 1)
+
+    def test_move_and_remove(self):
+        counts = PrefixCounts.load(self.path, self.files)
+        counts.move("abcd.com", 'found', 'taken')
+        self.assertEqual((counts.found('ab'), counts.taken('ab'), counts.total('ab')), (1, 1, 2))
+        counts.remove('taken', "abcd.com")
+        self.assertEqual(counts.taken('ab'), 0)
+        self.assertNotIn('ab', counts.counts['taken'])
+
+    def test_rebuild_counts_domain_in_both_files_once(self):
+        self.write('taken', "abcd.com\n")
+        counts = PrefixCounts.load(self.path, self.files)
+        self.assertEqual(counts.total('ab'), 2)
+        self.assertEqual(counts.taken('ab'), 1)
+
+if __name__ == "__main__":
+    unittest.main()
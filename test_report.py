@@ -0,0 +1,75 @@
+import io
+import os
+import tempfile
+import unittest
+import domainindex
+import keyspace
+import report
+from lookupcache import LookupCache
+
+SMALL = keyspace.Keyspace(2, ('com', 'net'), alphabet='abc', hyphens=False)
+
+
+class TestReport(unittest.TestCase):
+    def test_pattern_regex(self):
+        self.assertTrue(report.pattern_regex('CV').fullmatch('ba.com'))
+        self.assertFalse(report.pattern_regex('CV').fullmatch('ab.com'))
+        self.assertTrue(report.pattern_regex('x*').fullmatch('xlt1.net'))
+        self.assertFalse(report.pattern_regex('*.net').fullmatch('xlt1.com'))
+        self.assertTrue(report.pattern_regex('[xz]DD.net').fullmatch('z42.net'))
+        self.assertFalse(report.pattern_regex('a.b').fullmatch('axb'))
+        with self.assertRaises(ValueError):
+            report.pattern_regex('[ab')
+
+    def test_times(self):
+        self.assertEqual(report.format_time(0), '1970-01-01T00:00:00+00:00')
+        self.assertEqual(report.format_time(None), '')
+        self.assertEqual(report.parse_time('1970-01-02'), 86400)
+        self.assertEqual(report.parse_time('1970-01-01T01:00:00Z'), 3600)
+        self.assertEqual(report.parse_time('60'), 60)
+
+    def test_rows_csv_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                domainindex.DomainIndex(os.path.join(tmpdir, "small.idx"), space=SMALL) as index, \
+                LookupCache(os.path.join(tmpdir, "lookups.sqlite")) as cache:
+            for domain, state in [('cc.net', domainindex.AVAILABLE), ('ab.com', domainindex.TAKEN),
+                                  ('ba.com', domainindex.AVAILABLE), ('bb.com', domainindex.ERROR)]:
+                index.set(domain, state)
+            cache.record('ba.com', 'dns', 'found', checked_at=100)
+            cache.record('cc.net', 'whois', 'found', checked_at=200)
+            rows = list(report.iter_rows(index, ('available', 'taken'), cache=cache))
+            self.assertEqual([(r['domain'], r['status']) for r in rows],
+                             [('ab.com', 'taken'), ('ba.com', 'available'), ('cc.net', 'available')])
+            self.assertEqual((rows[1]['checked_at'], rows[1]['method']), (100, 'dns'))
+            self.assertIsNone(rows[0]['checked_at'])
+            self.assertEqual([r['domain'] for r in report.iter_rows(index, ('available',), 'C[ac]', cache)],
+                             ['ba.com', 'cc.net'])
+            self.assertEqual([r['domain'] for r in report.iter_rows(index, ('available',), cache=cache, since=150)],
+                             ['cc.net'])
+            self.assertEqual(len(list(report.iter_rows(index, ('unchecked',)))), SMALL.size - 4)
+            stream = io.StringIO()
+            self.assertEqual(report.write_csv(rows, stream), 3)
+        self.assertEqual(stream.getvalue().splitlines()[:3],
+                         ['domain,status,checked_at,method', 'ab.com,taken,,',
+                          'ba.com,available,1970-01-01T00:01:40+00:00,dns'])
+        stream.seek(0)
+        self.assertEqual(list(report.read_snapshot(stream)),
+                         [('ab.com', 'taken'), ('ba.com', 'available'), ('cc.net', 'available')])
+        self.assertEqual(list(report.read_snapshot(io.StringIO('{"domain": "ab.com", "status": "taken"}\n'))),
+                         [('ab.com', 'taken')])
+
+    def test_diff_snapshots(self):
+        old = [('aa.com', 'taken'), ('ab.com', 'available'), ('ba.com', 'error'), ('cc.net', 'taken')]
+        new = [('ab.com', 'available'), ('ba.com', 'available'), ('bb.com', 'available'), ('cc.net', 'taken')]
+        self.assertEqual(list(report.diff_snapshots(old, new, SMALL.to_index)),
+                         [{'domain': 'aa.com', 'old': 'taken', 'new': None},
+                          {'domain': 'ba.com', 'old': 'error', 'new': 'available'},
+                          {'domain': 'bb.com', 'old': None, 'new': 'available'}])
+        self.assertEqual(list(report.diff_snapshots(iter(old), iter([]))), [
+            {'domain': domain, 'old': status, 'new': None} for domain, status in old])
+        with self.assertRaises(ValueError):
+            list(report.diff_snapshots([('ba.com', 'taken'), ('ab.com', 'taken')], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import resultsink
+from resultsink import ResultSink
+
+
+class TestResultSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "found.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read(self):
+        if not os.path.exists(self.filename):
+            return ""
+        with open(self.filename) as f:
+            return f.read()
+
+    def test_flushes_on_batch_size(self):
+        with ResultSink(self.filename, batch_size=3, flush_interval=60) as sink:
+            sink.write("abcd.com")
+            sink.write("abce.com")
+            self.assertEqual(self.read(), "")
+            self.assertEqual(sink.pending(), 2)
+            sink.write("abcf.com")
+            self.assertEqual(self.read(), "abcd.com\nabce.com\nabcf.com\n")
+
+    def test_flushes_on_interval(self):
+        with ResultSink(self.filename, batch_size=100, flush_interval=5) as sink:
+            with mock.patch("resultsink.time.monotonic", side_effect=[0, 0, 6]):
+                sink.write("abcd.com")
+                sink.write("abce.com")
+            self.assertEqual(sink.pending(), 0)
+            self.assertEqual(self.read(), "abcd.com\nabce.com\n")
+
+    def test_timer_flushes_lone_line(self):
+        with ResultSink(self.filename, batch_size=100, flush_interval=0.05) as sink:
+            sink.write("abcd.com")
+            for _ in range(100):
+                if not sink.pending():
+                    break
+                time.sleep(0.01)
+            self.assertEqual(self.read(), "abcd.com\n")
+
+    def test_close_flushes(self):
+        sink = ResultSink(self.filename, fsync=True)
+        sink.write("abcd.com")
+        sink.close()
+        self.assertEqual(self.read(), "abcd.com\n")
+
+    def test_shared_sink_flush_file(self):
+        sink = resultsink.get_sink(self.filename)
+        self.assertIs(resultsink.get_sink(self.filename), sink)
+        sink.write("abcd.com")
+        resultsink.flush_file(self.filename)
+        self.assertEqual(self.read(), "abcd.com\n")
+        sink.close()
+
+    def test_configure_shared_sinks(self):
+        existing = resultsink.get_sink(self.filename)
+        with mock.patch.dict(resultsink._sink_options, clear=True):
+            resultsink.configure(fsync=True)
+            created = resultsink.get_sink(self.filename + ".2")
+            self.assertTrue(existing.fsync)
+            self.assertTrue(created.fsync)
+            with mock.patch("resultsink.os.fsync") as fsync:
+                created.write("abcd.com")
+                created.flush()
+            fsync.assert_called_once()
+        for sink in (existing, created):
+            sink.close()
+            resultsink._sinks.pop(sink.filename)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import dnsprobe
+import domainindex
+import finddomain_ifexists
+import shardsweep
+from fakeservers import FakeDNSServer, name_ratio
+from keyspace import KEYSPACE_SIZE, Keyspace, index_to_domain
+
+SMALL = Keyspace(2, ('com', 'net'), alphabet='abc', hyphens=False)
+
+
+async def fake_query(domain, timeout):
+    # Every domain ending in 'a' is registered
+    return dnsprobe.HAS_NS if domain.endswith('a.com') else dnsprobe.NXDOMAIN
+
+
+class TestShardSweep(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.shard_dir = os.path.join(self.tmpdir.name, "shards")
+        self.found_file = os.path.join(self.tmpdir.name, "found.txt")
+        self.taken_file = os.path.join(self.tmpdir.name, "taken.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_shard_ranges_cover_keyspace_once(self):
+        for shards in (None, 1, 7):
+            ranges = shardsweep.shard_ranges(shards)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], KEYSPACE_SIZE)
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+        self.assertEqual(len(shardsweep.shard_ranges()), 36)
+        self.assertEqual(len(shardsweep.shard_ranges(7)), 7)
+
+    def test_run_and_merge(self):
+        with open(self.found_file, "w") as f:
+            f.write(index_to_domain(1) + "\n")
+        ranges = shardsweep.shard_ranges(3, 0, 72)
+        counts = shardsweep.run_shards(ranges, self.shard_dir, [self.found_file, self.taken_file],
+                                       processes=2, concurrency=8, query=fake_query)
+        self.assertEqual(counts['found'] + counts['taken'], 71)
+
+        found, taken = {index_to_domain(1)}, set()
+        merged = shardsweep.merge_shards(self.shard_dir, found, taken, found.add, taken.add)
+        self.assertEqual(merged['found'] + merged['taken'], 71)
+        self.assertEqual(len(found) + len(taken), 72)
+        self.assertEqual(taken, {index_to_domain(0), index_to_domain(36)})
+        self.assertEqual(os.listdir(self.shard_dir), [])
+
+    def test_shard_ranges_per_tld(self):
+        ranges = shardsweep.shard_ranges(space=SMALL)
+        self.assertEqual(ranges, [(start, start + 3) for start in range(0, 18, 3)])
+        self.assertEqual(shardsweep.shard_ranges(start=4, end=11, space=SMALL), [(4, 6), (6, 9), (9, 11)])
+        self.assertEqual(shardsweep.shard_ranges(2, space=SMALL), [(0, 9), (9, 18)])
+
+    def test_sharded_sweep_of_index(self):
+        index = domainindex.DomainIndex(os.path.join(self.tmpdir.name, "small.idx"), space=SMALL)
+        found, taken = index.view(domainindex.AVAILABLE), index.view(domainindex.TAKEN)
+        taken.add("aa.com")
+        with mock.patch.multiple(finddomain_ifexists, prefix_counts=None, answer_cache=None,
+                                 FOUND_FILE=self.found_file, TAKEN_FILE=self.taken_file,
+                                 PREFIX_COUNTS_FILE=os.path.join(self.tmpdir.name, "prefixcounts.json")), \
+                mock.patch.object(finddomain_ifexists, "result_file",
+                                  lambda kind, domain: os.path.join(self.tmpdir.name, kind)), \
+                FakeDNSServer() as server:
+            result = finddomain_ifexists.generate_domain_sharded(
+                found, taken, processes=2, concurrency=4, shard_dir=self.shard_dir, resolvers=[server.address])
+        self.assertEqual(result['merged'], SMALL.size - 1)
+        self.assertEqual(server.queries, SMALL.size - 1)  # aa.com was skipped through the index
+        self.assertEqual(set(found), {d for _, d in SMALL.iter() if name_ratio(d) < 0.5} - {"aa.com"})
+        self.assertEqual(index.count(domainindex.UNCHECKED), 0)
+        index.close()
+
+    def test_merge_skips_duplicates_and_partial_lines(self):
+        os.makedirs(self.shard_dir)
+        with open(os.path.join(self.shard_dir, "found.a.txt"), "w") as f:
+            f.write("abcd.com\nabce.com\nabcd.com\nabc")
+        found = {"abce.com"}
+        merged = shardsweep.merge_shards(self.shard_dir, found, set(), found.add, None)
+        self.assertEqual(merged, {'found': 1, 'taken': 0, 'duplicates': 2})
+        self.assertEqual(found, {"abcd.com", "abce.com"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import struct
+import tempfile
+import unittest
+import dnsprobe
+import udpdns
+
+
+class StubDNSProtocol(asyncio.DatagramProtocol):
+    """
+    Answers by the first letter of the name: t = has NS, e = empty answer,
+    n = NXDOMAIN, s = SERVFAIL, d = dropped.
+    """
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.queries = 0
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        query_id, _, _, _, _, _ = udpdns.HEADER.unpack_from(data)
+        name, end = udpdns.read_name(data, udpdns.HEADER.size)
+        question = data[udpdns.HEADER.size:end + 4]
+        first = name[0]
+        if first == 'd':
+            return
+        rcode = {'n': 3, 's': 2}.get(first, 0)
+        answer = b''
+        if first == 't':
+            rdata = udpdns.encode_name("ns1.example.net")
+            answer = struct.pack('!HHHIH', 0xC00C, 2, 1, 3600, len(rdata)) + rdata
+        header = udpdns.HEADER.pack(query_id, 0x8180 | rcode, 1, 1 if answer else 0, 0, 0)
+        self.transport.sendto(header + question + answer, addr)
+
+
+async def start_stub():
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(StubDNSProtocol, local_addr=('127.0.0.1', 0))
+    return transport, protocol, transport.get_extra_info('sockname')
+
+
+class TestUDPClient(unittest.TestCase):
+    def test_build_and_parse(self):
+        packet = udpdns.build_query(0x1234, "XLT1.com")
+        query_id, flags, qdcount, _, _, _ = udpdns.HEADER.unpack_from(packet)
+        self.assertEqual((query_id, flags, qdcount), (0x1234, udpdns.FLAG_RD, 1))
+        self.assertEqual(udpdns.read_name(packet, udpdns.HEADER.size)[0], "xlt1.com")
+        with self.assertRaises(ValueError):
+            udpdns.parse_response(packet)
+
+    def test_parse_records(self):
+        question = udpdns.encode_name("www.example.com") + struct.pack('!HH', 1, 1)
+        target = udpdns.encode_name("example.com")
+        # CNAME www.example.com -> example.com, then A and AAAA of example.com via a pointer
+        pointer = struct.pack('!H', 0xC000 | (udpdns.HEADER.size + len(question)
+                                              + 2 + udpdns.RECORD.size))
+        answers = (struct.pack('!H', 0xC00C) + udpdns.RECORD.pack(5, 1, 300, len(target)) + target
+                   + pointer + udpdns.RECORD.pack(1, 1, 60, 4) + bytes([192, 0, 2, 1])
+                   + pointer + udpdns.RECORD.pack(28, 1, 60, 16) + bytes(15) + b'\1')
+        packet = udpdns.HEADER.pack(7, 0x8180, 1, 3, 0, 0) + question + answers
+        self.assertEqual(udpdns.parse_records(packet), [
+            udpdns.DNSRecord("www.example.com", 5, 300, "example.com"),
+            udpdns.DNSRecord("example.com", 1, 60, "192.0.2.1"),
+            udpdns.DNSRecord("example.com", 28, 60, "::1"),
+        ])
+        self.assertEqual(udpdns.parse_records(packet[:-3]), [])
+
+    def test_system_resolvers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "resolv.conf")
+            with open(path, "w") as f:
+                f.write("# generated\nnameserver 127.0.0.53\noptions edns0\nnameserver 10.0.0.1\n")
+            self.assertEqual(udpdns.system_resolvers(path), [("127.0.0.53", 53), ("10.0.0.1", 53)])
+            self.assertEqual(udpdns.system_resolvers(path + ".missing"), udpdns.DEFAULT_RESOLVERS)
+            # The socket is IPv4 only: IPv6 nameservers are skipped, and without IPv4 ones the defaults are used
+            with open(path, "w") as f:
+                f.write("nameserver 2001:4860:4860::8888\nnameserver fe80::1%eth0\nnameserver 10.0.0.1\n")
+            self.assertEqual(udpdns.system_resolvers(path), [("10.0.0.1", 53)])
+            with open(path, "w") as f:
+                f.write("nameserver ::1\n")
+            self.assertEqual(udpdns.system_resolvers(path), udpdns.DEFAULT_RESOLVERS)
+
+    def test_statuses_against_stub(self):
+        async def run():
+            transport, _, address = await start_stub()
+            try:
+                async with udpdns.UDPClient([address], timeout=0.2) as client:
+                    names = ["taken.com", "empty.com", "nope.com", "sfail.com", "drop.com"]
+                    return await asyncio.gather(*(client.query(name) for name in names))
+            finally:
+                transport.close()
+
+        responses = asyncio.run(run())
+        self.assertEqual([r.status for r in responses],
+                         [udpdns.NOERROR, udpdns.NOERROR, udpdns.NXDOMAIN, udpdns.SERVFAIL, udpdns.TIMEOUT])
+        self.assertEqual([r.answer_count for r in responses[:2]], [1, 0])
+
+    def test_spreads_queries_over_resolvers(self):
+        async def run():
+            stubs = [await start_stub() for _ in range(2)]
+            try:
+                async with udpdns.UDPClient([stub[2] for stub in stubs], timeout=0.5) as client:
+                    await asyncio.gather(*(client.query(f"t{i:03d}.com") for i in range(10)))
+                return [stub[1].queries for stub in stubs]
+            finally:
+                for stub in stubs:
+                    stub[0].close()
+
+        self.assertEqual(asyncio.run(run()), [5, 5])
+
+    def test_sweep_through_udp_client(self):
+        async def run():
+            transport, _, address = await start_stub()
+            taken, found, failed = [], [], []
+            try:
+                # dnsprobe.sweep starts its own event loop, so run it in a thread
+                counts = await asyncio.to_thread(
+                    dnsprobe.sweep, ["tabc.com", "nabc.com", "sabc.com"], taken.append, found.append,
+                    failed.append, resolvers=[address], timeout=0.2, retries=1, backoff=0)
+            finally:
+                transport.close()
+            return counts, taken, found, failed
+
+        counts, taken, found, failed = asyncio.run(run())
+        self.assertEqual((taken, found, failed), (["tabc.com"], ["nabc.com"], ["sabc.com"]))
+        self.assertEqual((counts['taken'], counts['found'], counts['failed']), (1, 1, 1))
+        self.assertEqual(counts[dnsprobe.SERVER_ERROR], 1)
+
+if __name__ == "__main__":
+    unittest.main()
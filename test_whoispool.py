@@ -0,0 +1,123 @@
+import threading
+import unittest
+from unittest import mock
+import whoispool
+from whoispool import TokenBucket, WhoisPool, AVAILABLE, REGISTERED, RATE_LIMITED, ERROR
+
+
+class TestWhoisStatus(unittest.TestCase):
+    def test_classifies_answers(self):
+        registered = mock.Mock(domain_name="xlt1.com")
+        unregistered = mock.Mock(domain_name=None)
+        with mock.patch("whois.whois", side_effect=[registered, unregistered]):
+            self.assertEqual(whoispool.whois_status("xlt1.com"), REGISTERED)
+            self.assertEqual(whoispool.whois_status("xlt2.com"), AVAILABLE)
+
+    def test_classifies_errors(self):
+        errors = [Exception("No match for XLT3.COM"), Exception("WHOIS LIMIT EXCEEDED"), Exception("timed out")]
+        with mock.patch("whois.whois", side_effect=errors):
+            self.assertEqual(whoispool.whois_status("xlt3.com"), AVAILABLE)
+            self.assertEqual(whoispool.whois_status("xlt4.com"), RATE_LIMITED)
+            self.assertEqual(whoispool.whois_status("xlt5.com"), ERROR)
+
+    def test_whois_server(self):
+        self.assertEqual(whoispool.whois_server("xlt1.com"), "whois.verisign-grs.com")
+        self.assertEqual(whoispool.whois_server("xlt1.io"), "whois.nic.io")
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_penalize_and_reward(self):
+        bucket = TokenBucket(rate=4, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        bucket.penalize(pause=0)
+        self.assertEqual(bucket.rate, 2)
+        bucket.reward()
+        self.assertAlmostEqual(bucket.rate, 2 + whoispool.RATE_STEP)
+
+    def test_reward_keeps_rate_above_max(self):
+        bucket = TokenBucket(rate=whoispool.MAX_RATE * 10)
+        bucket.reward()
+        self.assertEqual(bucket.rate, whoispool.MAX_RATE * 10)
+
+    def test_classify_whois(self):
+        self.assertEqual(whoispool.classify_whois('No match for "XQZ1.COM".'), AVAILABLE)
+        self.assertEqual(whoispool.classify_whois("   Domain Name: GOOGLE.COM\r\n"), REGISTERED)
+        self.assertEqual(whoispool.classify_whois("Query rate limit exceeded"), RATE_LIMITED)
+        self.assertEqual(whoispool.classify_whois(""), ERROR)
+
+
+class TestWhoisPool(unittest.TestCase):
+    def test_confirms_all_domains(self):
+        results = {}
+        lock = threading.Lock()
+
+        def on_result(domain, status):
+            with lock:
+                results[domain] = status
+
+        def lookup(domain):
+            return AVAILABLE if domain.startswith('a') else REGISTERED
+
+        domains = [f"{c}xyz.com" for c in "abcabcabc"[:6]] + ["a123.com", "b123.com"]
+        with WhoisPool(on_result, workers=3, rate=1000, burst=1000, lookup=lookup) as pool:
+            for domain in domains:
+                pool.submit(domain)
+        self.assertEqual(results["a123.com"], AVAILABLE)
+        self.assertEqual(results["b123.com"], REGISTERED)
+        self.assertEqual(len(results), len(set(domains)))
+
+    def test_retries_rate_limited_then_gives_up(self):
+        answers = {"abcd.com": [RATE_LIMITED, AVAILABLE], "abce.com": [ERROR, ERROR, ERROR]}
+        results = {}
+
+        def lookup(domain):
+            return answers[domain].pop(0)
+
+        with WhoisPool(lambda d, s: results.__setitem__(d, s), workers=1, rate=16, burst=1000,
+                       lookup=lookup, penalty=0) as pool:
+            pool.submit("abcd.com")
+            pool.submit("abce.com")
+        self.assertEqual(results, {"abcd.com": AVAILABLE, "abce.com": ERROR})
+        self.assertEqual(pool.bucket("abcd.com").rate, 8 + whoispool.RATE_STEP)
+
+    def test_failures_reported_as_errors(self):
+        results = {}
+
+        def lookup(domain):
+            if domain == "boom.com":
+                raise RuntimeError("parser bug")
+            return AVAILABLE
+
+        def on_result(domain, status):
+            if domain == "fail.com" and status == AVAILABLE:
+                raise OSError("disk full")
+            results[domain] = status
+
+        with self.assertLogs("finddomain", "ERROR"), \
+                WhoisPool(on_result, workers=1, rate=1000, burst=1000, lookup=lookup) as pool:
+            for domain in ("boom.com", "fail.com", "fine.com"):
+                pool.submit(domain)
+        # The single worker survived both failures and got to the last domain
+        self.assertEqual(results, {"boom.com": ERROR, "fail.com": ERROR, "fine.com": AVAILABLE})
+
+    def test_close_without_wait_drops_queue(self):
+        results = []
+        release = threading.Event()
+
+        def lookup(domain):
+            release.wait(5)
+            return AVAILABLE
+
+        pool = WhoisPool(lambda d, s: results.append(d), workers=1, rate=1000, burst=1000, lookup=lookup)
+        pool.start()
+        for domain in ("abcd.com", "abce.com", "abcf.com"):
+            pool.submit(domain)
+        pool.close(wait=False)  # Returns while the first lookup is still blocked
+        release.set()
+        pool._threads[0].join(5)
+        self.assertFalse(pool._threads[0].is_alive())
+        self.assertEqual(results, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+import finddomain_ifexists
+import zonefile
+from prefixcounts import PrefixCounts
+from domainindex import DomainIndex, AVAILABLE, TAKEN, ERROR, UNCHECKED
+
+ZONE = b"""; .com zone excerpt
+$ORIGIN COM.
+$TTL 900
+@ IN SOA a.gtld-servers.net. nstld.verisign-grs.com. 1 1800 900 604800 86400
+@ 172800 IN NS A.GTLD-SERVERS.NET.
+ABCD NS NS1.EXAMPLE.NET.
+ABCD NS NS2.EXAMPLE.NET.
+XLT1 172800 IN NS NS1.EXAMPLE.NET.
+LONGERNAME NS NS1.EXAMPLE.NET.
+NS1.ABCD A 192.0.2.1
+zz-9.com. 172800 in ns ns1.example.net.
+  ns ns3.example.net.
+q1q1 DS 12345 8 2 ABCDEF
+$ORIGIN NET.
+NETS NS NS1.EXAMPLE.NET.
+"""
+
+
+class TestZoneFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.plain = os.path.join(self.tmpdir.name, "com.zone")
+        self.gzipped = self.plain + ".gz"
+        with open(self.plain, "wb") as f:
+            f.write(ZONE)
+        with gzip.open(self.gzipped, "wb") as f:
+            f.write(ZONE)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_iter_delegations(self):
+        expected = ["abcd.com", "xlt1.com", "zz-9.com", "nets.net"]
+        self.assertEqual(list(zonefile.iter_delegations(self.plain, 4)), expected)
+        # Tiny chunks split records across chunk boundaries
+        self.assertEqual(list(zonefile.iter_delegations(self.gzipped, 4, chunk_size=7)), expected)
+        self.assertIn("longername.com", zonefile.iter_delegations(self.plain))
+
+    def test_import_zone_into_index(self):
+        with DomainIndex(os.path.join(self.tmpdir.name, "domains.idx")) as index, \
+                mock.patch.multiple(finddomain_ifexists, TAKEN_FILE=os.path.join(self.tmpdir.name, "taken"),
+                                    FOUND_FILE=os.path.join(self.tmpdir.name, "found"), prefix_counts=None):
+            index.set("xlt1.com", AVAILABLE)
+            index.set("zz-9.com", TAKEN)
+            counts = finddomain_ifexists.import_zone(self.gzipped, index.view(AVAILABLE), index.view(TAKEN))
+            self.assertEqual(counts, {'delegations': 4, 'in_keyspace': 3, 'marked': 2})
+            self.assertEqual([index.get(d) for d in ("abcd.com", "xlt1.com", "q1q1.com")],
+                             [TAKEN, TAKEN, UNCHECKED])
+            self.assertEqual(index.count(ERROR), 0)
+            with open(finddomain_ifexists.TAKEN_FILE) as f:
+                self.assertEqual(f.read().split(), ["abcd.com", "xlt1.com"])
+
+    def test_import_zone_into_sets(self):
+        found, taken = {"abcd.com", "abce.com"}, set()
+        files = {kind: os.path.join(self.tmpdir.name, kind) for kind in ("found", "taken")}
+        with open(files["found"], "w") as f:
+            f.write("abcd.com\nabce.com\n")
+        counts = PrefixCounts(os.path.join(self.tmpdir.name, "prefixcounts.json"), files)
+        counts.rebuild()
+        with mock.patch.multiple(finddomain_ifexists, TAKEN_FILE=files["taken"], FOUND_FILE=files["found"],
+                                 prefix_counts=counts):
+            finddomain_ifexists.import_zone(self.plain, found, taken)
+            self.assertEqual(finddomain_ifexists.get_found_domains(), {"abce.com"})
+        self.assertEqual(found, {"abce.com"})
+        self.assertEqual(taken, {"abcd.com", "xlt1.com", "zz-9.com"})
+        # abcd.com moved from found to taken instead of being counted twice
+        self.assertEqual((counts.found('ab'), counts.taken('ab')), (1, 1))
+        with open(files["found"]) as f:
+            self.assertEqual(f.read(), "abce.com\n")
+        rebuilt = PrefixCounts.load(counts.path, files)
+        self.assertEqual((rebuilt.found('ab'), rebuilt.taken('ab')), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
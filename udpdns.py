@@ -0,0 +1,291 @@
+"""
+Minimal raw UDP DNS client with query pipelining.
+
+dns.resolver builds a full resolver and waits on one query per call, and
+nslookup forks a process per domain. UDPClient instead sends every query over
+one UDP socket, keeps any number of them outstanding, matches answers back to
+queries by their 16-bit ID and spreads queries round-robin over a list of
+resolvers. Only what the sweep and NSLookup need is implemented: building a
+query, reading the response code and answer count, and decoding the answer
+records on demand (parse_records).
+"""
+import asyncio
+import ipaddress
+import itertools
+import random
+import socket
+import struct
+from collections import namedtuple
+
+DEFAULT_RESOLVERS = [('8.8.8.8', 53), ('1.1.1.1', 53), ('9.9.9.9', 53)]
+RESOLV_CONF = '/etc/resolv.conf'
+DEFAULT_TIMEOUT = 2.0
+
+QTYPES = {'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'AAAA': 28}
+CLASS_IN = 1
+FLAG_RD = 0x0100  # Recursion desired
+
+# Response statuses
+NOERROR = 'NOERROR'
+NXDOMAIN = 'NXDOMAIN'
+SERVFAIL = 'SERVFAIL'
+REFUSED = 'REFUSED'
+TIMEOUT = 'TIMEOUT'
+RCODES = {0: NOERROR, 2: SERVFAIL, 3: NXDOMAIN, 5: REFUSED}
+
+HEADER = struct.Struct('!HHHHHH')  # id, flags, qdcount, ancount, nscount, arcount
+RECORD = struct.Struct('!HHIH')  # type, class, ttl, rdlength
+
+# packet is the raw response, decoded only if needed with parse_records
+DNSResponse = namedtuple('DNSResponse', 'status rcode answer_count resolver packet', defaults=(b'',))
+# data is an address string for A/AAAA, a name for NS/CNAME, raw bytes otherwise
+DNSRecord = namedtuple('DNSRecord', 'name rtype ttl data')
+
+
+def system_resolvers(path=RESOLV_CONF):
+    """
+    Return the IPv4 nameservers of the system resolver configuration as (ip, port) tuples.
+
+    The client's socket is IPv4 only, so IPv6 nameservers are skipped. Falls
+    back to DEFAULT_RESOLVERS if the file is missing or lists no IPv4 nameserver.
+    """
+    resolvers = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver' and is_ipv4(fields[1]):
+                    resolvers.append((fields[1], 53))
+    except OSError:
+        pass
+    return resolvers or list(DEFAULT_RESOLVERS)
+
+
+def is_ipv4(address):
+    """Return whether a string is an IPv4 address."""
+    try:
+        return ipaddress.ip_address(address).version == 4
+    except ValueError:
+        return False
+
+
+def encode_name(name):
+    """Encode a domain name as DNS wire-format labels."""
+    labels = name.rstrip('.').split('.')
+    return b''.join(bytes([len(label)]) + label.encode('ascii') for label in labels) + b'\0'
+
+
+def build_query(query_id, name, qtype='NS'):
+    """
+    Build a recursive DNS query packet.
+
+    Args:
+        query_id (int): 16-bit ID used to match the response.
+        name (str): Domain name to ask about.
+        qtype (str): Record type, one of QTYPES.
+
+    Returns:
+        bytes: The packet.
+    """
+    return (HEADER.pack(query_id, FLAG_RD, 1, 0, 0, 0)
+            + encode_name(name)
+            + struct.pack('!HH', QTYPES[qtype], CLASS_IN))
+
+
+def read_name(data, offset):
+    """
+    Read a possibly compressed domain name from a packet.
+
+    Returns:
+        tuple: (name, offset just past the name in the original position).
+    """
+    labels = []
+    end = None
+    for _ in range(128):  # Guards against compression pointer loops
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    else:
+        raise ValueError("DNS name compression loop")
+    return '.'.join(labels).lower(), end if end is not None else offset
+
+
+def parse_response(data):
+    """
+    Read the fields of a DNS response needed to classify it.
+
+    Returns:
+        tuple: (query_id, rcode, answer_count, question_name).
+
+    Raises:
+        ValueError: If the packet is too short or not a response.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Short DNS packet")
+    query_id, flags, qdcount, ancount, _, _ = HEADER.unpack_from(data)
+    if not flags & 0x8000:
+        raise ValueError("DNS packet is not a response")
+    name = read_name(data, HEADER.size)[0] if qdcount else ''
+    return query_id, flags & 0x000F, ancount, name
+
+
+def _skip_questions(data, count):
+    """Return the offset just past the question section."""
+    offset = HEADER.size
+    for _ in range(count):
+        offset = read_name(data, offset)[1] + 4  # qtype, qclass
+    return offset
+
+
+def _record_data(data, offset, rtype, length):
+    if rtype == QTYPES['A'] and length == 4:
+        return socket.inet_ntop(socket.AF_INET, data[offset:offset + 4])
+    if rtype == QTYPES['AAAA'] and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, data[offset:offset + 16])
+    if rtype in (QTYPES['NS'], QTYPES['CNAME']):
+        return read_name(data, offset)[0]
+    return bytes(data[offset:offset + length])
+
+
+def parse_records(data, sections=1):
+    """
+    Decode the resource records of a DNS response.
+
+    Args:
+        data (bytes): The response packet, e.g. DNSResponse.packet.
+        sections (int): How many sections to read after the question: 1 for
+            the answers only, 2 to include the authority section, 3 for all.
+
+    Returns:
+        list: DNSRecord tuples in packet order; empty for a short or broken packet.
+    """
+    try:
+        _, _, qdcount, ancount, nscount, arcount = HEADER.unpack_from(data)
+        offset = _skip_questions(data, qdcount)
+        records = []
+        for _ in range(sum((ancount, nscount, arcount)[:sections])):
+            name, offset = read_name(data, offset)
+            rtype, _, ttl, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            records.append(DNSRecord(name, rtype, ttl, _record_data(data, offset, rtype, length)))
+            offset += length
+        return records
+    except (ValueError, IndexError, struct.error):
+        return []
+
+
+class _ClientProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client._received(data, addr)
+
+    def error_received(self, exc):
+        # ICMP errors can not be tied to a query; those queries time out instead
+        pass
+
+
+class UDPClient:
+    """
+    Pipelined DNS client over a single UDP socket.
+
+    Use as `async with UDPClient(resolvers) as client:`.
+
+    Args:
+        resolvers (list): (host, port) tuples of recursive resolvers to spread
+            queries over; hosts are IPv4 addresses or names resolving to one.
+        timeout (float): Default seconds to wait for an answer.
+        cache (answercache.AnswerCache): Answers still within their TTL are
+            returned from it without a query, and new ones are stored in it.
+    """
+
+    def __init__(self, resolvers=None, timeout=DEFAULT_TIMEOUT, cache=None):
+        self.resolvers = [(socket.gethostbyname(host), port) for host, port in (resolvers or DEFAULT_RESOLVERS)]
+        self.timeout = timeout
+        self.cache = cache
+        self._next_resolver = itertools.cycle(self.resolvers)
+        self._pending = {}  # query id -> (future, name, resolver)
+        self._transport = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    async def open(self):
+        """Create the UDP socket."""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ClientProtocol(self), local_addr=('0.0.0.0', 0))
+
+    def close(self):
+        """Close the socket; outstanding queries time out."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def in_flight(self):
+        """Return the number of queries waiting for an answer."""
+        return len(self._pending)
+
+    async def query(self, name, qtype='NS', timeout=None, resolver=None):
+        """
+        Send one query and wait for its answer.
+
+        Args:
+            name (str): Domain name to ask about.
+            qtype (str): Record type, one of QTYPES.
+            timeout (float): Seconds to wait (default: the client timeout).
+            resolver (tuple): (ip, port) to ask (default: next resolver in turn).
+
+        Returns:
+            DNSResponse: status is NOERROR, NXDOMAIN, SERVFAIL, REFUSED, TIMEOUT
+            or 'RCODE<n>' for other response codes; packet is the raw answer.
+            resolver is None for an answer from the cache.
+        """
+        name = name.rstrip('.').lower()
+        if self.cache is not None:
+            cached = self.cache.get(name, qtype)
+            if cached is not None:
+                return cached
+        resolver = resolver or next(self._next_resolver)
+        query_id = random.getrandbits(16)
+        while query_id in self._pending:
+            query_id = random.getrandbits(16)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[query_id] = (future, name, resolver)
+        try:
+            self._transport.sendto(build_query(query_id, name, qtype), resolver)
+            rcode, answer_count, packet = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            return DNSResponse(TIMEOUT, None, 0, resolver)
+        finally:
+            self._pending.pop(query_id, None)
+        response = DNSResponse(RCODES.get(rcode, f'RCODE{rcode}'), rcode, answer_count, resolver, packet)
+        if self.cache is not None:
+            self.cache.put(name, qtype, response)
+        return response
+
+    def _received(self, data, addr):
+        try:
+            query_id, rcode, answer_count, name = parse_response(data)
+        except (ValueError, IndexError, struct.error):
+            return
+        pending = self._pending.get(query_id)
+        # Only accept an answer from the resolver asked, for the name asked
+        if pending is None or pending[2] != addr[:2] or pending[1] != name:
+            return
+        future = pending[0]
+        if not future.done():
+            future.set_result((rcode, answer_count, data))
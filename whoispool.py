@@ -0,0 +1,315 @@
+"""
+Rate-limited WHOIS worker pool, the second stage of the DNS -> WHOIS pipeline.
+
+The DNS stage only hands over the domains that do not exist in DNS. A pool
+of worker threads confirms them with WHOIS. Every WHOIS server gets its own
+token bucket, so the pool sends as many lookups as the server allows
+instead of one lookup plus a one second sleep at a time. When a server
+answers that its limit was exceeded, its rate is halved and it is paused.
+Successful answers slowly raise the rate again.
+"""
+import logging
+import queue
+import socket
+import threading
+import time
+
+from metrics import METRICS
+
+log = logging.getLogger("finddomain")
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 2.0  # Lookups per second per WHOIS server to start with
+DEFAULT_BURST = 4  # Lookups a server may get back to back
+DEFAULT_RETRIES = 3  # Attempts per domain for errors and rate limit answers
+MIN_RATE = 0.1
+MAX_RATE = 20.0
+RATE_STEP = 0.05  # Added to a server's rate after every good answer
+PENALTY = 5.0  # Seconds a server is paused after a rate limit answer
+WHOIS_PORT = 43
+DEFAULT_TIMEOUT = 10.0  # Seconds allowed for a raw WHOIS query
+
+# WHOIS statuses
+AVAILABLE = 'available'
+REGISTERED = 'registered'
+RATE_LIMITED = 'rate_limited'
+ERROR = 'error'
+
+WHOIS_SERVERS = {
+    'com': 'whois.verisign-grs.com',
+    'net': 'whois.verisign-grs.com',
+    'org': 'whois.publicinterestregistry.org',
+}
+RATE_LIMIT_MESSAGES = ('limit exceeded', 'rate limit', 'too many', 'quota exceeded', 'try again later')
+NOT_FOUND_MESSAGES = ('no match', 'not found')
+
+
+def whois_server(domain):
+    """Return the WHOIS server a domain's lookups go to (whois.nic.<tld>, the usual registry host, for unknown TLDs)."""
+    tld = domain.rsplit('.', 1)[-1].lower()
+    return WHOIS_SERVERS.get(tld, f"whois.nic.{tld}")
+
+
+def whois_status(domain):
+    """
+    Do one WHOIS lookup and classify the answer.
+
+    Returns:
+        str: AVAILABLE, REGISTERED, RATE_LIMITED or ERROR.
+    """
+    import whois  # pip install python-whois; slow to import, so only loaded when used
+    try:
+        result = whois.whois(domain)
+        # If the lookup returns nothing or no domain name, treat as available.
+        if result is None or result.domain_name is None:
+            return AVAILABLE
+        return REGISTERED
+    except Exception as e:
+        error_message = str(e).lower()
+        # If the error message indicates the domain was not found, treat it as available.
+        if "no match" in error_message or "not found" in error_message:
+            return AVAILABLE
+        if any(message in error_message for message in RATE_LIMIT_MESSAGES):
+            return RATE_LIMITED
+        return ERROR
+
+
+def whois_query(domain, server=None, port=WHOIS_PORT, timeout=DEFAULT_TIMEOUT):
+    """
+    Send a raw WHOIS query over TCP and return the reply.
+
+    Args:
+        domain (str): The domain name to look up.
+        server (str): WHOIS server host (default: the one for the domain's TLD).
+        port (int): WHOIS server port.
+        timeout (float): Socket timeout in seconds.
+
+    Returns:
+        str: The server's reply.
+
+    Raises:
+        OSError: If the connection fails or times out.
+    """
+    with socket.create_connection((server or whois_server(domain), port), timeout) as sock:
+        sock.sendall(domain.encode('idna') + b'\r\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8', 'replace')
+
+
+def classify_whois(reply):
+    """Map the text of a WHOIS reply to AVAILABLE, REGISTERED, RATE_LIMITED or ERROR."""
+    reply = reply.lower()
+    if any(message in reply for message in NOT_FOUND_MESSAGES):
+        return AVAILABLE
+    if any(message in reply for message in RATE_LIMIT_MESSAGES):
+        return RATE_LIMITED
+    if 'domain name:' in reply:
+        return REGISTERED
+    return ERROR
+
+
+def raw_lookup(server=None, port=WHOIS_PORT, timeout=DEFAULT_TIMEOUT):
+    """
+    Return a lookup function for WhoisPool that talks to a WHOIS server directly.
+
+    Skips python-whois and its reply parsing; also
+    lets a sweep be pointed at a local fake server (see fakeservers.py).
+    """
+    def lookup(domain):
+        try:
+            return classify_whois(whois_query(domain, server, port, timeout))
+        except OSError:
+            return ERROR
+    return lookup
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose rate adapts to the server's answers.
+
+    Args:
+        rate (float): Tokens added per second.
+        burst (int): Maximum tokens stored.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, pause=PENALTY):
+        """Halve the rate and pause the bucket after a rate limit answer."""
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self._tokens = 0.0
+            self._paused_until = time.monotonic() + pause
+
+    def reward(self):
+        """Raise the rate a little after a good answer (never lowering a rate set above MAX_RATE)."""
+        with self._lock:
+            self.rate = max(self.rate, min(MAX_RATE, self.rate + RATE_STEP))
+
+
+class WhoisPool:
+    """
+    Worker threads confirming domains with WHOIS, rate limited per server.
+
+    Use as `with WhoisPool(on_result) as pool: pool.submit(domain)`; leaving
+    the block waits for every submitted domain to get a result, unless it is
+    left by an exception (e.g. KeyboardInterrupt), which drops the rest.
+    A lookup or on_result that raises gets the domain reported as ERROR; the
+    worker carries on.
+
+    Args:
+        on_result (callable): Called as on_result(domain, status) from a worker
+            thread, with AVAILABLE, REGISTERED or ERROR.
+        workers (int): Number of worker threads.
+        rate (float): Initial lookups per second per WHOIS server.
+        burst (int): Lookups a server may get back to back.
+        retries (int): Attempts per domain before it is reported as ERROR.
+        lookup (callable): Called as lookup(domain), returns a WHOIS status.
+        penalty (float): Seconds a server is paused after a rate limit answer.
+    """
+
+    def __init__(self, on_result, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 retries=DEFAULT_RETRIES, lookup=whois_status, penalty=PENALTY):
+        self.on_result = on_result
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.lookup = lookup
+        self.penalty = penalty
+        self.buckets = {}  # WHOIS server -> TokenBucket
+        self._buckets_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        METRICS.set_gauge('whois_queue', self.pending)
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(wait=exc_type is None)
+
+    def start(self):
+        """Start the worker threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, domain):
+        """Queue a domain for a WHOIS check."""
+        self._queue.put((domain, 0))
+
+    def pending(self):
+        """Return the number of domains waiting for a worker."""
+        return self._queue.qsize()
+
+    def close(self, wait=True):
+        """
+        Stop the workers.
+
+        Args:
+            wait (bool): Wait until every submitted domain has a result first.
+                Otherwise the queued domains are dropped without a result and
+                lookups in progress are not waited for (the workers are daemon
+                threads), so an interrupted sweep exits at once.
+        """
+        if wait:
+            self._queue.join()
+        else:
+            self._stopped.set()
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def bucket(self, domain):
+        """Return the token bucket of a domain's WHOIS server."""
+        server = whois_server(domain)
+        with self._buckets_lock:
+            if server not in self.buckets:
+                self.buckets[server] = TokenBucket(self.rate, self.burst)
+            return self.buckets[server]
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._stopped.is_set():
+                    continue
+                domain, attempts = item
+                try:
+                    status = self._check(domain, attempts)
+                except Exception:
+                    log.exception("WHOIS lookup of %s failed", domain)
+                    status = ERROR
+                if status is not None and not self._stopped.is_set():
+                    self._report(domain, status)
+            finally:
+                self._queue.task_done()
+
+    def _check(self, domain, attempts):
+        """Look a domain up once; return its final status, or None if it was queued for another attempt."""
+        bucket = self.bucket(domain)
+        bucket.acquire()
+        started = time.monotonic()
+        status = self.lookup(domain)
+        METRICS.observe('whois_latency_seconds', time.monotonic() - started)
+        METRICS.inc('whois_lookups_total', status=status)
+        attempts += 1
+        if status == RATE_LIMITED:
+            bucket.penalize(self.penalty)
+            METRICS.set_gauge('whois_rate', bucket.rate, server=whois_server(domain))
+        elif status != ERROR:
+            bucket.reward()
+            METRICS.set_gauge('whois_rate', bucket.rate, server=whois_server(domain))
+        if status in (RATE_LIMITED, ERROR):
+            if attempts < self.retries:
+                self._queue.put((domain, attempts))
+                return None
+            status = ERROR
+        return status
+
+    def _report(self, domain, status):
+        """Pass a result to on_result; if that raises, report the domain as ERROR instead."""
+        try:
+            self.on_result(domain, status)
+        except Exception:
+            log.exception("Recording the WHOIS result of %s failed", domain)
+            if status != ERROR:
+                try:
+                    self.on_result(domain, ERROR)
+                except Exception:
+                    log.exception("Recording %s as a WHOIS error failed", domain)
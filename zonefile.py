@@ -0,0 +1,98 @@
+"""
+Streaming reader for TLD zone files (e.g. the .com zone from CZDS).
+
+Every name delegated in the zone has NS records there, so it is registered;
+importing the zone marks those names taken without a single DNS query and
+leaves only the residue to probe. Zone files are multi-GB, so they are never
+read line by line in Python: plain files are memory-mapped and gzipped ones
+decompressed in large chunks, and one regex finds the NS records in C.
+The regex only matches owner names of the wanted length, so the bulk of the
+zone (longer names) is skipped without creating any Python objects.
+"""
+import gzip
+import mmap
+import os
+import re
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024  # Bytes of decompressed zone per regex pass
+
+
+def delegation_pattern(length=None):
+    """
+    Return a regex matching $ORIGIN lines and NS records with an owner name.
+
+    Group 1 is the new origin of an $ORIGIN line, group 2 the owner name of an
+    NS record, limited to names whose first label has `length` characters.
+    Records with a blank owner (continuing the previous owner) are not matched.
+    """
+    label = rb'[a-z0-9-]{%d}' % length if length else rb'[a-z0-9_-]+'
+    return re.compile(
+        rb'^(?:\$origin[ \t]+(\S+)'
+        rb'|(' + label + rb'(?:\.[a-z0-9.-]*)?)[ \t]+'  # owner, relative or absolute
+        rb'(?:\d+[ \t]+)?(?:in[ \t]+)?(?:\d+[ \t]+)?'  # optional TTL and class, in any order
+        rb'ns[ \t])',
+        re.MULTILINE | re.IGNORECASE)
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the contents of a zone file as buffers that end on a line boundary.
+
+    A plain file is yielded as a single memory map; a .gz file is decompressed
+    in chunks of about `chunk_size` bytes.
+    """
+    if not path.endswith('.gz'):
+        if os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as zone:
+            yield zone
+        return
+    with gzip.open(path, 'rb') as f:
+        rest = b''
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            rest = data[end:]
+            if end:
+                yield data[:end]
+        if rest:
+            yield rest + b'\n'
+
+
+def iter_delegations(path, length=None, origin='', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the names delegated (owning NS records) in a zone file.
+
+    Args:
+        path (str): Zone file, optionally gzipped.
+        length (int): Only yield names whose first label has this many characters
+            (default: every name).
+        origin (str): Origin for relative names until an $ORIGIN line sets one,
+            e.g. 'com' (the .com zone file uses absolute names).
+        chunk_size (int): Bytes per regex pass for gzipped files.
+
+    Yields:
+        str: Lowercase names without the trailing dot, e.g. 'abcd.com'. The
+        zone apex (the TLD itself) is skipped, and the NS records of one
+        delegation (consecutive lines) yield its name once.
+    """
+    pattern = delegation_pattern(length)
+    origin = origin.strip('.').lower()
+    last = None
+    for chunk in iter_chunks(path, chunk_size):
+        for match in pattern.finditer(chunk):
+            new_origin, owner = match.groups()
+            if new_origin is not None:
+                origin = new_origin.decode('ascii', 'replace').strip('.').lower()
+                continue
+            name = owner.decode('ascii', 'replace').lower()
+            if name.endswith('.'):
+                name = name[:-1]
+            elif origin:
+                name = f"{name}.{origin}"
+            if name != origin and name != last:
+                last = name
+                yield name